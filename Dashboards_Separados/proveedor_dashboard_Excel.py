@@ -1,32 +1,26 @@
 # -------------------- IMPORTS Y UTILIDADES --------------------
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import datetime
 import os
+import sys
 
-def ruta_datos(filename):
-    carpeta = 'datos_prueba'
-    os.makedirs(carpeta, exist_ok=True)
-    return os.path.join(carpeta, filename)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from servicios import cobertura_inventario, graficas
+from servicios.repositorios import obtener_repositorio
+from servicios.repositorios.excel import ARCHIVOS
 
-# ----------- CONSTANTES DE ARCHIVO -----------
-ARCHIVO_PEDIDOS = ruta_datos("pedidos_cliente.xlsx")
-ARCHIVO_INVENTARIO = ruta_datos('inventario_cafe.xlsx')
-ARCHIVO_CONTROL = ruta_datos('control_inventario_cafe.xlsx')
-ARCHIVO_PREDICCIONES = ruta_datos('predicciones_cafe_365_dias.xlsx')
-ARCHIVO_USUARIOS = ruta_datos('usuarios.xlsx')
-ARCHIVO_COMPARACION = ruta_datos('comparacion_prediccion_vs_real.xlsx')
-ARCHIVO_ELIMINADOS = ruta_datos('log_eliminaciones_pedidos.xlsx')
+# ----------- ORIGEN DE DATOS -----------
+# Por defecto los archivos de datos_prueba (almacén SQLite con importación y
+# exportación .xlsx); CAFE_BACKEND=sqlite o mysql usa la base correspondiente.
+REPO = obtener_repositorio(defecto="excel")
 
 # -------------------- FUNCIONES DE PEDIDOS --------------------
 def cargar_todos_pedidos():
-    # Lee o crea estructura vacía
-    if not os.path.exists(ARCHIVO_PEDIDOS):
-        return pd.DataFrame(columns=['cliente_id','producto','cantidad','detalle','fecha'])
-    df = pd.read_excel(ARCHIVO_PEDIDOS)
+    # El índice es el id del pedido (sirve para eliminarlo)
+    df = REPO.cargar_pedidos().set_index('id')
+    df.index.name = None
     df['producto'] = df['producto'].astype(str).str.lower().str.strip()
-    df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
     return df
 
 def vista_ver_pedidos():
@@ -61,74 +55,41 @@ def vista_ver_pedidos():
         df_graf['fecha'] = pd.to_datetime(df_graf['fecha'])
         df_graf = df_graf.groupby('fecha').agg({'cantidad':'sum'}).reset_index()
         if len(df_graf) > 1:
-            fig, ax = plt.subplots(figsize=(10, 4))
-            ax.plot(df_graf['fecha'], df_graf['cantidad'], marker='o')
-            ax.set_title("Pedidos en el tiempo")
-            ax.set_xlabel("Fecha")
-            ax.set_ylabel("Cantidad total (kg)")
-            st.pyplot(fig)
+            graficas.mostrar(graficas.linea_tiempo, df_graf['fecha'], df_graf['cantidad'],
+                             titulo="Pedidos en el tiempo", xlabel="Fecha", ylabel="Cantidad total (kg)")
         else:
             st.info("No hay suficiente información para mostrar evolución (al menos 2 fechas únicas requeridas).")
 
 # ---------------- FUNCIONES DE INVENTARIO Y PREDICCIÓN ----------------
 def obtener_inventario_actual():
-    if not os.path.exists(ARCHIVO_INVENTARIO):
-        df = pd.DataFrame({'cantidad_kg':[50.0], 'fecha_actualizacion':[datetime.datetime.now()]})
-        df.to_excel(ARCHIVO_INVENTARIO, index=False)
-    df = pd.read_excel(ARCHIVO_INVENTARIO)
-    return df.iloc[0].to_dict()
+    return REPO.inventario_actual()
 
 def actualizar_inventario(nueva_cantidad, usuario):
-    inv_actual = obtener_inventario_actual()
-    cantidad_antes = inv_actual['cantidad_kg']
-    fecha_actual = datetime.datetime.now()
     # Actualiza inventario principal y guarda historial
-    df_inv = pd.DataFrame({'cantidad_kg':[nueva_cantidad], 'fecha_actualizacion':[fecha_actual]})
-    df_inv.to_excel(ARCHIVO_INVENTARIO, index=False)
-    if os.path.exists(ARCHIVO_CONTROL):
-        df_hist = pd.read_excel(ARCHIVO_CONTROL)
-    else:
-        df_hist = pd.DataFrame(columns=['cantidad_antes','cantidad_despues','fecha_cambio','usuario'])
-    nuevo = {'cantidad_antes': cantidad_antes, 'cantidad_despues': nueva_cantidad, 'fecha_cambio': fecha_actual, 'usuario': usuario}
-    df_hist = pd.concat([df_hist, pd.DataFrame([nuevo])], ignore_index=True)
-    df_hist.to_excel(ARCHIVO_CONTROL, index=False)
+    REPO.actualizar_inventario(nueva_cantidad, usuario)
     st.success("Inventario actualizado y registrado en historial.")
 
 def obtener_historial():
-    if not os.path.exists(ARCHIVO_CONTROL):
-        return pd.DataFrame(columns=['cantidad_antes','cantidad_despues','fecha_cambio','usuario'])
-    return pd.read_excel(ARCHIVO_CONTROL)
+    return REPO.historial_inventario()
 
 def cargar_predicciones():
     try:
-        df = pd.read_excel(ARCHIVO_PREDICCIONES)
-        df['fecha'] = pd.to_datetime(df['Fecha'], format='%d/%m/%Y', errors='coerce')
-        df['prediccion'] = pd.to_numeric(df['Kg_Predichos'], errors='coerce')
-        df = df[df['fecha'].notnull()].sort_values('fecha')
-        return df[['fecha','prediccion']]
+        return REPO.cargar_predicciones()
     except Exception as e:
         st.warning(f"Error leyendo predicción: {e}")
         return pd.DataFrame(columns=['fecha','prediccion'])
 
 def cargar_pedidos_reales_cliente():
-    if not os.path.exists(ARCHIVO_PEDIDOS):
-        return pd.DataFrame(columns=['cliente_id','producto','cantidad','detalle','fecha'])
-    df = pd.read_excel(ARCHIVO_PEDIDOS)
-    df_cafe = df[df['producto'].astype(str).str.lower().str.strip() == "cafe"].copy()
-    df_cafe['fecha'] = pd.to_datetime(df_cafe['fecha'], errors='coerce')
+    df = cargar_todos_pedidos()
+    df_cafe = df[df['producto'] == "cafe"].copy()
     df_cafe['cantidad'] = pd.to_numeric(df_cafe['cantidad'], errors='coerce')
     df_cafe = df_cafe[df_cafe['fecha'].notnull()]
     return df_cafe[['fecha', 'cantidad', 'cliente_id']]
 
 def estimar_dias_restantes(inventario, df_pred):
-    suma_acum, dias, fecha_lim = 0, 0, None
-    for i, row in df_pred.iterrows():
-        suma_acum += row['prediccion']
-        dias += 1
-        if suma_acum >= inventario:
-            fecha_lim = row['fecha']
-            break
-    return dias, fecha_lim
+    cob = cobertura_inventario.cobertura(df_pred['fecha'], df_pred['prediccion'], inventario)
+    fecha_lim = None if cob['alcanza'] else cob['fecha_quiebre']
+    return cob['pedidos_cubiertos'], fecha_lim
 
 def control_de_inventario():
     st.header("📊 Control de Inventario de Café")
@@ -192,27 +153,14 @@ def guardar_comparacion_predicion(cliente, fecha_real, cantidad_real, pred_fecha
         "registro": datetime.datetime.now(),
         "fue_pred_usada": fue_pred_usada
     }
-    if os.path.exists(ARCHIVO_COMPARACION):
-        df_comp = pd.read_excel(ARCHIVO_COMPARACION)
-    else:
-        df_comp = pd.DataFrame()
-    df_nuevo = pd.concat([df_comp, pd.DataFrame([nuevo])], ignore_index=True)
-    df_nuevo.to_excel(ARCHIVO_COMPARACION, index=False)
+    REPO.guardar_comparacion(nuevo)
 
 def eliminar_prediccion_usada(fecha_pred_usada, kg_predichos):
-    df_pred = pd.read_excel(ARCHIVO_PREDICCIONES)
-    df_pred['Fecha'] = pd.to_datetime(df_pred['Fecha'],format='%d/%m/%Y',errors='coerce')
-    mask = ~((df_pred['Fecha'] == pd.to_datetime(fecha_pred_usada)) & (df_pred['Kg_Predichos'] == kg_predichos))
-    df_pred_filtrado = df_pred[mask]
-    df_pred_filtrado.to_excel(ARCHIVO_PREDICCIONES, index=False)
+    REPO.eliminar_prediccion(fecha_pred_usada, kg_predichos)
 
 # ----------------- FUNCIONES DE CLIENTES Y USUARIOS -----------------
 def cargar_clientes_usuarios():
-    if not os.path.exists(ARCHIVO_USUARIOS):
-        return []
-    df_usuarios = pd.read_excel(ARCHIVO_USUARIOS)
-    clientes = df_usuarios[df_usuarios['rol'].astype(str).str.lower().str.strip() == "cliente"]['usuario'].dropna().unique()
-    return sorted(map(str, clientes))
+    return REPO.cargar_clientes()
 
 def crear_cliente():
     st.header("👤 Crear nuevo cliente")
@@ -224,30 +172,26 @@ def crear_cliente():
         if not nombre_usuario.strip():
             st.warning("El nombre de cliente no puede estar vacío.")
             return
-        if os.path.exists(ARCHIVO_USUARIOS):
-            df_usuarios = pd.read_excel(ARCHIVO_USUARIOS)
-        else:
-            df_usuarios = pd.DataFrame(columns=['usuario','nombre','correo','telefono','rol'])
+        df_usuarios = REPO.cargar_usuarios()
         if nombre_usuario in df_usuarios['usuario'].astype(str).values:
             st.error("Ese cliente ya existe. Usa otro nombre o edítalo.")
             return
         nuevo_usuario = {
             'usuario': nombre_usuario,
             'nombre': nombre_real,
-            'contraseña': contraseña,
+            'contrasena': contraseña,
             'telefono': telefono,
             'rol': 'cliente'
         }
-        df_final = pd.concat([df_usuarios, pd.DataFrame([nuevo_usuario])], ignore_index=True)
-        df_final.to_excel(ARCHIVO_USUARIOS, index=False)
+        REPO.crear_usuario(nuevo_usuario)
         st.success("Cliente creado exitosamente. Ya puede recibir pedidos.")
 
 def editar_cliente():
     st.header("✏️ Editar cliente")
-    if not os.path.exists(ARCHIVO_USUARIOS):
+    df_usuarios = REPO.cargar_usuarios()
+    if df_usuarios.empty:
         st.info("No hay clientes registrados para editar.")
         return
-    df_usuarios = pd.read_excel(ARCHIVO_USUARIOS)
     clientes = df_usuarios[df_usuarios['rol'].astype(str).str.lower().str.strip() == "cliente"]['usuario'].dropna().unique()
     if not len(clientes):
         st.info("No hay clientes con rol 'cliente' para editar.")
@@ -258,17 +202,15 @@ def editar_cliente():
     nuevo_nombre = st.text_input("Nombre real", value=str(datos_actuales.get('nombre','')))
     nuevo_telefono = st.text_input("Teléfono", value=str(datos_actuales.get('telefono','')))
     if st.button("Guardar cambios"):
-        df_usuarios.at[fila_idx, 'nombre'] = nuevo_nombre
-        df_usuarios.at[fila_idx, 'telefono'] = nuevo_telefono
-        df_usuarios.to_excel(ARCHIVO_USUARIOS, index=False)
+        REPO.actualizar_usuario(cliente, {'nombre': nuevo_nombre, 'telefono': nuevo_telefono})
         st.success("Datos del cliente actualizados correctamente.")
 
 def borrar_cliente():
     st.header("🗑️ Borrar cliente")
-    if not os.path.exists(ARCHIVO_USUARIOS):
+    df_usuarios = REPO.cargar_usuarios()
+    if df_usuarios.empty:
         st.info("No hay clientes para borrar.")
         return
-    df_usuarios = pd.read_excel(ARCHIVO_USUARIOS)
     clientes = df_usuarios[df_usuarios['rol'].astype(str).str.lower().str.strip() == "cliente"]['usuario'].dropna().unique()
     if not len(clientes):
         st.info("No hay clientes con rol 'cliente' para borrar.")
@@ -280,9 +222,7 @@ def borrar_cliente():
     seguro = st.checkbox("Estoy seguro de borrar este cliente", value=False)
     confirmar = st.button("Borrar cliente", disabled=not seguro)
     if confirmar and seguro:
-        fila_idx = df_usuarios[df_usuarios['usuario'] == cliente].index[0]
-        df_usuarios_new = df_usuarios.drop(fila_idx)
-        df_usuarios_new.to_excel(ARCHIVO_USUARIOS, index=False)
+        REPO.eliminar_usuario(cliente)
         st.success(f"Cliente '{cliente}' borrado correctamente.")
         if tiene_pedidos:
             st.warning("¡Este cliente tenía pedidos registrados! Estos datos NO se han borrado del historial de pedidos.")
@@ -320,7 +260,6 @@ def registrar_pedido():
     fecha_pedido = st.date_input("Fecha del pedido", value=sugerir_fecha)
     detalle = st.text_input("Detalle (opcional)")
     if st.button("Agregar pedido"):
-        df_pedidos = cargar_todos_pedidos()
         if producto.lower() == "cafe" and pred_usada:
             pred_fecha, kg_predichos, diferencia_dias, diferencia_kg = comprobar_prediccion_cafe(fecha_pedido, cantidad_pedido)
             st.success(f"Comparación con predicción:\n"  f"Predicción: {kg_predichos:.1f} kg para {pred_fecha.date()}\n"  f"Pedido real: {cantidad_pedido:.1f} kg para {fecha_pedido}\n"  f"Diferencia: {diferencia_dias:+} días, {diferencia_kg:+.1f} kg")
@@ -335,21 +274,12 @@ def registrar_pedido():
             'detalle': detalle,
             'fecha': fecha_pedido
         }
-        df_final = pd.concat([df_pedidos, pd.DataFrame([nuevo_pedido])], ignore_index=True)
-        df_final.to_excel(ARCHIVO_PEDIDOS, index=False)
+        REPO.guardar_pedido(nuevo_pedido)
         st.success("Pedido registrado. Comparación (y predicción usada) guardada en control auxiliar y archivo de predicciones actualizado.")
 
 # ------------ GESTIÓN DE ELIMINACIÓN DE PEDIDOS ------------
 def guardar_log_eliminacion(fila_eliminada, usuario):
-    fila_elim = fila_eliminada.to_dict()
-    fila_elim["usuario"] = usuario
-    fila_elim["fecha_eliminacion"] = datetime.datetime.now()
-    if os.path.exists(ARCHIVO_ELIMINADOS):
-        df_log = pd.read_excel(ARCHIVO_ELIMINADOS)
-    else:
-        df_log = pd.DataFrame()
-    df_nuevo = pd.concat([df_log, pd.DataFrame([fila_elim])], ignore_index=True)
-    df_nuevo.to_excel(ARCHIVO_ELIMINADOS, index=False)
+    REPO.registrar_eliminacion(fila_eliminada.to_dict(), usuario)
 
 def eliminar_pedido():
     st.header("🗑️ Eliminar pedido")
@@ -376,8 +306,7 @@ def eliminar_pedido():
     confirmar = st.button("Eliminar pedido", disabled=not seguro)
     if confirmar and seguro:
         guardar_log_eliminacion(df_filtrado.loc[idx_seleccionado], usuario)
-        df_nuevo = df_pedidos.drop(idx_seleccionado)
-        df_nuevo.to_excel(ARCHIVO_PEDIDOS, index=False)
+        REPO.eliminar_pedido(idx_seleccionado)
         st.success("Pedido eliminado y guardado en registro de auditoría.")
 
 # ------------ ESTADÍSTICAS Y DASHBOARD ------------
@@ -400,8 +329,8 @@ def resumen_estadisticas_globales():
     else:
         st.info("No hay datos de pedidos.")
     # Exactitud (si hay)
-    if os.path.exists(ARCHIVO_COMPARACION):
-        comp = pd.read_excel(ARCHIVO_COMPARACION)
+    comp = REPO.cargar_comparaciones()
+    if not comp.empty:
         comp = comp[comp['fue_pred_usada'] == True]
         if not comp.empty:
             st.subheader("Exactitud modelo de predicción (solo pedidos asociados)")
@@ -414,22 +343,17 @@ def resumen_estadisticas_globales():
             st.write(f"- Desviación estándar días: {std_dia:.2f}")
             st.write(f"- Desviación estándar kg: {std_kg:.2f}")
             st.markdown("#### Distribución de diferencias (hist)")
-            fig, ax = plt.subplots(1,2,figsize=(10,4))
-            comp['dif_dias'].hist(ax=ax[0], bins=15, color="tab:blue")
-            ax[0].set_title("Diferencia vs predicción (días)")
-            ax[0].set_xlabel("Dif. días")
-            ax[0].set_ylabel("Número de pedidos")
-            comp['dif_kg'].hist(ax=ax[1], bins=15, color="tab:green")
-            ax[1].set_title("Diferencia vs predicción (kg)")
-            ax[1].set_xlabel("Dif. kg")
-            st.pyplot(fig)
+            graficas.mostrar(graficas.histogramas, [comp['dif_dias'], comp['dif_kg']], bins=15,
+                             colores=["tab:blue", "tab:green"],
+                             titulos=["Diferencia vs predicción (días)", "Diferencia vs predicción (kg)"],
+                             xlabels=["Dif. días", "Dif. kg"], ylabel="Número de pedidos")
         else:
             st.info("No hay pedidos asociados a predicción para evaluar exactitud.")
     else:
         st.info("Archivo de comparaciones no encontrado.")
     # Auditoría eliminaciones
-    if os.path.exists(ARCHIVO_ELIMINADOS):
-        elim = pd.read_excel(ARCHIVO_ELIMINADOS)
+    elim = REPO.cargar_eliminaciones()
+    if not elim.empty:
         st.subheader("Auditoría: Pedidos eliminados")
         st.write(f"Pedidos eliminados: {len(elim)}")
         st.dataframe(elim[['cliente_id','producto','cantidad','fecha','fecha_eliminacion','usuario']])
@@ -455,6 +379,17 @@ opcion = st.sidebar.radio("Opciones:", [
     "Salir"
 ])
 
+# Exportación bajo demanda del almacén a .xlsx
+if REPO.nombre == "excel":
+    with st.sidebar.expander("⬇️ Exportar a Excel"):
+        archivos_export = [REPO.archivo(c) for c in ARCHIVOS if REPO.almacen.existe(REPO.archivo(c))]
+        if archivos_export:
+            archivo_export = st.selectbox("Archivo", archivos_export, format_func=os.path.basename)
+            # El libro se genera solo al pulsar (callable), no en cada ejecución
+            st.download_button("Descargar .xlsx", data=lambda: REPO.almacen.exportar_xlsx(archivo_export),
+                               file_name=os.path.basename(archivo_export),
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
 if opcion == "Resumen/Estadísticas":
     resumen_estadisticas_globales()
 elif opcion == "Clientes":
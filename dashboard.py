@@ -1,15 +1,14 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
 import mysql.connector
 from mysql.connector import Error
 from dotenv import load_dotenv
-import openpyxl
 import datetime
 import os
 
+from servicios import cobertura_inventario, graficas, resumen_mensual
+from servicios.cache_consultas import consulta_cacheada
+
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(dotenv_path)
 
@@ -41,6 +40,32 @@ def obtener_pedidos_reales():
             st.error(f"⚠️ Error al obtener pedidos: {e}")
     return pd.DataFrame(columns=["fecha", "valor"])
 
+class _SinConexion(Exception):
+    pass
+
+# El GROUP BY recorre todos los pedidos: se cachea hasta que cambie la tabla
+# (o venza el TTL, si escribe otro proceso). Sin conexión o con error no se
+# cachea nada, para reintentar en la siguiente ejecución.
+@consulta_cacheada("pedidos")
+def _resumen_mensual_pedidos():
+    conn = get_connection()
+    if not conn:
+        raise _SinConexion()
+    try:
+        query = "SELECT YEAR(fecha) AS anio, MONTH(fecha) AS mes, SUM(valor) AS kg_real FROM pedidos GROUP BY YEAR(fecha), MONTH(fecha);"
+        return pd.read_sql(query, conn)
+    finally:
+        conn.close()
+
+def obtener_resumen_mensual():
+    try:
+        return _resumen_mensual_pedidos()
+    except _SinConexion:
+        pass
+    except Error as e:
+        st.error(f"⚠️ Error al obtener resumen mensual: {e}")
+    return pd.DataFrame(columns=["anio", "mes", "kg_real"])
+
 def obtener_inventario():
     conn = get_connection()
     if conn:
@@ -104,11 +129,8 @@ with tab1:
 
 with tab2:
     st.subheader("Histograma de Kg Predichos")
-    fig, ax = plt.subplots()
-    ax.hist(df_vista['kg_predicho'].dropna().astype(float), bins=10, color=PALETA_CAFE[1], edgecolor=PALETA_CAFE[0])
-    ax.set_xlabel("Kg Predichos")
-    ax.set_ylabel("Frecuencia")
-    st.pyplot(fig)
+    graficas.mostrar(graficas.histograma, df_vista['kg_predicho'].dropna().astype(float),
+                     bins=10, color=PALETA_CAFE[1], edgecolor=PALETA_CAFE[0], xlabel="Kg Predichos")
 
 with tab3:
     st.subheader("Heatmap Día vs Mes")
@@ -117,68 +139,19 @@ with tab3:
     df_vista_copy['Día'] = df_vista_copy['fecha'].dt.strftime('%A')
     tabla = pd.pivot_table(df_vista_copy, values='kg_predicho', index='Día', columns='Mes', aggfunc='sum')
     if not tabla.empty:
-        fig2, ax2 = plt.subplots(figsize=(10, 6))
-        sns.heatmap(tabla, cmap="YlOrBr", annot=True, fmt=".1f", ax=ax2)
-        st.pyplot(fig2)
+        graficas.mostrar(graficas.heatmap, tabla, cmap="YlOrBr", annot=True, fmt=".1f")
     else:
         st.warning("No hay suficientes datos para generar el heatmap")
 
 # -------- TAB 4: COMPARATIVA Y EVOLUCIÓN POR AÑO --------
 with tab4:
     st.subheader("Consumo anterior y consumo esperado ")
-    # Define meses en inglés (puedes cambiar a español si gustas)
-    meses_orden = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
-
-    # Preprocesa históricos y predicciones
-    pedidos_reales['anio'] = pedidos_reales['fecha'].dt.year
-    pedidos_reales['mes'] = pedidos_reales['fecha'].dt.month
-    pedidos_reales['mes_lab'] = pedidos_reales['fecha'].dt.strftime('%b')
-
-    df_pred['anio'] = df_pred['Fecha'].dt.year
-    df_pred['mes'] = df_pred['Fecha'].dt.month
-    df_pred['mes_lab'] = df_pred['Fecha'].dt.strftime('%b')
-
-    pivot_hist = pedidos_reales.pivot_table(index='mes_lab', columns='anio', values='valor', aggfunc='sum').reindex(meses_orden).fillna(0)
-    pivot_pred = df_pred.pivot_table(index='mes_lab', columns='anio', values='Kg_Predichos', aggfunc='sum').reindex(meses_orden).fillna(0)
-
-    todos_anios = sorted(list(set(pivot_hist.columns.tolist() + pivot_pred.columns.tolist())))
-    
-    # Colores y hatched
-    color_list_hist = ['#b3c6f7', '#6699ff', '#3366cc', '#003399', '#001147']
-    color_list_pred = ['#ffcccc', '#ff6666', '#ff3300', '#cc0000', '#660000']
-    borde_rojo_list = ['#ff3333', '#cc0000', '#990000', '#660000', '#330000']
-
-    fig, ax = plt.subplots(figsize=(12,7))
-    bar_width = 0.7 / len(todos_anios)
-    x = np.arange(len(meses_orden))
-
-    for i, anio in enumerate(todos_anios):
-        vals_hist = pivot_hist[anio].values if anio in pivot_hist.columns else np.zeros(len(meses_orden))
-        if np.any(vals_hist > 0):
-            offset = (i - len(todos_anios)/2)*bar_width
-            ax.bar(x+offset, vals_hist, width=bar_width, color=color_list_hist[i%5], alpha=0.87, label=f"Hist {anio}")
-    for i, anio in enumerate(todos_anios):
-        vals_pred = pivot_pred[anio].values if anio in pivot_pred.columns else np.zeros(len(meses_orden))
-        if np.any(vals_pred > 0):
-            offset = (i - len(todos_anios)/2)*bar_width
-            ax.bar(x+offset, vals_pred, width=bar_width,
-                   color=color_list_pred[i%5],
-                   edgecolor=borde_rojo_list[i%5],
-                   linewidth=1.8,
-                   alpha=0.70,
-                   label=f'Prev {anio}',
-                   hatch='//')
-
-    ax.set_xlabel('Mes')
-    ax.set_ylabel('Kg')
-    ax.set_xticks(x)
-    ax.set_xticklabels(meses_orden, fontsize=10)
-    # **Ajuste ticks cada 10 kg**
-    max_kgs = int((ax.get_ylim()[1] // 10 + 1) * 10)
-    ax.set_yticks(np.arange(0, max_kgs+1, 10))
-    ax.legend(fontsize=10)
-    ax.grid(True, axis='y', alpha=0.18)
-    st.pyplot(fig)
+    # Solo se transfieren los totales por año y mes (≤ 12 filas por año)
+    pred_mensual = (df_pred.dropna(subset=['Fecha'])
+                    .groupby([df_pred['Fecha'].dt.year.rename('anio'), df_pred['Fecha'].dt.month.rename('mes')])['Kg_Predichos']
+                    .sum().rename('kg_predicho').reset_index())
+    resumen = pd.merge(obtener_resumen_mensual(), pred_mensual, on=['anio', 'mes'], how='outer').fillna(0)
+    graficas.mostrar(resumen_mensual.figura_comparativa_mensual, resumen)
 
 
 with tab5:
@@ -189,7 +162,7 @@ with tab5:
     fecha_final = st.date_input("Selecciona la fecha límite", value=hoy + datetime.timedelta(weeks=4),
                                 min_value=fecha_inicio, max_value=fecha_max)
     mask_pred = (df_pred['Fecha'].dt.date >= fecha_inicio) & (df_pred['Fecha'].dt.date <= fecha_final)
-    consumo_periodo = df_pred.loc[mask_pred, 'Kg_Predichos'].astype(float).sum()
+    consumo_periodo = float(cobertura_inventario.consumo_hasta(df_pred['Fecha'], df_pred['Kg_Predichos'], fecha_final, desde=fecha_inicio)[0])
     compra_necesaria = max(0, consumo_periodo - inventario_actual)
     st.markdown(f"""
     **Periodo:** {fecha_inicio.strftime('%d/%m/%Y')} → {fecha_final.strftime('%d/%m/%Y')}  
@@ -204,23 +177,18 @@ nuevo_inventario = st.sidebar.number_input("Inventario actual (kg):", 0.0, 10000
 if st.sidebar.button("Actualizar inventario"):
     actualizar_inventario(nuevo_inventario)
 
-sum_kg, dias_stock, fecha_quiebre = 0, 0, None
-for idx, row in df_pred.iterrows():
-    if sum_kg < nuevo_inventario:
-        sum_kg += float(row['Kg_Predichos'])
-        dias_stock += 1
-        fecha_quiebre = row['Fecha']
-    else:
-        break
-
-hoy = pd.to_datetime(datetime.date.today())
-prox_pred = df_merged[df_merged['fecha'] >= hoy]
-prox_prediccion = prox_pred['kg_predicho'].iloc[0] if not prox_pred.empty else 0.0
+fechas_fut, consumo_fut, _ = cobertura_inventario.preparar_consumo(df_pred['Fecha'], df_pred['Kg_Predichos'])
+cob = cobertura_inventario.cobertura(df_pred['Fecha'], df_pred['Kg_Predichos'], nuevo_inventario)
+dias_stock = cob['pedidos_cubiertos']
+prox_prediccion = consumo_fut[0] if len(consumo_fut) else 0.0
 
 if nuevo_inventario < float(prox_prediccion):
     st.sidebar.error(f"⚠️ Inventario insuficiente ({nuevo_inventario:.1f} kg). No cubre el siguiente pedido ({prox_prediccion:.1f} kg).")
+elif cob['alcanza']:
+    st.sidebar.success(f"Inven. OK: {nuevo_inventario:.1f} kg. Cubre todas las predicciones disponibles.")
 else:
+    fecha_quiebre = cob['fecha_quiebre']
     st.sidebar.success(f"Inven. OK: {nuevo_inventario:.1f} kg. Cubre hasta el {fecha_quiebre.strftime('%d/%m/%Y')}")
     st.sidebar.metric("Pedidos cubiertos", dias_stock, delta=f"Hasta {fecha_quiebre.strftime('%d/%m/%Y')}")
     st.sidebar.write("Detalle del consumo proyectado:")
-    st.sidebar.dataframe(df_pred.loc[:dias_stock-1, ['Fecha', 'Kg_Predichos']])
+    st.sidebar.dataframe(pd.DataFrame({'Fecha': fechas_fut[:dias_stock], 'Kg_Predichos': consumo_fut[:dias_stock]}))
@@ -4,202 +4,328 @@
 # ============================================================================
 # IMPORTACIONES
 # ============================================================================
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
 import streamlit as st
 import datetime
-import os
+
+from servicios.conexion import obtener_engine
+from servicios.cache_consultas import consulta_cacheada, invalida_tablas, invalidar
+from servicios.paginacion import pagina_keyset
+from servicios import (cobertura_inventario, cuentas_clientes, diagnostico, estadisticas,
+                       exactitud_predicciones, graficas, importacion, resumen_mensual, tabla_paginada)
+from servicios.carga_paralela import cargar_en_paralelo
+from servicios.entregas import entregar_pendientes
+from servicios.estado_inventario import ConflictoInventario
+from servicios.escritura import insertar
+from servicios.repositorios import obtener_repositorio
 
 # ============================================================================
 # CONFIGURACIÓN DE CONEXIÓN A MYSQL
 # ============================================================================
-MYSQL_USER = os.getenv("DB_USER")
-MYSQL_PASS = os.getenv("DB_PASSWORD")
-MYSQL_HOST = os.getenv("DB_HOST")
-MYSQL_DB = os.getenv("DB_DATABASE")
-MYSQL_PORT = int(os.getenv("DB_PORT"))
-
-
+# Las credenciales (DB_*) y el tamaño del pool (DB_POOL_*) se leen del .env en
+# servicios/conexion.py; el engine vive fuera del ciclo de re-ejecución.
+# Con CAFE_BACKEND=sqlite se usa la base local sembrada desde datos_prueba/*.csv.
 def get_connection():
-    """Establece una conexión a la base de datos MySQL utilizando SQLAlchemy."""
+    """Devuelve el engine compartido del proceso (pool de conexiones MySQL o SQLite)."""
     try:
-        ENGINE = create_engine(f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASS}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}")
-        # Probar la conexión para asegurarnos de que los parámetros son correctos y la base de datos es accesible
-        return ENGINE
+        return obtener_engine()
     except Exception as e:
         st.error(f"Error al conectar a la base de datos: {e}")
         return None
 ENGINE = get_connection()
+# Operaciones comunes (pedidos, inventario, predicciones, usuarios, pagos, logs)
+REPO = obtener_repositorio(ENGINE.dialect.name) if ENGINE is not None else None
 # ============================================================================
 # FUNCIONES DE ACCESO A DATOS - PEDIDOS
 # ============================================================================
 def cargar_todos_pedidos():
     """Carga todos los pedidos básicos"""
-    query = "SELECT cliente_id, producto, cantidad, detalle, fecha FROM pedidos_cliente"
-    return pd.read_sql(query, ENGINE)
-
-def cargar_todos_pedidos_sql():
-    """Carga todos los pedidos con ID"""
-    with ENGINE.connect() as conn:
-        df = pd.read_sql("SELECT * FROM pedidos_cliente", conn)
-        return df
+    return REPO.cargar_pedidos()[['cliente_id', 'producto', 'cantidad', 'detalle', 'fecha']]
 
 def guardar_pedido(nuevo_pedido):
     """Guarda un nuevo pedido en la base de datos"""
-    df_nuevo = pd.DataFrame([nuevo_pedido])
-    df_nuevo.to_sql('pedidos_cliente', ENGINE, if_exists='append', index=False)
+    REPO.guardar_pedido(nuevo_pedido)
 
 def eliminar_pedido_sql(id_pedido):
     """Elimina un pedido por ID"""
-    with ENGINE.begin() as conn:
-        conn.execute(text("DELETE FROM pedidos_cliente WHERE id=:id"), {"id": id_pedido})
+    REPO.eliminar_pedido(id_pedido)
 
+@invalida_tablas("pedidos_pendientes")
 def registrar_pedido_pendiente(pedido):
     """Registra un pedido pendiente de envío"""
-    pd.DataFrame([pedido]).to_sql('pedidos_pendientes', ENGINE, if_exists='append', index=False)
+    insertar(ENGINE, 'pedidos_pendientes', pedido)
+
+@consulta_cacheada("pedidos_pendientes")
+def cargar_pedidos_pendientes():
+    """Carga los pedidos pendientes de envío, los más recientes primero"""
+    return pd.read_sql("SELECT * FROM pedidos_pendientes ORDER BY fecha DESC", ENGINE)
+
+def _filtro_pedidos(producto=None, cliente=None, fecha_ini=None, fecha_fin=None, id_pedido=None):
+    """Traduce los filtros de la vista a un WHERE parametrizado"""
+    condiciones, params = [], {}
+    if id_pedido is not None:
+        condiciones.append("id = :id_pedido")
+        params["id_pedido"] = int(id_pedido)
+    if producto is not None:
+        condiciones.append("producto = :producto")
+        params["producto"] = producto
+    if cliente is not None:
+        condiciones.append("cliente_id = :cliente")
+        params["cliente"] = cliente
+    if fecha_ini is not None:
+        condiciones.append("fecha >= :fecha_ini")
+        params["fecha_ini"] = datetime.datetime.combine(fecha_ini, datetime.time.min)
+    if fecha_fin is not None:
+        # Incluye todo el día final
+        condiciones.append("fecha < :fecha_fin")
+        params["fecha_fin"] = datetime.datetime.combine(fecha_fin + datetime.timedelta(days=1), datetime.time.min)
+    return " AND ".join(condiciones), params
+
+def cargar_pagina_pedidos(producto=None, cliente=None, fecha_ini=None, fecha_fin=None, cursor=None, limite=50):
+    """Carga una página de pedidos filtrados, del más reciente al más antiguo"""
+    where, params = _filtro_pedidos(producto, cliente, fecha_ini, fecha_fin)
+    return pagina_keyset(
+        ENGINE, "pedidos_cliente", "id, cliente_id, producto, cantidad, detalle, fecha",
+        where=where, params=params, cursor=cursor, limite=limite, orden=("fecha", "id")
+    )
+
+@consulta_cacheada("pedidos_cliente")
+def contar_pedidos(producto=None, cliente=None, fecha_ini=None, fecha_fin=None):
+    """Cuenta los pedidos que cumplen los filtros"""
+    where, params = _filtro_pedidos(producto, cliente, fecha_ini, fecha_fin)
+    query = "SELECT COUNT(*) AS n FROM pedidos_cliente" + (f" WHERE {where}" if where else "")
+    return int(pd.read_sql(text(query), ENGINE, params=params)['n'].iloc[0])
+
+LIMITE_CANDIDATOS = 200
+
+@consulta_cacheada("pedidos_cliente")
+def buscar_pedidos(id_pedido=None, cliente=None, producto=None, fecha_ini=None, fecha_fin=None, limite=LIMITE_CANDIDATOS):
+    """Los `limite` pedidos más recientes que cumplen los filtros.
+
+    Devuelve (df indexado por id, {id: etiqueta}, hay_mas) para el selector de Eliminar pedido.
+    """
+    where, params = _filtro_pedidos(producto, cliente, fecha_ini, fecha_fin, id_pedido)
+    df, siguiente = pagina_keyset(
+        ENGINE, "pedidos_cliente", "id, cliente_id, producto, cantidad, detalle, fecha",
+        where=where, params=params, limite=limite, orden=("fecha", "id")
+    )
+    df['info'] = ("ID " + df['id'].astype(str) + " | " + df['cliente_id'].astype(str) + " | "
+                  + df['producto'].astype(str) + " | " + df['cantidad'].astype(str) + " kg | " + df['fecha'].astype(str))
+    df = df.set_index('id', drop=False)
+    return df, dict(zip(df['id'], df['info'])), siguiente is not None
+
+@consulta_cacheada("pedidos_cliente")
+def cliente_tiene_pedidos(cliente):
+    """True si el cliente tiene al menos un pedido (una fila por el índice de cliente_id)"""
+    with ENGINE.connect() as conn:
+        return conn.execute(text("SELECT 1 FROM pedidos_cliente WHERE cliente_id = :c LIMIT 1"), {"c": cliente}).first() is not None
+
+@consulta_cacheada("pedidos_cliente")
+def cargar_productos_pedidos():
+    """Productos distintos presentes en los pedidos"""
+    df = pd.read_sql("SELECT DISTINCT producto FROM pedidos_cliente WHERE producto IS NOT NULL", ENGINE)
+    return sorted(df['producto'].astype(str).tolist())
+
+@consulta_cacheada("pedidos_cliente")
+def cargar_clientes_pedidos(producto=None):
+    """Clientes distintos con pedidos (opcionalmente de un producto)"""
+    where, params = _filtro_pedidos(producto=producto)
+    query = "SELECT DISTINCT cliente_id FROM pedidos_cliente WHERE cliente_id IS NOT NULL"
+    if where:
+        query += f" AND ({where})"
+    df = pd.read_sql(text(query), ENGINE, params=params)
+    return sorted(df['cliente_id'].astype(str).tolist())
+
+@consulta_cacheada("pedidos_cliente")
+def rango_fechas_pedidos(producto=None, cliente=None):
+    """Fecha mínima y máxima de los pedidos filtrados"""
+    where, params = _filtro_pedidos(producto, cliente)
+    query = "SELECT MIN(fecha) AS fmin, MAX(fecha) AS fmax FROM pedidos_cliente" + (f" WHERE {where}" if where else "")
+    fila = pd.read_sql(text(query), ENGINE, params=params).iloc[0]
+    return pd.to_datetime(fila['fmin']), pd.to_datetime(fila['fmax'])
+
+@consulta_cacheada("pedidos_cliente")
+def evolucion_pedidos(producto=None, cliente=None, fecha_ini=None, fecha_fin=None):
+    """Kg totales por día de los pedidos filtrados"""
+    where, params = _filtro_pedidos(producto, cliente, fecha_ini, fecha_fin)
+    query = "SELECT DATE(fecha) AS fecha, SUM(cantidad) AS cantidad FROM pedidos_cliente"
+    if where:
+        query += f" WHERE {where}"
+    query += " GROUP BY DATE(fecha) ORDER BY DATE(fecha)"
+    df = pd.read_sql(text(query), ENGINE, params=params)
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df
 
 # ============================================================================
 # FUNCIONES DE ACCESO A DATOS - INVENTARIO
 # ============================================================================
 def obtener_inventario_actual():
     """Obtiene el inventario actual de café"""
-    df = pd.read_sql("SELECT * FROM inventario_cafe ORDER BY fecha_actualizacion DESC LIMIT 1", ENGINE)
-    if df.empty:
-        return {'cantidad_kg': 50.0, 'fecha_actualizacion': pd.Timestamp.now()}
-    return df.iloc[0].to_dict()
+    return REPO.inventario_actual()
 
 def actualizar_inventario(nueva_cantidad, usuario):
     """Actualiza el inventario y registra el movimiento"""
-    anterior = obtener_inventario_actual()["cantidad_kg"]
-    fecha_actual = pd.Timestamp.now()
-    
-    # Actualizar inventario
-    data = {
-        "cantidad_kg": nueva_cantidad,
-        "fecha_actualizacion": fecha_actual
-    }
-    pd.DataFrame([data]).to_sql('inventario_cafe', ENGINE, if_exists='append', index=False)
-    
-    # Registrar movimiento
-    mov = {
-        "cantidad_antes": anterior,
-        "cantidad_despues": nueva_cantidad,
-        "fecha_cambio": fecha_actual,
-        "usuario": usuario
-    }
-    pd.DataFrame([mov]).to_sql('control_inventario_cafe', ENGINE, if_exists='append', index=False)
+    return REPO.actualizar_inventario(nueva_cantidad, usuario)
 
 # ============================================================================
 # FUNCIONES DE ACCESO A DATOS - PREDICCIONES
 # ============================================================================
 def cargar_predicciones():
     """Carga las predicciones de consumo"""
-    df = pd.read_sql("SELECT Fecha, Kg_Predichos FROM predicciones_cafe_365_dias", ENGINE)
-    df['fecha'] = pd.to_datetime(df['Fecha'])
-    df['prediccion'] = pd.to_numeric(df['Kg_Predichos'])
-    df = df[df['fecha'].notnull()].sort_values('fecha')
-    return df[['fecha','prediccion']]
+    return REPO.cargar_predicciones()
+
+@consulta_cacheada("predicciones_cafe_365_dias")
+def cargar_predicciones_crudas():
+    """Carga las predicciones tal como están en la tabla (Fecha, Kg_Predichos)"""
+    return pd.read_sql("SELECT Fecha, Kg_Predichos FROM predicciones_cafe_365_dias", ENGINE)
 
 def eliminar_prediccion_usada(fecha_pred_usada, kg_predichos):
     """Elimina una predicción ya utilizada"""
-    with ENGINE.begin() as conn:
-        conn.execute(text(
-            "DELETE FROM predicciones_cafe_365_dias WHERE Fecha=:fecha AND Kg_Predichos=:kg"
-        ), {"fecha": fecha_pred_usada, "kg": kg_predichos})
+    REPO.eliminar_prediccion(fecha_pred_usada, kg_predichos)
 
 # ============================================================================
 # FUNCIONES DE ACCESO A DATOS - USUARIOS/CLIENTES
 # ============================================================================
 def cargar_clientes_usuarios():
     """Carga la lista de clientes"""
-    query = "SELECT usuario FROM usuarios WHERE rol='cliente'"
-    df = pd.read_sql(query, ENGINE)
-    return sorted(df['usuario'].dropna().astype(str).tolist())
+    return REPO.cargar_clientes()
+
+@consulta_cacheada("usuarios")
+def cargar_usuarios_clientes():
+    """Carga los usuarios con rol cliente y todos sus datos"""
+    return pd.read_sql("SELECT * FROM usuarios WHERE rol='cliente'", ENGINE)
 
 def crear_cliente(nuevo_usuario):
     """Crea un nuevo cliente"""
-    pd.DataFrame([nuevo_usuario]).to_sql('usuarios', ENGINE, if_exists='append', index=False)
+    REPO.crear_usuario(nuevo_usuario)
+
+# ============================================================================
+# FUNCIONES DE ACCESO A DATOS - PRODUCTOS
+# ============================================================================
+@consulta_cacheada("precios_producto")
+def cargar_productos():
+    """Carga la lista de nombres de productos"""
+    return pd.read_sql("SELECT nombre FROM precios_producto", ENGINE)['nombre'].tolist()
+
+@consulta_cacheada("precios_producto")
+def cargar_precios_productos():
+    """Carga la tabla de productos con su precio"""
+    return pd.read_sql("SELECT * FROM precios_producto", ENGINE)
+
+# Tablas históricas que se muestran paginadas (servicios.tabla_paginada)
+ENTREGAS_CLIENTE = dict(tabla="log_pedidos_entregados", orden=("fecha_entrega", "id"),
+                        columnas="id, cliente_id, producto, cantidad, detalle, fecha_solicitada, fecha_entrega",
+                        where="cliente_id = :cliente")
+PAGOS_CLIENTE = dict(tabla="pagos_cliente", orden=("fecha_pago", "id"),
+                     columnas="id, cliente_id, monto, fecha_pago, observaciones", where="cliente_id = :cliente")
+HISTORIAL_INVENTARIO = dict(tabla="control_inventario_cafe", orden=("fecha_cambio", "id"),
+                            columnas="id, cantidad_antes, cantidad_despues, fecha_cambio, usuario")
+ELIMINACIONES = dict(tabla="log_eliminaciones_pedidos", orden=("fecha_eliminacion", "id"),
+                     columnas="id, cliente_id, producto, cantidad, fecha, fecha_eliminacion, usuario")
+COMPARACIONES = dict(tabla="comparacion_prediccion_vs_real", orden=("fecha_real", "id"),
+                     columnas="id, cliente_id, fecha_real, kg_real, fecha_predicha, kg_predicha, dif_dias, dif_kg")
 
 # ============================================================================
 # FUNCIONES DE ACCESO A DATOS - LOGS Y COMPARACIONES
 # ============================================================================
 def guardar_log_eliminacion(fila_eliminada, usuario):
     """Guarda el log de una eliminación de pedido"""
-    fila_elim = dict(fila_eliminada)
-    fila_elim["usuario"] = usuario
-    fila_elim["fecha_eliminacion"] = pd.Timestamp.now()
-    pd.DataFrame([fila_elim]).to_sql('log_eliminaciones_pedidos', ENGINE, if_exists='append', index=False)
+    REPO.registrar_eliminacion(fila_eliminada, usuario)
 
 def guardar_comparacion_predicion(datos):
     """Guarda una comparación entre predicción y realidad"""
-    pd.DataFrame([datos]).to_sql('comparacion_prediccion_vs_real', ENGINE, if_exists='append', index=False)
+    REPO.guardar_comparacion(datos)
+
+def _filtro_comparaciones(cliente=None):
+    return ("cliente_id = :cliente", {"cliente": cliente}) if cliente is not None else (None, {})
+
+def _errores_comparacion(df_comp):
+    """Columnas de error y acierto (±1 kg y ±1 día) de una página de comparaciones"""
+    df_comp['error_kg'] = (df_comp['kg_real'] - df_comp['kg_predicha']).abs()
+    df_comp['error_dias'] = df_comp['dif_dias'].abs()
+    df_comp['ACIERTO_CONJUNTO'] = ((df_comp["error_kg"] <= 1) & (df_comp["error_dias"] <= 1)).map({True: "✅", False: ""})
+    return df_comp
+
+@consulta_cacheada("comparacion_prediccion_vs_real")
+def cargar_errores_comparaciones(cliente=None):
+    """Errores absolutos (kg y días) de todas las comparaciones, para los histogramas"""
+    where, params = _filtro_comparaciones(cliente)
+    query = ("SELECT ABS(kg_real - kg_predicha) AS error_kg, ABS(dif_dias) AS error_dias "
+             "FROM comparacion_prediccion_vs_real" + (f" WHERE {where}" if where else ""))
+    return pd.read_sql(text(query), ENGINE, params=params)
 
 # ============================================================================
 # VISTAS DE LA APLICACIÓN - VER PEDIDOS
 # ============================================================================
+def _reiniciar_paginas_pedidos():
+    st.session_state["ver_pedidos_cursores"] = [None]
+
+def _pagina_siguiente_pedidos(cursor):
+    st.session_state["ver_pedidos_cursores"].append(cursor)
+
+def _pagina_anterior_pedidos():
+    if len(st.session_state["ver_pedidos_cursores"]) > 1:
+        st.session_state["ver_pedidos_cursores"].pop()
+
 def vista_ver_pedidos():
     """Vista para visualizar y filtrar pedidos"""
     st.header("📦 Pedidos de clientes")
-    df_all = cargar_todos_pedidos()
+    productos = cargar_productos_pedidos()
     
-    if df_all.empty:
+    if not productos:
         st.info("No hay pedidos registrados.")
         return
 
     # Filtro por producto
-    productos_unicos = ["Todos"] + sorted(df_all['producto'].unique())
-    producto_filtro = st.selectbox("Filtrar por producto:", productos_unicos)
-    
-    if producto_filtro != "Todos":
-        df_filtrado = df_all[df_all['producto'] == producto_filtro]
-    else:
-        df_filtrado = df_all.copy()
+    productos_unicos = ["Todos"] + productos
+    producto_filtro = st.selectbox("Filtrar por producto:", productos_unicos, on_change=_reiniciar_paginas_pedidos)
+    producto = None if producto_filtro == "Todos" else producto_filtro
     
     # Filtro por cliente
-    clientes = ["Todos"] + sorted(df_filtrado['cliente_id'].unique())
-    cliente_seleccionado = st.selectbox("Filtrar por cliente:", clientes)
-    if cliente_seleccionado != "Todos":
-        df_filtrado = df_filtrado[df_filtrado['cliente_id'] == cliente_seleccionado]
+    clientes = ["Todos"] + cargar_clientes_pedidos(producto)
+    cliente_seleccionado = st.selectbox("Filtrar por cliente:", clientes, on_change=_reiniciar_paginas_pedidos)
+    cliente = None if cliente_seleccionado == "Todos" else cliente_seleccionado
 
     # Filtro por fechas
     st.markdown("#### Filtrar por rango de fechas (opcional)")
-    aplicar_filtro_fecha = st.checkbox("Filtrar por fechas", value=False)
-    fecha_min = df_filtrado['fecha'].min()
-    fecha_max = df_filtrado['fecha'].max()
+    aplicar_filtro_fecha = st.checkbox("Filtrar por fechas", value=False, on_change=_reiniciar_paginas_pedidos)
+    fecha_ini = fecha_fin = None
+    fecha_min, fecha_max = rango_fechas_pedidos(producto, cliente)
     
     if aplicar_filtro_fecha and pd.notnull(fecha_min) and pd.notnull(fecha_max):
-        fecha_ini, fecha_fin = st.date_input(
+        rango = st.date_input(
             "Selecciona rango:", 
-            value=(fecha_min, fecha_max), 
-            min_value=fecha_min, 
-            max_value=fecha_max
+            value=(fecha_min.date(), fecha_max.date()), 
+            min_value=fecha_min.date(), 
+            max_value=fecha_max.date(),
+            on_change=_reiniciar_paginas_pedidos
         )
-        df_filtrado = df_filtrado[
-            (df_filtrado['fecha'] >= pd.Timestamp(fecha_ini)) & 
-            (df_filtrado['fecha'] <= pd.Timestamp(fecha_fin))
-        ]
-
-    # Mostrar resultados
-    st.dataframe(df_filtrado.sort_values("fecha", ascending=False))
-    st.info(f"Total pedidos mostrados: {len(df_filtrado)}")
-
-    # Gráfica de evolución
-    if not df_filtrado.empty:
+        if len(rango) == 2:
+            fecha_ini, fecha_fin = rango
+
+    # Mostrar resultados (una página por consulta)
+    if "ver_pedidos_cursores" not in st.session_state:
+        _reiniciar_paginas_pedidos()
+    tam_pagina = st.selectbox("Pedidos por página:", [25, 50, 100, 200], index=1, on_change=_reiniciar_paginas_pedidos)
+    cursores = st.session_state["ver_pedidos_cursores"]
+    df_pagina, siguiente = cargar_pagina_pedidos(producto, cliente, fecha_ini, fecha_fin, cursor=cursores[-1], limite=tam_pagina)
+    st.dataframe(df_pagina.drop(columns=['id']))
+
+    total = contar_pedidos(producto, cliente, fecha_ini, fecha_fin)
+    st.info(f"Página {len(cursores)} · Total pedidos con estos filtros: {total}")
+    col_ant, col_sig = st.columns(2)
+    col_ant.button("⬅️ Anterior", on_click=_pagina_anterior_pedidos, disabled=len(cursores) == 1)
+    col_sig.button("Siguiente ➡️", on_click=_pagina_siguiente_pedidos, args=(siguiente,), disabled=siguiente is None)
+
+    # Gráfica de evolución (agregada en la base de datos)
+    if total:
         st.markdown("### Evolución de pedidos")
-        df_graf = df_filtrado.copy()
-        df_graf['fecha'] = pd.to_datetime(df_graf['fecha'])
-        df_graf = df_graf.groupby('fecha').agg({'cantidad':'sum'}).reset_index()
+        df_graf = evolucion_pedidos(producto, cliente, fecha_ini, fecha_fin)
         
         if len(df_graf) > 1:
-            fig, ax = plt.subplots(figsize=(10, 4))
-            ax.plot(df_graf['fecha'], df_graf['cantidad'], marker='o')
-            ax.set_title("Pedidos en el tiempo")
-            ax.set_xlabel("Fecha")
-            ax.set_ylabel("Cantidad total (kg)")
-            st.pyplot(fig)
+            graficas.mostrar(graficas.linea_tiempo, df_graf['fecha'], df_graf['cantidad'],
+                             titulo="Pedidos en el tiempo", xlabel="Fecha", ylabel="Cantidad total (kg)")
         else:
             st.info("No hay suficiente información para mostrar evolución (al menos 2 fechas únicas requeridas).")
 
@@ -228,36 +354,31 @@ def control_de_inventario():
     
     if st.button("Actualizar inventario"):
         if nueva_cant != cantidad_kg:
-            actualizar_inventario(nueva_cant, usuario)
-            st.success("Inventario actualizado correctamente.")
+            try:
+                movimiento = actualizar_inventario(nueva_cant, usuario)
+            except ConflictoInventario as e:
+                st.error(f"Otro usuario está actualizando el inventario; vuelve a intentarlo. ({e})")
+            else:
+                st.success("Inventario actualizado correctamente.")
+                if movimiento and movimiento["cantidad_antes"] != cantidad_kg:
+                    st.info(f"El inventario había cambiado a {movimiento['cantidad_antes']:.1f} kg "
+                            "mientras lo editabas; el movimiento se registró desde ese valor.")
         else:
             st.warning("La cantidad ingresada es igual a la actual.")
 
     # Historial de movimientos
     st.subheader("Historial de movimientos")
-    df_hist = pd.read_sql("SELECT * FROM control_inventario_cafe ORDER BY fecha_cambio DESC", ENGINE)
-    if df_hist.empty:
-        st.info("No hay movimientos registrados.")
-    else:
-        st.dataframe(df_hist)
+    tabla_paginada.mostrar("inventario_historial", ENGINE, **HISTORIAL_INVENTARIO,
+                           visibles=['cantidad_antes', 'cantidad_despues', 'fecha_cambio', 'usuario'],
+                           texto_vacio="No hay movimientos registrados.")
 
     # Predicción de duración del inventario
     df_pred = cargar_predicciones()
     if not df_pred.empty and cantidad_kg > 0:
-        hoy = pd.Timestamp(datetime.date.today())
-        df_pred_fut = df_pred[df_pred['fecha'] >= hoy]
-        dias_rest = None
-        suma_acum = 0
-        
-        for i, row in df_pred_fut.iterrows():
-            suma_acum += row['prediccion']
-            if suma_acum >= cantidad_kg:
-                dias_rest = i + 1
-                fecha_lim = row['fecha']
-                break
+        cob = cobertura_inventario.cobertura(df_pred['fecha'], df_pred['prediccion'], cantidad_kg)
         
-        if dias_rest is not None:
-            st.info(f"Te quedan **{dias_rest} días** de inventario actual según predicción. Fecha límite: **{fecha_lim.date()}**")
+        if not cob['alcanza'] and pd.notnull(cob['fecha_quiebre']):
+            st.info(f"Te quedan **{cob['dias_cubiertos']:.0f} días** ({cob['pedidos_cubiertos']} pedidos) de inventario actual según predicción. Fecha límite: **{cob['fecha_quiebre'].date()}**")
         else:
             st.warning("No se pudo estimar el fin de inventario con las predicciones actuales.")
     else:
@@ -305,8 +426,7 @@ def registrar_pedido():
     cliente = st.selectbox("Cliente", clientes_validos)
     
     # Cargar productos desde base de datos
-    productos_df = pd.read_sql("SELECT nombre FROM precios_producto", ENGINE)
-    productos_lista = productos_df['nombre'].tolist()
+    productos_lista = cargar_productos()
     producto = st.selectbox("Producto", productos_lista)
     
     cantidad_pedido = st.number_input("Cantidad (kg)", min_value=0.0, max_value=99999.0, value=sugerir_kg)
@@ -331,52 +451,121 @@ def eliminar_pedido():
     """Vista para eliminar pedidos"""
     st.header("🗑️ Eliminar pedido")
     usuario = st.session_state.get("usuario", "desconocido")
-    df_pedidos = cargar_todos_pedidos_sql()
-    
-    if df_pedidos.empty:
-        st.info("No hay pedidos registrados para eliminar.")
-        return
 
-    # Filtros
-    clientes = ["Todos"] + sorted(df_pedidos['cliente_id'].dropna().unique())
-    cliente_seleccionado = st.selectbox("Filtrar por cliente", clientes)
-    df_filtrado = df_pedidos[df_pedidos['cliente_id'] == cliente_seleccionado].copy() if cliente_seleccionado != "Todos" else df_pedidos.copy()
-    
-    fechas = ["Todas"] + sorted(list(set(str(f)[:10] for f in df_filtrado['fecha'] if pd.notna(f))))
-    fecha_seleccionada = st.selectbox("Filtrar por fecha", fechas)
-    if fecha_seleccionada != "Todas":
-        df_filtrado = df_filtrado[df_filtrado['fecha'].astype(str).str.startswith(fecha_seleccionada)]
-
-    # Ordenar por ID descendente
-    df_filtrado = df_filtrado.sort_values("id", ascending=False)
-    df_filtrado["info"] = df_filtrado.apply(
-        lambda r: f"ID {r['id']} | {r['cliente_id']} | {r['producto']} | {r['cantidad']} kg | {r['fecha']}", 
-        axis=1
-    )
+    # Filtros: la búsqueda se hace en la base y devuelve como mucho LIMITE_CANDIDATOS pedidos
+    col_id, col_cliente, col_producto = st.columns(3)
+    id_buscado = col_id.number_input("Buscar por ID", min_value=1, value=None, step=1, key="eliminar_id")
+    cliente_seleccionado = col_cliente.selectbox("Filtrar por cliente", ["Todos"] + cargar_clientes_pedidos(),
+                                                 key="eliminar_cliente")
+    producto_seleccionado = col_producto.selectbox("Filtrar por producto", ["Todos"] + cargar_productos_pedidos(),
+                                                   key="eliminar_producto")
+    cliente = None if cliente_seleccionado == "Todos" else cliente_seleccionado
+    producto = None if producto_seleccionado == "Todos" else producto_seleccionado
+
+    fecha_ini = fecha_fin = None
+    if st.checkbox("Filtrar por fechas", value=False, key="eliminar_filtrar_fechas"):
+        fecha_min, fecha_max = rango_fechas_pedidos(producto, cliente)
+        if pd.notnull(fecha_min) and pd.notnull(fecha_max):
+            rango = st.date_input(
+                "Rango de fechas:",
+                value=(max(fecha_min, fecha_max - pd.Timedelta(days=30)).date(), fecha_max.date()),
+                min_value=fecha_min.date(),
+                max_value=fecha_max.date(),
+                key="eliminar_rango"
+            )
+            if len(rango) == 2:
+                fecha_ini, fecha_fin = rango
+
+    df_filtrado, etiquetas, hay_mas = buscar_pedidos(id_buscado, cliente, producto, fecha_ini, fecha_fin)
 
     if df_filtrado.empty:
-        st.warning("No hay pedidos con esos filtros.")
+        if (id_buscado, cliente, producto, fecha_ini) == (None, None, None, None):
+            st.info("No hay pedidos registrados para eliminar.")
+        else:
+            st.warning("No hay pedidos con esos filtros.")
         return
+    if hay_mas:
+        st.caption(f"Se muestran los {LIMITE_CANDIDATOS} pedidos más recientes; afina la búsqueda para ver otros.")
 
-    # Selector de pedido a eliminar
+    # Selector de pedido a eliminar (etiquetas ya calculadas: búsqueda O(1) por opción)
     idx_seleccionado = st.selectbox(
         "Selecciona el pedido a eliminar",
-        options=list(df_filtrado['id']),
-        format_func=lambda i: df_filtrado[df_filtrado['id']==i]['info'].values[0]
+        options=list(etiquetas),
+        format_func=etiquetas.get
     )
+    fila = df_filtrado.loc[idx_seleccionado]
 
     st.write("**Detalles del pedido a eliminar:**")
-    st.write(df_filtrado[df_filtrado['id']==idx_seleccionado])
+    st.write(fila.drop(labels=['info']).to_frame().T)
 
     # Confirmación
     seguro = st.checkbox("Estoy seguro de eliminar este pedido", value=False)
     confirmar = st.button("Eliminar pedido", disabled=not seguro)
     
     if confirmar and seguro:
-        guardar_log_eliminacion(df_filtrado[df_filtrado['id']==idx_seleccionado].iloc[0], usuario)
-        eliminar_pedido_sql(idx_seleccionado)
+        guardar_log_eliminacion(fila, usuario)
+        eliminar_pedido_sql(int(idx_seleccionado))
         st.success("Pedido eliminado y guardado en registro de auditoría.")
 
+# ============================================================================
+# VISTAS DE LA APLICACIÓN - IMPORTAR PEDIDOS
+# ============================================================================
+def importar_pedidos():
+    """Vista para cargar pedidos históricos desde un CSV o XLSX"""
+    st.header("📥 Importar pedidos")
+    st.write("El archivo debe tener las columnas **cliente_id, producto, cantidad y fecha** (y opcionalmente **detalle**).")
+    archivo = st.file_uploader("Archivo CSV o XLSX", type=["csv", "xlsx"])
+    dia_primero = st.checkbox("Las fechas tienen el día primero (31/12/2024)", value=False)
+
+    if archivo is None:
+        st.info("Sube un archivo para validarlo o importarlo.")
+        return
+
+    # Si la validación de este mismo archivo encontró pedidos en sus fechas, se pide confirmar
+    firma = (archivo.name, archivo.size, dia_primero)
+    validado = st.session_state.get("importar_validacion")
+    if validado and validado[0] == firma and validado[1]['previos_en_rango']:
+        st.warning("Al validar: " + importacion.texto_previos(validado[1]))
+        confirmado = st.checkbox("Importar de todos modos", value=False, key="importar_confirmar_duplicados")
+    else:
+        confirmado = True
+
+    col_validar, col_importar = st.columns(2)
+    validar = col_validar.button("Validar sin importar")
+    importar = col_importar.button("Importar pedidos", disabled=not confirmado)
+    if not (validar or importar):
+        return
+
+    # Se lee e inserta por bloques; la barra avanza con cada bloque
+    barra = st.progress(0.0, text="Leyendo archivo...")
+    def _progreso(p):
+        barra.progress(p['fraccion'], text=f"{p['importadas']:,d} filas · {p['filas_por_segundo']:,.0f} filas/s")
+    try:
+        resultado = importacion.importar_pedidos(ENGINE, archivo, dia_primero=dia_primero,
+                                                 simular=validar, al_progreso=_progreso)
+    except importacion.ImportacionInterrumpida as e:
+        st.error(f"No se pudo {'validar' if validar else 'importar'} el archivo: {e}")
+        if importar and e.progreso['importadas']:
+            st.warning(f"La importación se detuvo a la mitad: {e.progreso['importadas']:,d} filas ya quedaron "
+                       "importadas. Quita esas filas del archivo antes de reintentar para no duplicarlas.")
+        return
+    barra.progress(1.0, text="Listo")
+    if validar:
+        st.session_state["importar_validacion"] = (firma, resultado)
+
+    col_ok, col_mal, col_vel = st.columns(3)
+    col_ok.metric("Filas válidas" if validar else "Filas importadas", f"{resultado['importadas']:,d}")
+    col_mal.metric("Filas rechazadas", f"{resultado['rechazadas']:,d}")
+    col_vel.metric("Filas por segundo", f"{resultado['filas_por_segundo']:,.0f}")
+    if resultado['lineas_rechazadas']:
+        st.warning("Líneas rechazadas (sin cliente, producto, cantidad o fecha válidos): "
+                   + ", ".join(map(str, resultado['lineas_rechazadas']))
+                   + (" ..." if resultado['rechazadas'] > len(resultado['lineas_rechazadas']) else ""))
+    if resultado['previos_en_rango']:
+        st.warning(importacion.texto_previos(resultado).capitalize())
+    if importar and resultado['importadas']:
+        st.success(f"Se importaron {resultado['importadas']:,d} pedidos en {resultado['segundos']:.1f} s.")
+
 # ============================================================================
 # VISTAS DE LA APLICACIÓN - RESUMEN Y ESTADÍSTICAS
 # ============================================================================
@@ -384,24 +573,39 @@ def resumen_estadisticas_globales():
     """Vista de resumen y estadísticas globales"""
     st.header("📊 Resumen y Estadísticas Globales")
     
-    # Cargar datos
-    pedidos = cargar_todos_pedidos()
-    inventario = obtener_inventario_actual()
-    clientes = cargar_clientes_usuarios()
-    
-    # Métricas generales
-    total_pedidos = len(pedidos)
-    total_kg = pedidos['cantidad'].sum() if not pedidos.empty else 0
-    pedidos_por_prod = pedidos.groupby('producto').agg({
-        'cantidad':'sum',
-        'fecha':'count'
-    }).rename(columns={'fecha':'num_pedidos'})
+    # Ventana de tiempo opcional para las métricas de pedidos
+    desde = hasta = None
+    if st.checkbox("Filtrar por periodo", value=False, key="resumen_filtrar_periodo"):
+        fecha_min, fecha_max = rango_fechas_pedidos()
+        if pd.notnull(fecha_min) and pd.notnull(fecha_max):
+            rango = st.date_input(
+                "Periodo:",
+                value=(fecha_min.date(), fecha_max.date()),
+                min_value=fecha_min.date(),
+                max_value=fecha_max.date(),
+                key="resumen_periodo"
+            )
+            if len(rango) == 2:
+                desde, hasta = rango
+    top_clientes = st.selectbox("Clientes en el ranking:", [10, 20, 50, 100], index=1, key="resumen_top_clientes")
+
+    # Cargar datos: los pedidos se agregan en la base y las lecturas van en paralelo
+    datos = cargar_en_paralelo({
+        "totales": lambda: estadisticas.totales_pedidos(ENGINE, desde, hasta),
+        "por_producto": lambda: estadisticas.pedidos_por_producto(ENGINE, desde, hasta),
+        "ranking": lambda: estadisticas.ranking_clientes(ENGINE, top_clientes, desde, hasta),
+        "inventario": obtener_inventario_actual,
+        "clientes": lambda: estadisticas.contar_clientes(ENGINE),
+        "clientes_evaluados": lambda: exactitud_predicciones.clientes_evaluados(ENGINE),
+    })
+    totales, inventario = datos["totales"], datos["inventario"]
+    pedidos_por_prod = datos["por_producto"]
     
     st.subheader("Resumen global:")
-    st.metric("Total pedidos registrados", total_pedidos)
-    st.metric("Total kg vendidos", total_kg)
+    st.metric("Total pedidos registrados", totales["pedidos"])
+    st.metric("Total kg vendidos", totales["kg"])
     st.metric("Inventario actual (kg)", inventario.get('cantidad_kg', 0))
-    st.metric("Clientes activos", len(clientes))
+    st.metric("Clientes activos", datos["clientes"])
     
     st.subheader("Pedidos por producto:")
     if not pedidos_por_prod.empty:
@@ -410,87 +614,63 @@ def resumen_estadisticas_globales():
         st.info("No hay datos de pedidos.")
 
     # Auditoría de eliminaciones
-    elim = pd.read_sql("SELECT * FROM log_eliminaciones_pedidos", ENGINE)
     st.subheader("Auditoría: Pedidos eliminados")
-    st.write(f"Pedidos eliminados: {len(elim)}")
-    st.dataframe(elim[['cliente_id','producto','cantidad','fecha','fecha_eliminacion','usuario']])
+    tabla_paginada.mostrar("resumen_eliminaciones", ENGINE, **ELIMINACIONES,
+                           visibles=['cliente_id','producto','cantidad','fecha','fecha_eliminacion','usuario'],
+                           texto_vacio="No hay pedidos eliminados.")
 
     # Ranking de clientes
     st.subheader("Ranking de clientes (por kg)")
-    if not pedidos.empty:
-        ranking = pedidos.groupby('cliente_id').agg(
-            total_kg=('cantidad','sum'), 
-            pedidos=('fecha','count')
-        ).sort_values("total_kg", ascending=False)
-        st.write("Top clientes por kg vendido:")
+    ranking = datos["ranking"]
+    if not ranking.empty:
+        st.write(f"Top {top_clientes} clientes por kg vendido:")
         st.dataframe(ranking)
     else:
         st.info("No hay ventas registradas en el periodo.")
     
-    # Comparación de predicciones
+    # Comparación de predicciones (agregados incrementales: una fila por consulta)
     st.markdown("## Pedidos predichos comparación")
-    df_comp = pd.read_sql("SELECT * FROM comparacion_prediccion_vs_real", ENGINE)
+    cliente_comp = st.selectbox("Comparaciones de:", ["Todos"] + datos["clientes_evaluados"],
+                                key="resumen_cliente_comparaciones")
+    cliente_comp = None if cliente_comp == "Todos" else cliente_comp
+    ex = exactitud_predicciones.leer_exactitud(ENGINE, cliente_comp)
+    n = ex["n"]
     
-    if df_comp.empty:
+    if not n:
         st.info("No hay datos de comparaciones registradas.")
         return
     
     # MÉTRICAS EN KG
-    df_comp['error_kg'] = (df_comp['kg_real'] - df_comp['kg_predicha']).abs()
-    error_promedio = df_comp['error_kg'].mean()
-    error_max = df_comp['error_kg'].max()
-    error_min = df_comp['error_kg'].min()
-    error_std = df_comp['error_kg'].std()
-    aciertos_kg = (df_comp['error_kg'] <= 1).sum()
-    porcentaje_aciertos_kg = (aciertos_kg / len(df_comp) * 100) if len(df_comp) > 0 else 0
-
-    st.write(f"**Error promedio (kg):** {error_promedio:.2f}")
-    st.write(f"**Error máximo (kg):** {error_max:.2f}")
-    st.write(f"**Error mínimo (kg):** {error_min:.2f}")
-    st.write(f"**Desviación estándar del error (kg):** {error_std:.2f}")
-    st.write(f"**Porcentaje de aciertos (±1kg):** {porcentaje_aciertos_kg:.1f} % ({aciertos_kg}/{len(df_comp)})")
+    st.write(f"**Error promedio (kg):** {ex['media_kg']:.2f}")
+    st.write(f"**Error máximo (kg):** {ex['max_kg']:.2f}")
+    st.write(f"**Error mínimo (kg):** {ex['min_kg']:.2f}")
+    st.write(f"**Desviación estándar del error (kg):** {ex['std_kg']:.2f}")
+    st.write(f"**Porcentaje de aciertos (±1kg):** {ex['porcentaje_aciertos_kg']:.1f} % ({ex['aciertos_kg']}/{n})")
 
     # MÉTRICAS EN DÍAS
-    df_comp['error_dias'] = df_comp['dif_dias'].abs()
-    error_promedio_dias = df_comp['error_dias'].mean()
-    error_max_dias = df_comp['error_dias'].max()
-    error_min_dias = df_comp['error_dias'].min()
-    error_std_dias = df_comp['error_dias'].std()
-    aciertos_dias = (df_comp['error_dias'] <= 1).sum()
-    porcentaje_aciertos_dias = (aciertos_dias / len(df_comp) * 100) if len(df_comp) > 0 else 0
-
-    st.write(f"\n**Error promedio (días):** {error_promedio_dias:.2f}")
-    st.write(f"**Error máximo (días):** {error_max_dias}")
-    st.write(f"**Error mínimo (días):** {error_min_dias}")
-    st.write(f"**Desviación estándar del error (días):** {error_std_dias:.2f}")
-    st.write(f"**Porcentaje de aciertos (±1 día):** {porcentaje_aciertos_dias:.1f} % ({aciertos_dias}/{len(df_comp)})")
+    st.write(f"\n**Error promedio (días):** {ex['media_dias']:.2f}")
+    st.write(f"**Error máximo (días):** {ex['max_dias']:g}")
+    st.write(f"**Error mínimo (días):** {ex['min_dias']:g}")
+    st.write(f"**Desviación estándar del error (días):** {ex['std_dias']:.2f}")
+    st.write(f"**Porcentaje de aciertos (±1 día):** {ex['porcentaje_aciertos_dias']:.1f} % ({ex['aciertos_dias']}/{n})")
     
     # Aciertos simultáneos
-    cond_acierto_kgydia = (df_comp["error_kg"] <= 1) & (df_comp["error_dias"] <= 1)
-    aciertos_kgydia = cond_acierto_kgydia.sum()
-    porcentaje_aciertos_kgydia = (aciertos_kgydia / len(df_comp) * 100) if len(df_comp) > 0 else 0
-    st.write(f"**Porcentaje de aciertos simultáneos (±1kg y ±1 día):** {porcentaje_aciertos_kgydia:.1f} % ({aciertos_kgydia}/{len(df_comp)})")
+    st.write(f"**Porcentaje de aciertos simultáneos (±1kg y ±1 día):** {ex['porcentaje_aciertos_ambos']:.1f} % ({ex['aciertos_ambos']}/{n})")
 
-    df_comp['ACIERTO_CONJUNTO'] = cond_acierto_kgydia.map({True: "✅", False: ""})
-    st.dataframe(df_comp[['cliente_id','fecha_real','kg_real','fecha_predicha','kg_predicha','error_kg','error_dias','ACIERTO_CONJUNTO']])
-    
-    # Tabla resumen
-    st.dataframe(df_comp[['cliente_id','fecha_real','kg_real','fecha_predicha','kg_predicha','dif_dias','dif_kg','error_kg','error_dias']])
+    # Detalle e histogramas: solo si se piden (leen todas las comparaciones del ámbito)
+    if not st.checkbox("Ver detalle de comparaciones", value=False, key="resumen_detalle_comparaciones"):
+        return
+    where, params = _filtro_comparaciones(cliente_comp)
+    tabla_paginada.mostrar("resumen_comparaciones", ENGINE, **COMPARACIONES, where=where, params=params,
+                           transformar=_errores_comparacion,
+                           visibles=['cliente_id','fecha_real','kg_real','fecha_predicha','kg_predicha','dif_dias','dif_kg','error_kg','error_dias','ACIERTO_CONJUNTO'])
 
     # Histogramas
-    fig, ax = plt.subplots()
-    ax.hist(df_comp['error_kg'], bins=20, color='#6699ff', edgecolor='black', alpha=0.8)
-    ax.set_xlabel("Error absoluto (kg)")
-    ax.set_ylabel("Frecuencia")
-    ax.set_title("Distribución de errores (kg)")
-    st.pyplot(fig)
-    
-    fig2, ax2 = plt.subplots()
-    ax2.hist(df_comp['error_dias'], bins=20, color='#ff6666', edgecolor='black', alpha=0.8)
-    ax2.set_xlabel("Error absoluto (días)")
-    ax2.set_ylabel("Frecuencia")
-    ax2.set_title("Distribución de errores (días)")
-    st.pyplot(fig2)
+    errores = cargar_errores_comparaciones(cliente_comp)
+    graficas.mostrar(graficas.histograma, errores['error_kg'], bins=20, color='#6699ff', edgecolor='black', alpha=0.8,
+                     titulo="Distribución de errores (kg)", xlabel="Error absoluto (kg)")
+    graficas.mostrar(graficas.histograma, errores['error_dias'], bins=20, color='#ff6666', edgecolor='black', alpha=0.8,
+                     titulo="Distribución de errores (días)", xlabel="Error absoluto (días)")
 
 # ============================================================================
 # VISTAS DE LA APLICACIÓN - GESTIÓN DE CLIENTES
@@ -518,7 +698,7 @@ def gestion_clientes():
             st.success("Cliente creado exitosamente. Ya puede recibir pedidos.")
     
     elif accion == "Editar":
-        df_usuarios = pd.read_sql("SELECT * FROM usuarios WHERE rol='cliente'", ENGINE)
+        df_usuarios = cargar_usuarios_clientes()
         clientes = df_usuarios['usuario'].dropna().unique()
         
         if not len(clientes):
@@ -533,15 +713,11 @@ def gestion_clientes():
         nuevo_telefono = st.text_input("Teléfono", value=str(datos_actuales.get('telefono','')))
         
         if st.button("Guardar cambios"):
-            with ENGINE.begin() as conn:
-                conn.execute(
-                    text("UPDATE usuarios SET nombre=:n, telefono=:t WHERE usuario=:u"),
-                    {"n": nuevo_nombre, "t": nuevo_telefono, "u": cliente}
-                )
+            REPO.actualizar_usuario(cliente, {"nombre": nuevo_nombre, "telefono": nuevo_telefono})
             st.success("Datos del cliente actualizados correctamente.")
     
     elif accion == "Borrar":
-        df_usuarios = pd.read_sql("SELECT * FROM usuarios WHERE rol='cliente'", ENGINE)
+        df_usuarios = cargar_usuarios_clientes()
         clientes = df_usuarios['usuario'].dropna().unique()
         
         if not len(clientes):
@@ -549,15 +725,14 @@ def gestion_clientes():
             return
         
         cliente = st.selectbox("Selecciona el cliente a borrar", clientes)
-        tiene_pedidos = not pd.read_sql(f"SELECT * FROM pedidos_cliente WHERE cliente_id='{cliente}'", ENGINE).empty
+        tiene_pedidos = cliente_tiene_pedidos(cliente)
         
         st.write(f"¿Eliminar cliente '{cliente}'? {'(Tiene pedidos activos, se recomienda no borrar)' if tiene_pedidos else ''}")
         seguro = st.checkbox("Estoy seguro de borrar este cliente", value=False)
         confirmar = st.button("Borrar cliente", disabled=not seguro)
         
         if confirmar and seguro:
-            with ENGINE.begin() as conn:
-                conn.execute(text("DELETE FROM usuarios WHERE usuario=:u"), {"u": cliente})
+            REPO.eliminar_usuario(cliente)
             st.success(f"Cliente '{cliente}' borrado correctamente.")
             if tiene_pedidos:
                 st.warning("¡Este cliente tenía pedidos registrados! Estos datos NO se han borrado del historial de pedidos.")
@@ -572,12 +747,11 @@ def pedidos_pendientes():
 
     # -------- REGISTRAR NUEVO PENDIENTE --------
     with tab_registro:
-        clientes = pd.read_sql("SELECT usuario FROM usuarios WHERE rol='cliente'", ENGINE)['usuario'].tolist()
+        clientes = cargar_clientes_usuarios()
         cliente_id = st.selectbox("Cliente destino", clientes)
         
         # Cargar productos desde base de datos
-        productos_df = pd.read_sql("SELECT nombre FROM precios_producto", ENGINE)
-        productos_lista = productos_df['nombre'].tolist()
+        productos_lista = cargar_productos()
         producto = st.selectbox("Producto", productos_lista)
         
         cantidad = st.number_input("Cantidad", min_value=0.0, max_value=9999.0, value=1.0)
@@ -592,12 +766,12 @@ def pedidos_pendientes():
                 "detalle": detalle,
                 "fecha": fecha
             }
-            pd.DataFrame([nuevo_pedido]).to_sql('pedidos_pendientes', ENGINE, if_exists='append', index=False)
+            registrar_pedido_pendiente(nuevo_pedido)
             st.success("Pedido registrado y marcado como pendiente de envío.")
 
     # -------- VISUALIZAR/ENTREGAR PENDIENTES --------
     with tab_lista:
-        df_pendientes = pd.read_sql("SELECT * FROM pedidos_pendientes ORDER BY fecha DESC", ENGINE)
+        df_pendientes = cargar_pedidos_pendientes()
         
         if df_pendientes.empty:
             st.info("No hay pedidos pendientes.")
@@ -605,73 +779,44 @@ def pedidos_pendientes():
 
         st.dataframe(df_pendientes[['id','cliente_id','producto','cantidad','detalle','fecha']])
         
-        ids = list(df_pendientes['id'])
-        seleccionado = st.selectbox(
-            "Selecciona pedido pendiente para entregar/loguear", 
-            ids, 
-            format_func=lambda i: f"ID {i} | Cliente {df_pendientes[df_pendientes['id']==i]['cliente_id'].iloc[0]}"
+        etiquetas = dict(zip(df_pendientes['id'], "ID " + df_pendientes['id'].astype(str) + " | Cliente " + df_pendientes['cliente_id'].astype(str)))
+        seleccionados = st.multiselect(
+            "Selecciona pedido(s) pendiente(s) para entregar/loguear", 
+            list(etiquetas), 
+            format_func=etiquetas.get
         )
         
-        datos_seleccionado = df_pendientes[df_pendientes['id'] == seleccionado].iloc[0]
-        st.markdown(f"**Detalles:**  Cliente: {datos_seleccionado['cliente_id']}  |  Producto: {datos_seleccionado['producto']}  |  Cantidad: {datos_seleccionado['cantidad']} kg  | Fecha solicitada: {datos_seleccionado['fecha']}")
+        if not seleccionados:
+            st.info("Selecciona al menos un pedido pendiente.")
+            return
+
+        df_sel = df_pendientes[df_pendientes['id'].isin(seleccionados)]
+        for datos_seleccionado in df_sel.itertuples():
+            st.markdown(f"**Detalles:**  Cliente: {datos_seleccionado.cliente_id}  |  Producto: {datos_seleccionado.producto}  |  Cantidad: {datos_seleccionado.cantidad} kg  | Fecha solicitada: {datos_seleccionado.fecha}")
 
         fecha_entrega = st.date_input("Fecha real de entrega", value=datetime.date.today())
 
-        # --- Opcional: Asociar a predicción ---
-        df_pred = pd.read_sql("SELECT Fecha, Kg_Predichos FROM predicciones_cafe_365_dias", ENGINE)
-        df_pred['Fecha'] = pd.to_datetime(df_pred['Fecha'], dayfirst=True, errors='coerce')
-        df_pred = df_pred[df_pred['Fecha'] >= pd.to_datetime(str(datos_seleccionado['fecha'])) - pd.Timedelta(days=7)]
-        
-        opciones_pred = ["No asociar a predicción"] + [
-            f"{r.Fecha.date()} | {r.Kg_Predichos:.1f} kg" for _, r in df_pred.iterrows()
-        ]
-        prediccion_sel = st.selectbox("¿Asociar a una predicción?", opciones_pred)
+        # --- Opcional: Asociar a predicción (solo al entregar un único pedido) ---
+        predicciones = {}
+        if len(seleccionados) == 1:
+            datos_seleccionado = df_sel.iloc[0]
+            df_pred = cargar_predicciones()
+            df_pred = df_pred[df_pred['fecha'] >= pd.to_datetime(str(datos_seleccionado['fecha'])) - pd.Timedelta(days=7)]
+            
+            opciones_pred = [None] + list(zip(df_pred['fecha'], df_pred['prediccion']))
+            prediccion_sel = st.selectbox(
+                "¿Asociar a una predicción?", opciones_pred,
+                format_func=lambda o: "No asociar a predicción" if o is None else f"{o[0].date()} | {o[1]:.1f} kg"
+            )
+            if prediccion_sel is not None:
+                predicciones[int(datos_seleccionado['id'])] = prediccion_sel
 
         if st.button("Registrar entrega, loguear y quitar de pendientes"):
-            # 1. Registrar como pedido real
-            nuevo_pedido = {
-                'cliente_id': datos_seleccionado['cliente_id'],
-                'producto': datos_seleccionado['producto'],
-                'cantidad': datos_seleccionado['cantidad'],
-                'detalle': datos_seleccionado['detalle'],
-                'fecha': fecha_entrega
-            }
-            pd.DataFrame([nuevo_pedido]).to_sql('pedidos_cliente', ENGINE, if_exists='append', index=False)
-
-            # 2. Registrar LOG de entregado
-            log_entregado = {
-                'cliente_id': datos_seleccionado['cliente_id'],
-                'producto': datos_seleccionado['producto'],
-                'cantidad': datos_seleccionado['cantidad'],
-                'detalle': datos_seleccionado['detalle'],
-                'fecha_solicitada': datos_seleccionado['fecha'],
-                'fecha_entrega': fecha_entrega,
-                'id_pendiente': datos_seleccionado['id']
-            }
-            pd.DataFrame([log_entregado]).to_sql('log_pedidos_entregados', ENGINE, if_exists='append', index=False)
-
-            # 3. Registrar comparación si hay predicción
-            if prediccion_sel != "No asociar a predicción":
-                fecha_pred_str = prediccion_sel.split('|')[0].strip()
-                kg_pred_str = prediccion_sel.split('|')[1].replace('kg','').strip()
-                datos_comparacion = {
-                    "cliente_id": datos_seleccionado['cliente_id'],
-                    "fecha_real": fecha_entrega,
-                    "kg_real": datos_seleccionado['cantidad'],
-                    "fecha_predicha": fecha_pred_str,
-                    "kg_predicha": float(kg_pred_str),
-                    "dif_dias": (pd.to_datetime(fecha_entrega) - pd.to_datetime(fecha_pred_str)).days,
-                    "dif_kg": float(datos_seleccionado['cantidad']) - float(kg_pred_str),
-                    "registro": pd.Timestamp.now(),
-                    "fue_pred_usada": True
-                }
-                pd.DataFrame([datos_comparacion]).to_sql('comparacion_prediccion_vs_real', ENGINE, if_exists='append', index=False)
-
-            # 4. Quitar de pendientes
-            with ENGINE.begin() as conn:
-                conn.execute(text("DELETE FROM pedidos_pendientes WHERE id=:id"), {"id": seleccionado})
-
-            st.success("Entrega registrada, logueada y movida a pedidos reales.")
+            entregados = entregar_pendientes(ENGINE, seleccionados, fecha_entrega, predicciones)
+            if entregados:
+                st.success(f"{len(entregados)} entrega(s) registrada(s), logueada(s) y movida(s) a pedidos reales.")
+            else:
+                st.warning("Los pedidos seleccionados ya no estaban pendientes.")
 
 # ============================================================================
 # VISTAS DE LA APLICACIÓN - DASHBOARD AVANZADO
@@ -680,11 +825,17 @@ def dashboard_graficas_avanzadas():
     """Dashboard con gráficas avanzadas de predicciones"""
     st.header("📊 Dashboard avanzado café")
     
-    # Cargar datos
-    df_pred = pd.read_sql("SELECT Fecha, Kg_Predichos FROM predicciones_cafe_365_dias", ENGINE)
+    # Cargar datos (predicciones, pedidos, resumen mensual e inventario en paralelo)
+    datos = cargar_en_paralelo({
+        "predicciones": cargar_predicciones_crudas,
+        "pedidos": cargar_todos_pedidos,
+        "resumen": lambda: resumen_mensual.leer_resumen(ENGINE),
+        "inventario": obtener_inventario_actual,
+    })
+    df_pred = datos["predicciones"]
     df_pred['Fecha'] = pd.to_datetime(df_pred['Fecha'], dayfirst=True, errors='coerce')
     
-    pedidos_reales = pd.read_sql("SELECT fecha, cantidad AS kg_real FROM pedidos_cliente", ENGINE)
+    pedidos_reales = datos["pedidos"][['fecha', 'cantidad']].rename(columns={'cantidad': 'kg_real'})
     pedidos_reales['fecha'] = pd.to_datetime(pedidos_reales['fecha'], errors='coerce')
 
     # Merge predicciones con pedidos reales
@@ -709,11 +860,8 @@ def dashboard_graficas_avanzadas():
     # TAB 2: HISTOGRAMA
     with tab2:
         st.subheader("Histograma de Kg Predichos")
-        fig, ax = plt.subplots()
-        ax.hist(df_vista['kg_predicho'].dropna().astype(float), bins=10, color="#FFD39B", edgecolor="#8B5B29")
-        ax.set_xlabel("Kg Predichos")
-        ax.set_ylabel("Frecuencia")
-        st.pyplot(fig)
+        graficas.mostrar(graficas.histograma, df_vista['kg_predicho'].dropna().astype(float),
+                         bins=10, color="#FFD39B", edgecolor="#8B5B29", xlabel="Kg Predichos")
 
     # TAB 3: HEATMAP
     with tab3:
@@ -724,76 +872,18 @@ def dashboard_graficas_avanzadas():
         tabla = pd.pivot_table(df_vista_copy, values='kg_predicho', index='Día', columns='Mes', aggfunc='sum')
         
         if not tabla.empty:
-            fig2, ax2 = plt.subplots(figsize=(10, 6))
-            sns.heatmap(tabla, cmap="YlOrBr", annot=True, fmt=".1f", ax=ax2)
-            st.pyplot(fig2)
+            graficas.mostrar(graficas.heatmap, tabla, cmap="YlOrBr", annot=True, fmt=".1f")
         else:
             st.warning("No hay suficientes datos para generar el heatmap")
 
-    # TAB 4: COMPARATIVA/EVOLUCIÓN
+    # TAB 4: COMPARATIVA/EVOLUCIÓN (lee el resumen mensual materializado)
     with tab4:
         st.subheader("Consumo anterior y consumo esperado")
-        meses_orden = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
-        
-        # Preprocesar históricos y predicciones
-        pedidos_reales['anio'] = pedidos_reales['fecha'].dt.year
-        pedidos_reales['mes'] = pedidos_reales['fecha'].dt.month
-        pedidos_reales['mes_lab'] = pedidos_reales['fecha'].dt.strftime('%b')
-
-        df_pred['anio'] = df_pred['Fecha'].dt.year
-        df_pred['mes'] = df_pred['Fecha'].dt.month
-        df_pred['mes_lab'] = df_pred['Fecha'].dt.strftime('%b')
-
-        pivot_hist = pedidos_reales.pivot_table(
-            index='mes_lab', columns='anio', values='kg_real', aggfunc='sum'
-        ).reindex(meses_orden).fillna(0)
-        
-        pivot_pred = df_pred.pivot_table(
-            index='mes_lab', columns='anio', values='Kg_Predichos', aggfunc='sum'
-        ).reindex(meses_orden).fillna(0)
-
-        todos_anios = sorted(list(set(pivot_hist.columns.tolist() + pivot_pred.columns.tolist())))
-        
-        # Colores
-        color_list_hist = ['#b3c6f7', '#6699ff', '#3366cc', '#003399', '#001147']
-        color_list_pred = ['#ffcccc', '#ff6666', '#ff3300', '#cc0000', '#660000']
-        borde_rojo_list = ['#ff3333', '#cc0000', '#990000', '#660000', '#330000']
-
-        fig, ax = plt.subplots(figsize=(12,7))
-        bar_width = 0.7 / len(todos_anios)
-        x = np.arange(len(meses_orden))
-
-        # Barras históricas
-        for i, anio in enumerate(todos_anios):
-            vals_hist = pivot_hist[anio].values if anio in pivot_hist.columns else np.zeros(len(meses_orden))
-            if np.any(vals_hist > 0):
-                offset = (i - len(todos_anios)/2)*bar_width
-                ax.bar(x+offset, vals_hist, width=bar_width, color=color_list_hist[i%5], alpha=0.87, label=f"Hist {anio}")
-        
-        # Barras predichas
-        for i, anio in enumerate(todos_anios):
-            vals_pred = pivot_pred[anio].values if anio in pivot_pred.columns else np.zeros(len(meses_orden))
-            if np.any(vals_pred > 0):
-                offset = (i - len(todos_anios)/2)*bar_width
-                ax.bar(x+offset, vals_pred, width=bar_width,
-                    color=color_list_pred[i%5],
-                    edgecolor=borde_rojo_list[i%5],
-                    linewidth=1.8,
-                    alpha=0.70,
-                    label=f'Prev {anio}',
-                    hatch='//')
-
-        ax.set_xlabel('Mes')
-        ax.set_ylabel('Kg')
-        ax.set_xticks(x)
-        ax.set_xticklabels(meses_orden, fontsize=10)
-        
-        # Ajuste ticks cada 10 kg
-        max_kgs = int((ax.get_ylim()[1] // 10 + 1) * 10)
-        ax.set_yticks(np.arange(0, max_kgs+1, 10))
-        ax.legend(fontsize=10)
-        ax.grid(True, axis='y', alpha=0.18)
-        st.pyplot(fig)
+        if st.button("🔄 Recalcular resumen mensual"):
+            resumen_mensual.recalcular(ENGINE)
+            datos["resumen"] = resumen_mensual.leer_resumen(ENGINE)
+        resumen = datos["resumen"]
+        graficas.mostrar(resumen_mensual.figura_comparativa_mensual, resumen)
 
     # TAB 5: SIMULACIÓN
     with tab5:
@@ -809,12 +899,9 @@ def dashboard_graficas_avanzadas():
         )
         
         mask_pred = (df_pred['Fecha'].dt.date >= hoy) & (df_pred['Fecha'].dt.date <= fecha_final)
-        consumo_periodo = df_pred.loc[mask_pred, 'Kg_Predichos'].astype(float).sum()
+        consumo_periodo = float(cobertura_inventario.consumo_hasta(df_pred['Fecha'], df_pred['Kg_Predichos'], fecha_final)[0])
         
-        inventario_actual = pd.read_sql(
-            "SELECT cantidad_kg FROM inventario_cafe ORDER BY fecha_actualizacion DESC LIMIT 1", 
-            ENGINE
-        )['cantidad_kg'].iloc[0]
+        inventario_actual = float(datos["inventario"]['cantidad_kg'])
         
         compra_necesaria = max(0, consumo_periodo - inventario_actual)
         
@@ -829,27 +916,22 @@ def dashboard_graficas_avanzadas():
 
     # ALERTA de inventario en la barra lateral
     st.sidebar.header("⚠️ Control de Inventario")
-    sum_kg, dias_stock, fecha_quiebre = 0, 0, None
-    
-    for idx, row in df_pred.iterrows():
-        if sum_kg < inventario_actual:
-            sum_kg += float(row['Kg_Predichos'])
-            dias_stock += 1
-            fecha_quiebre = row['Fecha']
-        else:
-            break
-    
-    prox_pred = df_pred[df_pred['Fecha'] >= pd.Timestamp(datetime.date.today())]
-    prox_prediccion = prox_pred['Kg_Predichos'].iloc[0] if not prox_pred.empty else 0.0
+    fechas_fut, consumo_fut, _ = cobertura_inventario.preparar_consumo(df_pred['Fecha'], df_pred['Kg_Predichos'])
+    cob = cobertura_inventario.cobertura(df_pred['Fecha'], df_pred['Kg_Predichos'], inventario_actual)
+    dias_stock = cob['pedidos_cubiertos']
+    prox_prediccion = consumo_fut[0] if len(consumo_fut) else 0.0
 
     # ALERTA visual
     if inventario_actual < float(prox_prediccion):
         st.sidebar.error(f"⚠️ Inventario insuficiente ({inventario_actual:.1f} kg). No cubre el siguiente pedido ({prox_prediccion:.1f} kg).")
+    elif cob['alcanza']:
+        st.sidebar.success(f"Inven. OK: {inventario_actual:.1f} kg. Cubre todas las predicciones disponibles.")
     else:
+        fecha_quiebre = cob['fecha_quiebre']
         st.sidebar.success(f"Inven. OK: {inventario_actual:.1f} kg. Cubre hasta el {fecha_quiebre.strftime('%d/%m/%Y')}")
         st.sidebar.metric("Pedidos cubiertos", dias_stock, delta=f"Hasta {fecha_quiebre.strftime('%d/%m/%Y')}")
         st.sidebar.write("Detalle del consumo proyectado:")
-        st.sidebar.dataframe(df_pred.loc[:dias_stock-1, ['Fecha', 'Kg_Predichos']])
+        st.sidebar.dataframe(pd.DataFrame({'Fecha': fechas_fut[:dias_stock], 'Kg_Predichos': consumo_fut[:dias_stock]}))
 
 # ============================================================================
 # VISTAS DE LA APLICACIÓN - GESTIÓN DE PRODUCTOS
@@ -867,14 +949,15 @@ def gestion_productos():
         if st.button("Agregar producto"):
             if nombre_new:
                 producto = {'nombre': nombre_new, 'precio': precio_new}
-                pd.DataFrame([producto]).to_sql('precios_producto', ENGINE, if_exists='append', index=False)
+                insertar(ENGINE, 'precios_producto', producto)
+                invalidar("precios_producto")
                 st.success("Producto agregado correctamente.")
             else:
                 st.warning("Ingresa un nombre.")
 
     # --- Editar producto ---
     with tab_edit:
-        productos = pd.read_sql("SELECT * FROM precios_producto", ENGINE)
+        productos = cargar_precios_productos()
         
         if not productos.empty:
             nombres = productos['nombre'].tolist()
@@ -888,13 +971,14 @@ def gestion_productos():
                         text("UPDATE precios_producto SET precio=:p WHERE nombre=:n"),
                         {"p": nuevo_precio, "n": prod_sel}
                     )
+                invalidar("precios_producto")
                 st.success("Precio actualizado.")
         else:
             st.info("No hay productos registrados.")
 
     # --- Eliminar producto ---
     with tab_del:
-        productos = pd.read_sql("SELECT * FROM precios_producto", ENGINE)
+        productos = cargar_precios_productos()
         
         if not productos.empty:
             prod_del = st.selectbox("Producto a eliminar", productos['nombre'].tolist())
@@ -902,12 +986,13 @@ def gestion_productos():
             if st.button("Eliminar producto"):
                 with ENGINE.begin() as conn:
                     conn.execute(text("DELETE FROM precios_producto WHERE nombre=:n"), {"n": prod_del})
+                invalidar("precios_producto")
                 st.success("Producto eliminado.")
         else:
             st.info("No hay productos registrados.")
 
     st.subheader("Lista de productos y precios actuales")
-    st.dataframe(pd.read_sql("SELECT * FROM precios_producto", ENGINE))
+    st.dataframe(cargar_precios_productos())
 
 # ============================================================================
 # VISTAS DE LA APLICACIÓN - APARTADO DE PAGOS
@@ -916,10 +1001,8 @@ def apartado_pagos():
     """Vista para control de pagos por cliente"""
     st.header("💰 Control de pagos por cliente")
 
-    # 1. Selección de cliente
-    df_entregados = pd.read_sql("SELECT * FROM log_pedidos_entregados", ENGINE)
-    precios = pd.read_sql("SELECT * FROM precios_producto", ENGINE).set_index('nombre')['precio'].to_dict()
-    clientes = df_entregados['cliente_id'].unique().tolist()
+    # 1. Selección de cliente (cuentas materializadas: una fila por cliente)
+    clientes = cuentas_clientes.clientes_con_cuenta(ENGINE)
     
     if not clientes:
         st.warning("No hay entregas registradas.")
@@ -927,22 +1010,34 @@ def apartado_pagos():
     
     cliente_sel = st.selectbox("Cliente", clientes)
 
-    # 2. Calcula total entregado y muestra detalle con precios automáticos
-    df_cliente = df_entregados[df_entregados['cliente_id'] == cliente_sel].copy()
-    df_cliente['precio_unitario'] = df_cliente['producto'].map(precios)
-    df_cliente['importe'] = df_cliente['cantidad'] * df_cliente['precio_unitario']
-    
-    total_kg = df_cliente['cantidad'].sum()
-    total_pagar = df_cliente['importe'].sum()
-    
+    # 2. Estado de cuenta: saldo y antigüedad por clave primaria
+    cuenta = cuentas_clientes.estado_cuenta(ENGINE, cliente_sel)
+    col_cargos, col_pagos, col_saldo = st.columns(3)
+    col_cargos.metric("Total cargado", f"${cuenta['cargos']:,.2f}")
+    col_pagos.metric("Total pagado", f"${cuenta['pagos']:,.2f}")
+    col_saldo.metric("Saldo pendiente", f"${cuenta['saldo']:,.2f}")
+    st.markdown(f"**Total entregado:** {cuenta['kg_entregados']:.2f} kg en {cuenta['entregas']} entregas")
+    st.caption(f"Última entrega: {cuenta['ultima_entrega'] or '—'} · Último pago: {cuenta['ultimo_pago'] or '—'}")
+    st.markdown("**Antigüedad del saldo:**")
+    st.dataframe(pd.DataFrame([cuenta['antiguedad']]).round(2), hide_index=True)
+
+    # Entregas del cliente, una página por consulta
     st.subheader("Entregas a cobrar para el cliente seleccionado:")
-    st.dataframe(df_cliente[['fecha_solicitada', 'fecha_entrega', 'producto', 'cantidad', 'detalle', 'precio_unitario', 'importe']])
-    st.markdown(f"**Total entregado:** {total_kg:.2f} kg")
-    st.markdown(f"**Monto a pagar:** ${total_pagar:,.2f}")
+    precios = cargar_precios_productos().set_index('nombre')['precio'].to_dict()
+
+    def _importes(df_cliente):
+        df_cliente['precio_unitario'] = df_cliente['producto'].map(precios)
+        df_cliente['importe'] = df_cliente['cantidad'] * df_cliente['precio_unitario']
+        return df_cliente
+
+    tabla_paginada.mostrar("pagos_entregas", ENGINE, **ENTREGAS_CLIENTE, params={"cliente": cliente_sel},
+                           transformar=_importes,
+                           visibles=['fecha_solicitada', 'fecha_entrega', 'producto', 'cantidad', 'detalle', 'precio_unitario', 'importe'],
+                           texto_vacio="El cliente no tiene entregas.")
 
     # 3. Registrar nuevo pago
     st.markdown("### Registrar pago recibido")
-    monto_pago = st.number_input("Monto recibido", min_value=0.0, value=float(total_pagar))
+    monto_pago = st.number_input("Monto recibido", min_value=0.0, value=max(float(cuenta['saldo']), 0.0))
     fecha_pago = st.date_input("Fecha de pago", value=datetime.date.today())
     observ = st.text_input("Observaciones (opcional)")
 
@@ -953,16 +1048,18 @@ def apartado_pagos():
             'fecha_pago': fecha_pago,
             'observaciones': observ
         }
-        pd.DataFrame([pago]).to_sql('pagos_cliente', ENGINE, if_exists='append', index=False)
+        REPO.registrar_pago(pago)
         st.success("Pago registrado correctamente.")
 
     # 4. Mostrar pagos anteriores del cliente
     st.subheader("Pagos recibidos")
-    pagos_hist = pd.read_sql(
-        f"SELECT * FROM pagos_cliente WHERE cliente_id='{cliente_sel}' ORDER BY fecha_pago DESC", 
-        ENGINE
-    )
-    st.dataframe(pagos_hist)
+    tabla_paginada.mostrar("pagos_recibidos", ENGINE, **PAGOS_CLIENTE, params={"cliente": cliente_sel},
+                           visibles=['monto', 'fecha_pago', 'observaciones'], texto_vacio="No hay pagos registrados.")
+
+    # Los cargos guardan el precio del día de la entrega; esto los revalúa con los actuales
+    if st.button("🔄 Recalcular saldos con los precios actuales"):
+        cuentas_clientes.recalcular(ENGINE)
+        st.success("Saldos recalculados.")
 
 # ============================================================================
 # MENÚ PRINCIPAL DE LA APLICACIÓN
@@ -983,33 +1080,38 @@ opcion = st.sidebar.radio("Opciones:", [
 # ============================================================================
 # NAVEGACIÓN ENTRE VISTAS
 # ============================================================================
-if opcion == "Apartado pagos":
-    apartado_pagos()
-elif opcion == "Productos":
-    gestion_productos()
-elif opcion == "Pedidos pendientes":
-    pedidos_pendientes()
-elif opcion == "Dashboard avanzado":
-    dashboard_graficas_avanzadas()
-elif opcion == "Resumen/Estadísticas":
-    resumen_estadisticas_globales()
-elif opcion == "Clientes":
-    gestion_clientes()
-elif opcion == "Gestion de pedidos previos":
-    st.header("Gestion de pedidos previos")
-    accion = st.radio("¿Qué acción deseas realizar?", ["Registrar pedido",  "Ver pedidos","Eliminar pedido"])
-    if accion == "Registrar pedido":
-        registrar_pedido()
-    elif accion == "Ver pedidos":
-        vista_ver_pedidos()
-    elif accion == "Eliminar pedido":
-        eliminar_pedido()
-elif opcion == "Control de inventario":
-    control_de_inventario()
-elif opcion == "Salir":
+VISTAS = {
+    "Clientes": gestion_clientes,
+    "Control de inventario": control_de_inventario,
+    "Resumen/Estadísticas": resumen_estadisticas_globales,
+    "Dashboard avanzado": dashboard_graficas_avanzadas,
+    "Pedidos pendientes": pedidos_pendientes,
+    "Productos": gestion_productos,
+    "Apartado pagos": apartado_pagos,
+}
+ACCIONES_PEDIDOS = {
+    "Registrar pedido": registrar_pedido,
+    "Ver pedidos": vista_ver_pedidos,
+    "Eliminar pedido": eliminar_pedido,
+    "Importar pedidos": importar_pedidos,
+}
+
+if opcion == "Salir":
     st.session_state["rol"] = None
     st.session_state["usuario"] = None
     st.experimental_rerun()
+else:
+    if opcion == "Gestion de pedidos previos":
+        st.header("Gestion de pedidos previos")
+        accion = st.radio("¿Qué acción deseas realizar?", list(ACCIONES_PEDIDOS))
+        vista = ACCIONES_PEDIDOS[accion]
+    else:
+        vista = VISTAS[opcion]
+    # Tiempo, consultas, filas y gráficas de cada re-ejecución (panel Diagnóstico)
+    with diagnostico.medir_vista(vista.__name__, st.session_state.get("usuario")):
+        vista()
+
+diagnostico.panel()
 
 # ============================================================================
 # FIN DEL CÓDIGO
@@ -0,0 +1 @@
+"""Pruebas de rendimiento (benchmarks) de los dashboards."""
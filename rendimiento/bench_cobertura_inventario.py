@@ -0,0 +1,76 @@
+# ============================================================================
+# BENCHMARK: COBERTURA DE INVENTARIO (bucle iterrows vs. searchsorted)
+# ============================================================================
+# Uso: python -m rendimiento.bench_cobertura_inventario [--anios 5] [--niveles 200]
+#
+# Compara el bucle con iterrows() que tenían los dashboards contra
+# servicios.cobertura_inventario sobre una serie diaria de varios años, para un
+# nivel de inventario y para muchos niveles a la vez. También verifica que
+# ambos den el mismo resultado.
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from servicios import cobertura_inventario
+
+
+def serie_predicciones(anios, semilla=0):
+    """Predicción diaria sintética (kg) desde hoy durante `anios` años"""
+    rng = np.random.default_rng(semilla)
+    fechas = pd.date_range(pd.Timestamp.today().normalize(), periods=365 * anios, freq='D')
+    kg = np.round(rng.gamma(shape=4.0, scale=2.5, size=len(fechas)), 1)
+    return pd.DataFrame({'fecha': fechas, 'prediccion': kg})
+
+
+def cobertura_bucle(inventario, df_pred):
+    """Implementación anterior (estimar_dias_restantes con iterrows)"""
+    suma_acum, dias, fecha_lim = 0, 0, None
+    for _, row in df_pred.iterrows():
+        suma_acum += row['prediccion']
+        dias += 1
+        if suma_acum >= inventario:
+            fecha_lim = row['fecha']
+            break
+    return dias, fecha_lim
+
+
+def _medir(func, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        func()
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de cobertura de inventario")
+    parser.add_argument("--anios", type=int, default=5)
+    parser.add_argument("--niveles", type=int, default=200)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    df_pred = serie_predicciones(args.anios)
+    total = df_pred['prediccion'].sum()
+    niveles = np.linspace(1, total * 0.95, args.niveles)
+    inventario = float(niveles[len(niveles) // 2])
+
+    # Verificación de equivalencia
+    res = cobertura_inventario.calcular_cobertura(df_pred['fecha'], df_pred['prediccion'], niveles)
+    for nivel, fila in zip(niveles[::max(1, len(niveles) // 20)], res.iloc[::max(1, len(niveles) // 20)].itertuples()):
+        dias, fecha = cobertura_bucle(nivel, df_pred)
+        assert dias == fila.pedidos_cubiertos and fecha == fila.fecha_quiebre, (nivel, dias, fila)
+
+    t_bucle = _medir(lambda: cobertura_bucle(inventario, df_pred), args.repeticiones)
+    t_vect = _medir(lambda: cobertura_inventario.cobertura(df_pred['fecha'], df_pred['prediccion'], inventario), args.repeticiones)
+    t_bucle_n = t_bucle * args.niveles  # el bucle tendría que repetirse por nivel
+    t_vect_n = _medir(lambda: cobertura_inventario.calcular_cobertura(df_pred['fecha'], df_pred['prediccion'], niveles), args.repeticiones)
+
+    print(f"Serie: {len(df_pred)} días ({args.anios} años), inventario={inventario:.1f} kg")
+    print(f"  1 nivel      bucle: {t_bucle * 1000:9.2f} ms   vectorizado: {t_vect * 1000:7.2f} ms   x{t_bucle / t_vect:,.0f}")
+    print(f"  {args.niveles} niveles  bucle: {t_bucle_n * 1000:9.2f} ms*  vectorizado: {t_vect_n * 1000:7.2f} ms   x{t_bucle_n / t_vect_n:,.0f}")
+    print("  (* estimado: tiempo de un nivel multiplicado por el número de niveles)")
+
+
+if __name__ == "__main__":
+    main()
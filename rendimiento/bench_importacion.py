@@ -0,0 +1,122 @@
+# ============================================================================
+# BENCHMARK: TIEMPO DE IMPORTACIÓN DE LOS PUNTOS DE ENTRADA (ARRANQUE EN FRÍO)
+# ============================================================================
+# Uso: python -m rendimiento.bench_importacion [--repeticiones 5] [--verificar]
+#                                              [--actualizar] [--detalle 10]
+#
+# Para cada script de Streamlit se toman sus importaciones de nivel superior
+# (sin ejecutar la app, que conectaría a la base) y se importan en un proceso
+# nuevo con `python -X importtime`. Se suma el tiempo acumulado de cada paquete
+# de primer nivel y se guarda el mínimo de varias repeticiones.
+#
+# --verificar compara contra rendimiento/presupuesto_importacion.json y termina
+# con código 1 si algún punto de entrada se pasa del presupuesto; --actualizar
+# reescribe el presupuesto con lo medido más un margen. matplotlib, seaborn y
+# openpyxl no deberían aparecer en el detalle: se cargan dentro de las vistas
+# que los usan (servicios.graficas, pandas.read_excel).
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRESUPUESTO = os.path.join(RAIZ, "rendimiento", "presupuesto_importacion.json")
+MARGEN = 1.5
+
+ENTRADAS = {
+    "Log_in.py": "Log_in.py",
+    "proveedor_dashboard_final.py": "proveedor_dashboard_final.py",
+    "dashboard.py": "dashboard.py",
+    "proveedor_dashboard_Excel.py": os.path.join("Dashboards_Separados", "proveedor_dashboard_Excel.py"),
+}
+
+# Dependencias que deben quedar fuera del arranque
+DIFERIDAS = ("matplotlib", "seaborn", "openpyxl")
+
+_LINEA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def importaciones_de(ruta):
+    """Código con las importaciones de nivel superior del script"""
+    with open(os.path.join(RAIZ, ruta), encoding="utf-8") as f:
+        arbol = ast.parse(f.read())
+    return "\n".join(ast.unparse(n) for n in arbol.body if isinstance(n, (ast.Import, ast.ImportFrom)))
+
+
+def medir(codigo, omitir=()):
+    """(total_ms, {paquete: ms acumulado}) de un proceso nuevo que ejecuta `codigo`"""
+    entorno = dict(os.environ, PYTHONPATH=RAIZ)
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True,
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr.strip().splitlines()[-1])
+
+    paquetes = {}
+    for linea in resultado.stderr.splitlines():
+        m = _LINEA.match(linea)
+        # Un solo espacio de sangría = importado directamente por el script
+        if m and len(m.group(3)) == 1 and m.group(4) not in omitir:
+            paquetes[m.group(4)] = int(m.group(2)) / 1000
+    return sum(paquetes.values()), paquetes
+
+
+def modulos_cargados(codigo):
+    codigo += "\nimport sys\nprint(' '.join(sys.modules))"
+    entorno = dict(os.environ, PYTHONPATH=RAIZ)
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, env=entorno,
+                            capture_output=True, text=True, check=True).stdout
+    return set(salida.split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Presupuesto de tiempo de importación")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--detalle", type=int, default=8, help="paquetes más pesados a listar")
+    parser.add_argument("--verificar", action="store_true")
+    parser.add_argument("--actualizar", action="store_true")
+    args = parser.parse_args()
+
+    presupuesto = {}
+    if os.path.exists(PRESUPUESTO):
+        with open(PRESUPUESTO, encoding="utf-8") as f:
+            presupuesto = json.load(f)
+
+    # Lo que el intérprete importa al arrancar (site, encodings...) no cuenta
+    _, arranque = medir("pass")
+    medidos, excedidos = {}, []
+    for nombre, ruta in ENTRADAS.items():
+        codigo = importaciones_de(ruta)
+        mejor, detalle = min((medir(codigo, arranque) for _ in range(args.repeticiones)), key=lambda r: r[0])
+        medidos[nombre] = mejor
+        limite = presupuesto.get(nombre)
+        estado = "" if limite is None else (" OK" if mejor <= limite else " EXCEDIDO")
+        print(f"{nombre:32s} {mejor:8.1f} ms" + (f"  (presupuesto {limite:.0f} ms){estado}" if limite else ""))
+        for paquete, ms in sorted(detalle.items(), key=lambda kv: -kv[1])[:args.detalle]:
+            print(f"    {paquete:28s} {ms:8.1f} ms")
+
+        diferidas = sorted(m for m in modulos_cargados(codigo) if m.split(".")[0] in DIFERIDAS)
+        if diferidas:
+            print(f"    ¡Carga dependencias diferidas!: {', '.join(sorted({m.split('.')[0] for m in diferidas}))}")
+            excedidos.append(nombre)
+        if limite is not None and mejor > limite:
+            excedidos.append(nombre)
+
+    if args.actualizar:
+        nuevo = {n: round(ms * MARGEN, -1) for n, ms in medidos.items()}
+        with open(PRESUPUESTO, "w", encoding="utf-8") as f:
+            json.dump(nuevo, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"Presupuesto actualizado en {PRESUPUESTO}")
+
+    if args.verificar and excedidos:
+        print(f"Fuera de presupuesto: {', '.join(sorted(set(excedidos)))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# ============================================================================
+# BENCHMARK: INSERT DE UNA FILA (DataFrame.to_sql vs. servicios.escritura)
+# ============================================================================
+# Uso: python -m rendimiento.bench_insercion [--filas 500]
+#
+# Mide el costo en Python de guardar un pedido con to_sql (DataFrame +
+# reflexión de la tabla) frente a insertar() con sentencia cacheada, y el modo
+# masivo (executemany) para el mismo número de filas. Usa SQLite en memoria
+# para que el tiempo de red no oculte la diferencia.
+import argparse
+import datetime
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from servicios.escritura import insertar
+
+DDL = ("CREATE TABLE pedidos_cliente (id INTEGER PRIMARY KEY AUTOINCREMENT, cliente_id TEXT, "
+       "producto TEXT, cantidad REAL, detalle TEXT, fecha DATETIME)")
+
+
+def _pedido(i):
+    return {'cliente_id': f"cliente{i % 50}", 'producto': 'cafe', 'cantidad': 1.0 + i % 7,
+            'detalle': '', 'fecha': datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 365)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inserciones")
+    parser.add_argument("--filas", type=int, default=500)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text(DDL))
+    filas = [_pedido(i) for i in range(args.filas)]
+
+    inicio = time.perf_counter()
+    for f in filas:
+        pd.DataFrame([f]).to_sql('pedidos_cliente', engine, if_exists='append', index=False)
+    t_to_sql = (time.perf_counter() - inicio) / args.filas
+
+    inicio = time.perf_counter()
+    for f in filas:
+        insertar(engine, 'pedidos_cliente', f)
+    t_insertar = (time.perf_counter() - inicio) / args.filas
+
+    inicio = time.perf_counter()
+    insertar(engine, 'pedidos_cliente', filas)
+    t_masivo = (time.perf_counter() - inicio) / args.filas
+
+    print(f"Por fila ({args.filas} filas, SQLite en memoria):")
+    print(f"  to_sql            {t_to_sql * 1000:8.3f} ms")
+    print(f"  insertar          {t_insertar * 1000:8.3f} ms   x{t_to_sql / t_insertar:,.1f}")
+    print(f"  insertar (masivo) {t_masivo * 1000:8.3f} ms   x{t_to_sql / t_masivo:,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# ============================================================================
+# BENCHMARK: VISTAS DE LOS DASHBOARDS SOBRE DATOS SINTÉTICOS (1k / 100k / 1M)
+# ============================================================================
+# Uso: python -m rendimiento.bench_vistas [--escalas 1k,100k,1M] [--vistas apartado_pagos,...]
+#                                         [--regenerar] [--verificar] [--base COMMIT]
+#
+# Para cada escala se genera (una vez) una base SQLite con
+# rendimiento.datos_sinteticos y, en un proceso nuevo con CAFE_BACKEND=sqlite
+# apuntando a ella, se importan los dashboards en modo "bare" de Streamlit (sin
+# servidor: los widgets devuelven su valor por defecto y los botones False) y se
+# llama a cada función de vista:
+#   - frío: caché de consultas, caché de gráficas y almacén de pedidos vacíos;
+#   - caliente: inmediatamente después, el mejor de --repeticiones;
+#   - memoria: otra pasada en frío con tracemalloc (pico sobre lo ya asignado).
+# Si la pasada en frío supera --limite segundos no se repite (caliente y
+# memoria quedan vacías) para que 1M no tarde horas en las vistas lentas.
+# Consultas, filas leídas y tiempo en SQL salen de servicios.instrumentacion.
+# matplotlib y seaborn se importan antes de medir: su carga es un costo único
+# por proceso (ver bench_importacion) y no depende del volumen de datos.
+#
+# Cada corrida se agrega a rendimiento/historial_vistas.jsonl con el commit
+# actual y se compara contra la anterior de la misma escala (o la de --base):
+# más consultas o filas, o un tiempo en frío UMBRAL veces mayor (y al menos
+# MIN_DIFERENCIA más lento), es una regresión; --verificar termina con código 1
+# si hay alguna.
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORIAL = os.path.join(RAIZ, "rendimiento", "historial_vistas.jsonl")
+UMBRAL = 1.25
+# Diferencias menores a esto en frío son ruido de una sola pasada
+MIN_DIFERENCIA = 0.05
+
+DASHBOARDS = {
+    "final": ("proveedor_dashboard_final.py", [
+        "vista_ver_pedidos", "registrar_pedido", "eliminar_pedido", "importar_pedidos",
+        "control_de_inventario", "resumen_estadisticas_globales", "gestion_clientes", "pedidos_pendientes",
+        "dashboard_graficas_avanzadas", "gestion_productos", "apartado_pagos",
+    ]),
+    "excel": (os.path.join("Dashboards_Separados", "proveedor_dashboard_Excel.py"), [
+        "vista_ver_pedidos", "registrar_pedido", "eliminar_pedido", "control_de_inventario",
+        "resumen_estadisticas_globales", "crear_cliente", "editar_cliente", "borrar_cliente",
+    ]),
+}
+
+
+# ----------------------------------------------------------------------------
+# Proceso hijo: importa los dashboards y mide sus vistas
+# ----------------------------------------------------------------------------
+def cargar_dashboard(nombre, ruta):
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location(f"bench_{nombre}", os.path.join(RAIZ, ruta))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def _en_frio(modulo):
+    from servicios import cache_consultas, graficas
+
+    cache_consultas.limpiar_cache()
+    graficas.limpiar_cache()
+    almacen = getattr(getattr(modulo, "REPO", None), "almacen_pedidos", None)
+    if almacen is not None:
+        almacen.reiniciar()
+
+
+def _medir_vista(modulo, vista, repeticiones, limite):
+    from servicios.instrumentacion import medir
+
+    func = getattr(modulo, vista)
+    resultado = {"vista": vista, "error": None, "caliente": None, "memoria_pico": None}
+    try:
+        _en_frio(modulo)
+        with medir(todos_los_hilos=True) as m:
+            func()
+        resultado["frio"] = m.como_dict()
+        resultado["sentencias"] = dict(m.sentencias.most_common(5))
+        if m.segundos > limite:
+            return resultado
+
+        calientes = []
+        for _ in range(repeticiones):
+            with medir(todos_los_hilos=True) as m:
+                func()
+            calientes.append(m)
+        resultado["caliente"] = min(calientes, key=lambda x: x.segundos).como_dict()
+
+        _en_frio(modulo)
+        with medir(memoria=True, todos_los_hilos=True) as m:
+            func()
+        resultado["memoria_pico"] = m.memoria_pico
+    except Exception as e:
+        resultado["error"] = f"{type(e).__name__}: {e}"
+    return resultado
+
+
+def ejecutar(ruta_db, vistas, repeticiones, limite, salida):
+    """Cuerpo del proceso hijo: mide las vistas contra la base `ruta_db`"""
+    import streamlit.logger
+
+    os.environ["CAFE_BACKEND"] = "sqlite"
+    os.environ["DB_SQLITE_RUTA"] = ruta_db
+    os.environ["DIAGNOSTICO_LOG"] = ""
+    sys.path.insert(0, RAIZ)
+    # Sin servidor cada widget avisa "missing ScriptRunContext"
+    streamlit.logger.set_log_level("error")
+    import matplotlib.pyplot  # noqa: F401
+    import seaborn  # noqa: F401
+
+    resultados = []
+    for nombre, (ruta, nombres_vistas) in DASHBOARDS.items():
+        modulo = cargar_dashboard(nombre, ruta)
+        for vista in nombres_vistas:
+            if vistas and vista not in vistas:
+                continue
+            r = _medir_vista(modulo, vista, repeticiones, limite)
+            r["dashboard"] = nombre
+            resultados.append(r)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f)
+
+
+# ----------------------------------------------------------------------------
+# Proceso principal: genera datos, lanza los hijos, guarda y compara
+# ----------------------------------------------------------------------------
+def _commit_actual():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        sucio = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=RAIZ,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("+" if sucio else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def medir_escala(escala, vistas, repeticiones, limite, regenerar):
+    from rendimiento import datos_sinteticos
+
+    ruta = datos_sinteticos.ruta_escala(escala)
+    if regenerar or not os.path.exists(ruta):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        print(f"Generando datos {escala} en {ruta}")
+        datos_sinteticos.generar(ruta, datos_sinteticos.ESCALAS[escala])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        salida = os.path.join(tmp, "resultados.json")
+        codigo = ("from rendimiento.bench_vistas import ejecutar; "
+                  f"ejecutar({ruta!r}, {sorted(vistas)!r}, {repeticiones}, {limite}, {salida!r})")
+        entorno = dict(os.environ, PYTHONPATH=RAIZ)
+        proceso = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, env=entorno,
+                                 capture_output=True, text=True)
+        if proceso.returncode != 0 or not os.path.exists(salida):
+            raise RuntimeError(proceso.stderr.strip()[-2000:])
+        with open(salida, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def cargar_historial():
+    if not os.path.exists(HISTORIAL):
+        return []
+    with open(HISTORIAL, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+
+def corrida_base(historial, escala, commit=None):
+    """Última corrida guardada de la escala (del commit dado, si se indica)"""
+    for corrida in reversed(historial):
+        if corrida["escala"] == escala and (commit is None or corrida["commit"].rstrip("+") == commit):
+            return corrida
+    return None
+
+
+def regresiones(actual, base):
+    """Lista de (dashboard, vista, motivo) que empeoraron respecto a base"""
+    if base is None:
+        return []
+    anteriores = {(r["dashboard"], r["vista"]): r for r in base["resultados"]}
+    encontradas = []
+    for r in actual:
+        previo = anteriores.get((r["dashboard"], r["vista"]))
+        if previo is None or r["error"] or previo["error"]:
+            if r["error"] and previo is not None and not previo["error"]:
+                encontradas.append((r["dashboard"], r["vista"], f"ahora falla: {r['error']}"))
+            continue
+        ahora, antes = r["frio"], previo["frio"]
+        if ahora["consultas"] > antes["consultas"]:
+            encontradas.append((r["dashboard"], r["vista"], f"consultas {antes['consultas']} -> {ahora['consultas']}"))
+        if ahora["filas"] > antes["filas"]:
+            encontradas.append((r["dashboard"], r["vista"], f"filas {antes['filas']} -> {ahora['filas']}"))
+        if ahora["segundos"] > max(antes["segundos"] * UMBRAL, antes["segundos"] + MIN_DIFERENCIA):
+            encontradas.append((r["dashboard"], r["vista"],
+                                f"frío {antes['segundos'] * 1000:.0f} -> {ahora['segundos'] * 1000:.0f} ms"))
+    return encontradas
+
+
+def imprimir(escala, resultados):
+    print(f"\n== Escala {escala}")
+    print(f"{'dashboard':9s} {'vista':32s} {'frío ms':>9s} {'sql ms':>8s} {'cal. ms':>8s} "
+          f"{'consultas':>9s} {'filas':>10s} {'pico MB':>8s}")
+    for r in resultados:
+        if r["error"]:
+            print(f"{r['dashboard']:9s} {r['vista']:32s} ERROR {r['error']}")
+            continue
+        frio, cal, pico = r["frio"], r["caliente"], r["memoria_pico"]
+        print(f"{r['dashboard']:9s} {r['vista']:32s} {frio['segundos'] * 1000:9.1f} "
+              f"{frio['segundos_sql'] * 1000:8.1f} "
+              + (f"{cal['segundos'] * 1000:8.1f} " if cal else f"{'-':>8s} ")
+              + f"{frio['consultas']:9d} {frio['filas']:10,d} "
+              + (f"{pico / 2**20:8.1f}" if pico is not None else f"{'-':>8s}"))
+
+
+def main():
+    from rendimiento.datos_sinteticos import ESCALAS
+
+    parser = argparse.ArgumentParser(description="Benchmark de las vistas de los dashboards")
+    parser.add_argument("--escalas", default="1k,100k", help=f"separadas por coma ({', '.join(ESCALAS)})")
+    parser.add_argument("--vistas", default="", help="solo estas vistas (separadas por coma)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--limite", type=float, default=10.0,
+                        help="segundos en frío a partir de los cuales no se repite la vista")
+    parser.add_argument("--regenerar", action="store_true", help="vuelve a generar los datos sintéticos")
+    parser.add_argument("--base", default=None, help="commit contra el que comparar")
+    parser.add_argument("--no-guardar", action="store_true")
+    parser.add_argument("--verificar", action="store_true")
+    args = parser.parse_args()
+
+    escalas = [e.strip() for e in args.escalas.split(",") if e.strip()]
+    desconocidas = [e for e in escalas if e not in ESCALAS]
+    if desconocidas:
+        parser.error(f"escalas desconocidas: {', '.join(desconocidas)}")
+    vistas = {v.strip() for v in args.vistas.split(",") if v.strip()}
+
+    historial = cargar_historial()
+    commit = _commit_actual()
+    todas = []
+    for escala in escalas:
+        resultados = medir_escala(escala, vistas, args.repeticiones, args.limite, args.regenerar)
+        imprimir(escala, resultados)
+        base = corrida_base(historial, escala, args.base)
+        encontradas = regresiones(resultados, base)
+        if base is not None:
+            print(f"-- comparado con {base['commit']} ({base['fecha']}): "
+                  f"{len(encontradas)} regresión(es)")
+            for dashboard, vista, motivo in encontradas:
+                print(f"   {dashboard}.{vista}: {motivo}")
+        todas += encontradas
+
+        if not args.no_guardar:
+            corrida = {
+                "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+                "commit": commit,
+                "escala": escala,
+                "python": platform.python_version(),
+                "resultados": resultados,
+            }
+            with open(HISTORIAL, "a", encoding="utf-8") as f:
+                f.write(json.dumps(corrida, ensure_ascii=False) + "\n")
+
+    if args.verificar and todas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
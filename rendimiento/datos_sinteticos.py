@@ -0,0 +1,221 @@
+# ============================================================================
+# DATOS SINTÉTICOS CON EL ESQUEMA DE datos_prueba A ESCALA (1k / 100k / 1M)
+# ============================================================================
+# Uso: python -m rendimiento.datos_sinteticos --escala 100k [--ruta archivo.sqlite]
+#
+# Crea una base SQLite con el mismo esquema que servicios.repositorios.sqlite_local
+# y la llena con datos parecidos a los reales: productos, cantidades y kg
+# predichos se muestrean de los CSV de datos_prueba, los clientes crecen con la
+# raíz de la escala y las fechas cubren los últimos años. Las filas se insertan
+# directamente con sqlite3 en bloques para que 1M de pedidos tarde segundos.
+#
+# Filas por tabla para una escala N:
+#   pedidos_cliente N, log_pedidos_entregados N/2, comparacion_prediccion_vs_real
+#   N/10, control_inventario_cafe N/10, pagos_cliente N/20,
+#   log_eliminaciones_pedidos N/100, pedidos_pendientes N/1000 + 5,
+#   predicciones_cafe_365_dias un día por fila (hasta 100 años).
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from servicios import cuentas_clientes, estado_inventario, exactitud_predicciones, resumen_mensual
+from servicios.conexion import CARPETA_DATOS
+from servicios.repositorios.sqlite_local import crear_engine_sqlite, leer_csv
+
+ESCALAS = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+CARPETA_BENCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos_bench")
+BLOQUE = 100_000
+MAX_DIAS_PREDICCION = 36_500
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+
+def ruta_escala(escala):
+    return os.path.join(CARPETA_BENCH, f"vistas_{escala}.sqlite")
+
+
+def _muestras_reales():
+    """Productos, cantidades y kg predichos observados en datos_prueba"""
+    pedidos = leer_csv(os.path.join(CARPETA_DATOS, "pedidos_cliente.csv"))
+    pred = leer_csv(os.path.join(CARPETA_DATOS, "predicciones_cafe_365_dias.csv"))
+    productos = pedidos['producto'].dropna().astype(str)
+    cantidades = pd.to_numeric(pedidos['cantidad'], errors='coerce').dropna()
+    kg_pred = pd.to_numeric(pred['Kg_Predichos'], errors='coerce').dropna()
+    return {
+        "productos": productos.value_counts(normalize=True),
+        "cantidades": cantidades[cantidades > 0].to_numpy(),
+        "kg_predichos": kg_pred[kg_pred > 0].to_numpy(),
+    }
+
+
+class Generador:
+    """Genera las tablas de una escala con una semilla fija (reproducible)"""
+
+    def __init__(self, n, semilla=0):
+        self.n = n
+        self.rng = np.random.default_rng(semilla)
+        self.muestras = _muestras_reales()
+        self.clientes = np.array([f"cliente_{i:05d}" for i in range(max(10, int(math.sqrt(n))))])
+        self.hoy = pd.Timestamp.today().normalize()
+        self.inicio = self.hoy - pd.Timedelta(days=3 * 365)
+
+    def productos(self, k):
+        dist = self.muestras["productos"]
+        return self.rng.choice(dist.index.to_numpy(), size=k, p=dist.to_numpy())
+
+    def cantidades(self, k, muestra="cantidades"):
+        base = self.rng.choice(self.muestras[muestra], size=k)
+        return np.round(base * self.rng.uniform(0.8, 1.2, size=k), 1)
+
+    def fechas(self, k, inicio=None, dias=None):
+        inicio = self.inicio if inicio is None else inicio
+        dias = (self.hoy - inicio).days if dias is None else dias
+        segundos = self.rng.integers(0, max(1, dias) * 86_400, size=k)
+        return (inicio + pd.to_timedelta(segundos, unit="s")).strftime(FORMATO_FECHA)
+
+    def tablas(self):
+        """Pares (tabla, función que devuelve un DataFrame de k filas, filas totales)"""
+        n = self.n
+        return [
+            ("usuarios", self.usuarios, len(self.clientes) + 1),
+            ("precios_producto", self.precios, len(self.muestras["productos"])),
+            ("inventario_cafe", self.inventario, max(1, n // 1000)),
+            ("pedidos_cliente", self.pedidos, n),
+            ("log_pedidos_entregados", self.entregados, n // 2),
+            ("comparacion_prediccion_vs_real", self.comparaciones, n // 10),
+            ("control_inventario_cafe", self.control, n // 10),
+            ("pagos_cliente", self.pagos, n // 20),
+            ("log_eliminaciones_pedidos", self.eliminaciones, n // 100),
+            ("pedidos_pendientes", self.pendientes, n // 1000 + 5),
+            ("predicciones_cafe_365_dias", self.predicciones, min(n, MAX_DIAS_PREDICCION)),
+        ]
+
+    def usuarios(self, k, desde):
+        filas = [{"usuario": "proveedor1", "rol": "Proveedor", "contrasena": "bench", "nombre": "", "telefono": ""}]
+        filas += [{"usuario": c, "rol": "Cliente", "contrasena": "bench", "nombre": c, "telefono": ""} for c in self.clientes]
+        return pd.DataFrame(filas[desde:desde + k])
+
+    def precios(self, k, desde):
+        nombres = self.muestras["productos"].index[desde:desde + k]
+        return pd.DataFrame({"nombre": nombres, "precio": np.round(self.rng.uniform(50, 400, size=len(nombres)), 2)})
+
+    def inventario(self, k, desde):
+        return pd.DataFrame({"cantidad_kg": self.cantidades(k), "fecha_actualizacion": self.fechas(k)})
+
+    def pedidos(self, k, desde):
+        return pd.DataFrame({
+            "cliente_id": self.rng.choice(self.clientes, size=k),
+            "producto": self.productos(k),
+            "cantidad": self.cantidades(k),
+            "detalle": "",
+            "fecha": self.fechas(k),
+        })
+
+    def entregados(self, k, desde):
+        df = self.pedidos(k, desde).rename(columns={"fecha": "fecha_solicitada"})
+        df["fecha_entrega"] = self.fechas(k)
+        df["id_pendiente"] = np.arange(desde, desde + k) + 1
+        return df
+
+    def comparaciones(self, k, desde):
+        kg_real = self.cantidades(k)
+        kg_pred = self.cantidades(k, "kg_predichos")
+        dif_dias = self.rng.integers(-5, 6, size=k)
+        fecha_real = self.fechas(k)
+        fecha_pred = (pd.to_datetime(fecha_real) - pd.to_timedelta(dif_dias, unit="D")).strftime(FORMATO_FECHA)
+        return pd.DataFrame({
+            "cliente_id": self.rng.choice(self.clientes, size=k),
+            "fecha_real": fecha_real, "kg_real": kg_real,
+            "fecha_predicha": fecha_pred, "kg_predicha": kg_pred,
+            "dif_dias": dif_dias, "dif_kg": np.round(kg_real - kg_pred, 1),
+            "registro": fecha_real, "fue_pred_usada": self.rng.random(k) < 0.5,
+        })
+
+    def control(self, k, desde):
+        return pd.DataFrame({
+            "cantidad_antes": self.cantidades(k), "cantidad_despues": self.cantidades(k),
+            "fecha_cambio": self.fechas(k), "usuario": "proveedor1",
+        })
+
+    def pagos(self, k, desde):
+        return pd.DataFrame({
+            "cliente_id": self.rng.choice(self.clientes, size=k),
+            "monto": np.round(self.rng.uniform(100, 20_000, size=k), 2),
+            "fecha_pago": self.fechas(k), "observaciones": "",
+        })
+
+    def eliminaciones(self, k, desde):
+        df = self.pedidos(k, desde)
+        df["id"] = np.arange(desde, desde + k) + 1
+        df["info"] = df["cliente_id"] + " | " + df["producto"]
+        df["usuario"] = "proveedor1"
+        df["fecha_eliminacion"] = self.fechas(k)
+        return df
+
+    def pendientes(self, k, desde):
+        df = self.pedidos(k, desde)
+        df["fecha"] = self.fechas(k, inicio=self.hoy, dias=30)
+        return df
+
+    def predicciones(self, k, desde):
+        fechas = self.hoy + pd.to_timedelta(np.arange(desde, desde + k), unit="D")
+        return pd.DataFrame({
+            "Fecha": fechas.strftime(FORMATO_FECHA),
+            "Dia_Semana": fechas.day_name(), "Mes": fechas.month_name(),
+            "Kg_Predichos": self.cantidades(k, "kg_predichos"),
+            "Dias_Desde_Hoy": np.arange(desde, desde + k),
+        })
+
+
+def _insertar(conexion, tabla, df):
+    columnas = ", ".join(df.columns)
+    marcas = ", ".join("?" for _ in df.columns)
+    filas = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    conexion.executemany(f"INSERT INTO {tabla} ({columnas}) VALUES ({marcas})", filas)
+
+
+def generar(ruta, n, semilla=0, verbose=True):
+    """Crea (o reemplaza) la base de benchmark en `ruta` con escala n"""
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+    engine = crear_engine_sqlite(ruta)
+    generador = Generador(n, semilla)
+    crudo = engine.raw_connection()
+    try:
+        for tabla, construir, total in generador.tablas():
+            inicio = time.perf_counter()
+            for desde in range(0, total, BLOQUE):
+                _insertar(crudo, tabla, construir(min(BLOQUE, total - desde), desde))
+            crudo.commit()
+            if verbose:
+                print(f"  {tabla:32s} {total:>9,d} filas  {time.perf_counter() - inicio:6.2f} s")
+    finally:
+        crudo.close()
+    # Los agregados se materializan aquí para que las vistas no paguen reconstruir()
+    resumen_mensual.preparar(engine)
+    exactitud_predicciones.preparar(engine)
+    cuentas_clientes.preparar(engine)
+    estado_inventario.preparar(engine)
+    engine.dispose()
+    return ruta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera la base sintética de una escala")
+    parser.add_argument("--escala", choices=list(ESCALAS), default="1k")
+    parser.add_argument("--ruta", default=None)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    ruta = args.ruta or ruta_escala(args.escala)
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    print(f"Generando {args.escala} en {ruta}")
+    generar(ruta, ESCALAS[args.escala], args.semilla)
+
+
+if __name__ == "__main__":
+    main()
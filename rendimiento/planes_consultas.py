@@ -0,0 +1,292 @@
+# ============================================================================
+# COMPROBACIÓN: PLANES DE EJECUCIÓN DE LAS CONSULTAS DE LA APLICACIÓN
+# ============================================================================
+# Uso: python -m rendimiento.planes_consultas [--escala 100k] [--filas-minimas 10000]
+#                                             [--todas]
+#
+# Sobre una copia de la base sintética de la escala (ver datos_sinteticos), con
+# las migraciones de servicios.migraciones aplicadas, se importa el dashboard
+# final en modo "bare" y se ejecutan todas sus vistas más las operaciones que
+# en modo bare no se disparan (EXTRAS: filtros, altas, bajas, pagos,
+# entregas...). Cada sentencia que llega al engine se captura con sus
+# parámetros y después se pasa por EXPLAIN QUERY PLAN.
+#
+# Falla (código 1) si alguna consulta recorre completa (SCAN sin índice) una
+# tabla con al menos --filas-minimas filas y no está en PERMITIDAS, la lista
+# de recorridos intencionados con su motivo.
+import argparse
+import datetime
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (tabla, fragmento de la sentencia, motivo)
+PERMITIDAS = [
+    ("pedidos_cliente", "SELECT * FROM pedidos_cliente ORDER BY id",
+     "carga inicial del almacén de pedidos (una vez por proceso)"),
+    ("pedidos_cliente", "SELECT COUNT(*), COALESCE(SUM(cantidad), 0) FROM pedidos_cliente",
+     "totales del resumen sin ventana de fechas"),
+    ("pedidos_cliente", "GROUP BY producto",
+     "kg por producto del resumen sin ventana de fechas"),
+    ("pedidos_cliente", "GROUP BY cliente_id ORDER BY total_kg DESC",
+     "ranking de clientes del resumen sin ventana de fechas"),
+    ("pedidos_cliente", "SELECT COUNT(*) AS n, COALESCE(MAX(id), 0) AS max_id FROM pedidos_cliente",
+     "sincronización del almacén de pedidos (COUNT recorre el índice más chico)"),
+    ("pedidos_cliente", "FROM pedidos_cliente GROUP BY DATE(fecha)",
+     "evolución diaria de todos los pedidos (Ver pedidos sin filtros)"),
+    ("predicciones_cafe_365_dias", "SELECT Fecha, Kg_Predichos FROM predicciones_cafe_365_dias",
+     "serie completa de predicciones para la cobertura de inventario y las gráficas"),
+]
+
+# Palabras que pueden seguir al nombre de la tabla y no son un alias
+_NO_ALIAS = {"WHERE", "LEFT", "RIGHT", "INNER", "OUTER", "JOIN", "ON", "ORDER", "GROUP", "LIMIT",
+             "USING", "SET", "VALUES", "HAVING", "UNION", "FOR", "AS"}
+_TABLAS_SQL = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_PASO = re.compile(r"^(SCAN|SEARCH)\s+(?:TABLE\s+)?(\S+)(.*)$")
+_ESPACIOS = re.compile(r"\s+")
+
+
+# ---------------------------------------------------------------------------
+# Captura
+# ---------------------------------------------------------------------------
+class Captura:
+    """Sentencias distintas que ejecuta el engine, con los parámetros de la primera vez"""
+
+    def __init__(self):
+        self.sentencias = {}
+        self.origen = None
+
+    def __call__(self, conn, cursor, sentencia, parametros, contexto, executemany):
+        if self.origen is None:
+            return
+        clave = _ESPACIOS.sub(" ", sentencia).strip()
+        if clave not in self.sentencias:
+            if executemany:
+                parametros = parametros[0] if parametros else ()
+            self.sentencias[clave] = (sentencia, parametros, self.origen)
+
+
+def _extras(modulo):
+    """Operaciones que las vistas solo hacen al pulsar botones o cambiar filtros"""
+    from servicios import (autenticacion, cuentas_clientes, estadisticas, exactitud_predicciones, importacion,
+                           tabla_paginada)
+    from servicios.entregas import entregar_pendientes
+
+    engine, repo = modulo.ENGINE, modulo.REPO
+    with engine.connect() as conn:
+        from sqlalchemy import text
+
+        cliente, producto = conn.execute(text("SELECT cliente_id, producto FROM pedidos_cliente LIMIT 1")).first()
+        id_pedido = conn.execute(text("SELECT MAX(id) FROM pedidos_cliente")).scalar()
+        id_pendiente = conn.execute(text("SELECT MIN(id) FROM pedidos_pendientes")).scalar()
+        prediccion = conn.execute(text("SELECT Fecha, Kg_Predichos FROM predicciones_cafe_365_dias LIMIT 1")).first()
+    hoy = datetime.date.today()
+    hace_un_anio = hoy - datetime.timedelta(days=365)
+
+    return [
+        ("login", lambda: autenticacion.buscar_usuario_sql(engine, cliente)),
+        ("pedidos por cliente", lambda: modulo.cargar_pagina_pedidos(cliente=cliente)),
+        ("pedidos por producto", lambda: modulo.cargar_pagina_pedidos(producto=producto)),
+        ("pedidos por fechas", lambda: modulo.cargar_pagina_pedidos(fecha_ini=hace_un_anio, fecha_fin=hoy)),
+        ("conteo por cliente", lambda: modulo.contar_pedidos(cliente=cliente, fecha_ini=hace_un_anio, fecha_fin=hoy)),
+        ("rango por cliente", lambda: modulo.rango_fechas_pedidos(cliente=cliente)),
+        ("evolución por cliente", lambda: modulo.evolucion_pedidos(cliente=cliente)),
+        ("cliente con pedidos", lambda: modulo.cliente_tiene_pedidos(cliente)),
+        ("buscar pedido por id", lambda: modulo.buscar_pedidos(id_pedido=id_pedido)),
+        ("buscar pedidos", lambda: modulo.buscar_pedidos(cliente=cliente, producto=producto,
+                                                         fecha_ini=hace_un_anio, fecha_fin=hoy)),
+        ("resumen con ventana", lambda: (estadisticas.totales_pedidos(engine, hace_un_anio, hoy),
+                                         estadisticas.ranking_clientes(engine, 20, hace_un_anio, hoy))),
+        ("exactitud de un cliente", lambda: exactitud_predicciones.leer_exactitud(engine, cliente)),
+        ("comparaciones de un cliente", lambda: tabla_paginada.leer_pagina(
+            engine, **modulo.COMPARACIONES, where="cliente_id = :cliente", params={"cliente": cliente})),
+        ("comparaciones hasta una fecha", lambda: tabla_paginada.leer_pagina(
+            engine, **modulo.COMPARACIONES, hasta_fecha=hace_un_anio)),
+        ("total de comparaciones", lambda: tabla_paginada.contar_filas(
+            engine, modulo.COMPARACIONES["tabla"], modulo.COMPARACIONES["orden"])),
+        ("cuenta de un cliente", lambda: cuentas_clientes.estado_cuenta(engine, cliente)),
+        ("entregas de un cliente", lambda: tabla_paginada.leer_pagina(
+            engine, **modulo.ENTREGAS_CLIENTE, params={"cliente": cliente})),
+        ("pagos de un cliente", lambda: tabla_paginada.leer_pagina(
+            engine, **modulo.PAGOS_CLIENTE, params={"cliente": cliente})),
+        ("inventario actual", repo.inventario_actual),
+        ("historial de inventario", lambda: tabla_paginada.leer_pagina(
+            engine, **modulo.HISTORIAL_INVENTARIO, hasta_fecha=hoy)),
+        ("eliminaciones", lambda: tabla_paginada.leer_pagina(engine, **modulo.ELIMINACIONES, hasta_fecha=hoy)),
+        ("actualizar inventario", lambda: repo.actualizar_inventario(123.0, "planes")),
+        ("registrar pago", lambda: repo.registrar_pago({"cliente_id": cliente, "monto": 1.0,
+                                                         "fecha_pago": hoy, "observaciones": ""})),
+        ("importar pedidos", lambda: importacion.importar_pedidos(
+            engine, os.path.join(RAIZ, "datos_prueba", "pedidos_cliente.csv"))),
+        ("guardar pedido", lambda: repo.guardar_pedido({"cliente_id": cliente, "producto": producto, "cantidad": 1.0,
+                                                         "detalle": "", "fecha": datetime.datetime.now()})),
+        ("eliminar pedido", lambda: repo.eliminar_pedido(id_pedido)),
+        ("eliminar predicción", lambda: repo.eliminar_prediccion(prediccion[0], prediccion[1])),
+        ("entregar pendiente", lambda: entregar_pendientes(engine, [id_pendiente], datetime.datetime.now(),
+                                                           {id_pendiente: (hoy, 1.0)})),
+    ]
+
+
+def _silenciar_streamlit():
+    """Sin servidor cada widget avisa "missing ScriptRunContext"; solo interesan los errores"""
+    import logging
+
+    import streamlit.logger
+    from streamlit import config
+
+    # Leer una opción fuerza el parseo de la configuración, que reajusta el nivel
+    config.get_option("logger.level")
+    streamlit.logger.set_log_level("error")
+    for nombre in list(logging.root.manager.loggerDict):
+        if nombre.startswith("streamlit"):
+            logging.getLogger(nombre).setLevel(logging.ERROR)
+
+
+def capturar(ruta_db):
+    """{sentencia normalizada: (sql, parámetros, origen)} y errores de las vistas"""
+    os.environ["CAFE_BACKEND"] = "sqlite"
+    os.environ["DB_SQLITE_RUTA"] = ruta_db
+    os.environ["DIAGNOSTICO_LOG"] = ""
+    sys.path.insert(0, RAIZ)
+    _silenciar_streamlit()
+    from sqlalchemy import event
+
+    from rendimiento.bench_vistas import DASHBOARDS, cargar_dashboard
+    from servicios import cache_consultas
+    from servicios.conexion import obtener_engine
+
+    captura = Captura()
+    event.listen(obtener_engine("sqlite"), "before_cursor_execute", captura)
+
+    ruta, vistas = DASHBOARDS["final"]
+    captura.origen = "importación"
+    modulo = cargar_dashboard("final", ruta)
+    # Las consultas que eligen datos de ejemplo para EXTRAS no son de la aplicación
+    captura.origen = None
+    operaciones = [(v, getattr(modulo, v)) for v in vistas] + _extras(modulo)
+    errores = []
+    for nombre, func in operaciones:
+        cache_consultas.limpiar_cache()
+        captura.origen = nombre
+        try:
+            func()
+        except Exception as e:
+            errores.append((nombre, f"{type(e).__name__}: {e}"))
+    return captura.sentencias, errores
+
+
+# ---------------------------------------------------------------------------
+# Análisis
+# ---------------------------------------------------------------------------
+def _alias(sentencia):
+    """{alias o nombre: tabla} de las tablas que aparecen en la sentencia"""
+    alias = {}
+    for tabla, nombre in _TABLAS_SQL.findall(sentencia):
+        alias[tabla] = tabla
+        if nombre and nombre.upper() not in _NO_ALIAS:
+            alias[nombre] = tabla
+    return alias
+
+
+def recorridos_completos(conn, sentencia, parametros):
+    """Tablas que el plan recorre completas (SCAN sin índice)"""
+    filas = conn.execute("EXPLAIN QUERY PLAN " + sentencia, parametros or ()).fetchall()
+    alias = _alias(sentencia)
+    tablas = []
+    for *_, detalle in filas:
+        paso = _PASO.match(detalle)
+        if paso and paso.group(1) == "SCAN" and "INDEX" not in paso.group(3):
+            nombre = paso.group(2)
+            if not nombre.startswith("("):
+                tablas.append(alias.get(nombre, nombre))
+    return tablas, [f[-1] for f in filas]
+
+
+def permitida(tabla, sentencia):
+    return next((motivo for t, fragmento, motivo in PERMITIDAS if t == tabla and fragmento in sentencia), None)
+
+
+def analizar(ruta_db, sentencias, filas_minimas):
+    """Lista de dicts con sentencia, origen, plan y recorridos (tabla, filas, motivo permitido)"""
+    conn = sqlite3.connect(ruta_db)
+    try:
+        tamanos = {t: conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0]
+                   for (t,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        resultados = []
+        for clave, (sql, parametros, origen) in sentencias.items():
+            if not clave.split(" ", 1)[0].upper() in ("SELECT", "WITH", "UPDATE", "DELETE"):
+                continue
+            tablas, plan = recorridos_completos(conn, sql, parametros)
+            recorridos = [(t, tamanos.get(t, 0), permitida(t, clave)) for t in tablas
+                          if tamanos.get(t, 0) >= filas_minimas]
+            resultados.append({"sentencia": clave, "origen": origen, "plan": plan, "recorridos": recorridos})
+        return resultados, tamanos
+    finally:
+        conn.close()
+
+
+def copiar_base(origen, destino):
+    """Copia consistente (incluye lo que aún esté en el WAL)"""
+    fuente, copia = sqlite3.connect(origen), sqlite3.connect(destino)
+    try:
+        fuente.backup(copia)
+    finally:
+        fuente.close()
+        copia.close()
+
+
+def main():
+    from rendimiento import datos_sinteticos
+
+    parser = argparse.ArgumentParser(description="Falla si una consulta recorre completa una tabla grande")
+    parser.add_argument("--escala", choices=list(datos_sinteticos.ESCALAS), default="100k")
+    parser.add_argument("--filas-minimas", type=int, default=10_000,
+                        help="tablas con al menos estas filas cuentan como grandes")
+    parser.add_argument("--todas", action="store_true", help="muestra el plan de todas las consultas")
+    args = parser.parse_args()
+
+    ruta = datos_sinteticos.ruta_escala(args.escala)
+    if not os.path.exists(ruta):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        print(f"Generando datos {args.escala} en {ruta}")
+        datos_sinteticos.generar(ruta, datos_sinteticos.ESCALAS[args.escala])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        copia = os.path.join(tmp, "planes.sqlite")
+        copiar_base(ruta, copia)
+        sentencias, errores = capturar(copia)
+        resultados, tamanos = analizar(copia, sentencias, args.filas_minimas)
+        from servicios.conexion import cerrar_engine
+        cerrar_engine()
+
+    grandes = sorted(t for t, n in tamanos.items() if n >= args.filas_minimas)
+    print(f"{len(resultados)} consultas analizadas; tablas grandes (>= {args.filas_minimas:,d} filas): "
+          f"{', '.join(grandes) or 'ninguna'}")
+    for nombre, error in errores:
+        print(f"AVISO {nombre}: {error}")
+
+    fallos = 0
+    for r in resultados:
+        malos = [(t, n) for t, n, motivo in r["recorridos"] if motivo is None]
+        fallos += bool(malos)
+        if malos or args.todas:
+            estado = "FALLA" if malos else "ok"
+            print(f"\n[{estado}] ({r['origen']}) {r['sentencia'][:200]}")
+            for t, n in malos:
+                print(f"    recorre completa {t} ({n:,d} filas)")
+            for paso in r["plan"]:
+                print(f"    | {paso}")
+        for t, n, motivo in r["recorridos"]:
+            if motivo is not None and args.todas:
+                print(f"    permitido en {t}: {motivo}")
+
+    print(f"\n{fallos} consulta(s) con recorridos completos no permitidos")
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == "__main__":
+    main()
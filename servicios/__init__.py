@@ -0,0 +1 @@
+"""Servicios compartidos por los dashboards (conexión, caché, consultas)."""
@@ -0,0 +1,293 @@
+# ============================================================================
+# ALMACÉN LOCAL (SQLite) PARA EL DASHBOARD EXCEL
+# ============================================================================
+# El dashboard Excel guardaba cada cambio leyendo el libro completo con
+# pd.read_excel, agregando una fila y reescribiéndolo con to_excel: O(tamaño
+# del archivo) por clic. Aquí cada ARCHIVO_* es una tabla de un único archivo
+# SQLite en modo WAL:
+#
+# - agregar() es un INSERT (el WAL solo crece al final).
+# - borrar() marca filas con _borrado=1 (lápida); actualizar() toca una fila.
+# - Cada COMPACTAR_CADA escrituras se eliminan las lápidas, se hace checkpoint
+#   del WAL y VACUUM.
+# - La primera vez que se usa un archivo se importa el .xlsx existente, y
+#   exportar_xlsx() genera el libro bajo demanda para quien lo siga usando.
+#
+# leer() devuelve un DataFrame cuyo índice es el id interno de la fila, así las
+# vistas pueden borrar/editar por índice como antes. Los tipos (fechas,
+# booleanos, números) se registran por columna y se restauran al leer.
+import datetime
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+
+import pandas as pd
+
+COMPACTAR_CADA = int(os.getenv("ALMACEN_EXCEL_COMPACTAR_CADA", "200"))
+
+_META = "_almacen_columnas"
+_ARCHIVOS = "_almacen_archivos"
+
+
+def _nombre_tabla(archivo):
+    base = os.path.splitext(os.path.basename(archivo))[0]
+    return "t_" + re.sub(r"\W", "_", base)
+
+
+def _q(identificador):
+    return '"' + str(identificador).replace('"', '""') + '"'
+
+
+def _tipo_de(serie):
+    """Tipo lógico de una columna; None si aún no hay valores para decidir"""
+    valores = serie.dropna()
+    if valores.empty:
+        return None
+    if pd.api.types.is_bool_dtype(serie):
+        return "bool"
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return "fecha"
+    if pd.api.types.is_numeric_dtype(serie):
+        return "num"
+    inferido = pd.api.types.infer_dtype(valores, skipna=True)
+    if inferido == "boolean":
+        return "bool"
+    if inferido in ("date", "datetime", "datetime64"):
+        return "fecha"
+    if inferido in ("integer", "floating", "mixed-integer-float", "decimal"):
+        return "num"
+    return "texto"
+
+
+def _a_sql(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor != valor:
+        return None
+    if valor is pd.NaT:
+        return None
+    if isinstance(valor, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return pd.Timestamp(valor).isoformat()
+    if hasattr(valor, "item"):
+        valor = valor.item()
+    if isinstance(valor, bool):
+        return int(valor)
+    if isinstance(valor, (int, float, str, bytes)):
+        return valor
+    return json.dumps(valor, default=str)
+
+
+def _restaurar(serie, tipo):
+    if tipo == "fecha":
+        return pd.to_datetime(serie, errors="coerce", format="ISO8601")
+    if tipo == "bool":
+        return serie.map(lambda v: None if v is None or v != v else bool(v))
+    if tipo == "num":
+        try:
+            return pd.to_numeric(serie)
+        except (ValueError, TypeError):
+            return serie
+    return serie
+
+
+class AlmacenExcel:
+    """Tablas append-only en SQLite detrás de las constantes ARCHIVO_* del dashboard"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.RLock()
+        self._escrituras = 0
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {_ARCHIVOS} (tabla TEXT PRIMARY KEY, origen TEXT, importado TEXT)")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {_META} (tabla TEXT, columna TEXT, tipo TEXT, orden INTEGER, "
+                           "PRIMARY KEY (tabla, columna))")
+
+    # ---------------------------------------------------------------- esquema
+    def _registrada(self, tabla):
+        with self._lock:
+            return self._conn.execute(f"SELECT 1 FROM {_ARCHIVOS} WHERE tabla = ?", (tabla,)).fetchone() is not None
+
+    def _columnas(self, tabla):
+        with self._lock:
+            filas = self._conn.execute(f"SELECT columna, tipo FROM {_META} WHERE tabla = ? ORDER BY orden", (tabla,))
+            return dict(filas.fetchall())
+
+    def _crear(self, tabla, origen):
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {_q(tabla)} "
+                           "(_id INTEGER PRIMARY KEY AUTOINCREMENT, _borrado INTEGER NOT NULL DEFAULT 0)")
+        self._conn.execute(f"INSERT OR IGNORE INTO {_ARCHIVOS} VALUES (?, ?, ?)",
+                           (tabla, origen, datetime.datetime.now().isoformat()))
+
+    def _asegurar_columnas(self, tabla, df):
+        existentes = self._columnas(tabla)
+        for orden, col in enumerate(df.columns, start=len(existentes)):
+            tipo = _tipo_de(df[col])
+            if col not in existentes:
+                self._conn.execute(f"ALTER TABLE {_q(tabla)} ADD COLUMN {_q(col)}")
+                self._conn.execute(f"INSERT INTO {_META} VALUES (?, ?, ?, ?)", (tabla, col, tipo, orden))
+            elif existentes[col] is None and tipo is not None:
+                self._conn.execute(f"UPDATE {_META} SET tipo = ? WHERE tabla = ? AND columna = ?", (tipo, tabla, col))
+
+    def _preparar(self, archivo):
+        """Tabla del archivo; la importa del .xlsx la primera vez. None si no existe ninguno"""
+        tabla = _nombre_tabla(archivo)
+        if self._registrada(tabla):
+            return tabla
+        if not os.path.exists(archivo):
+            return None
+        with self._lock:
+            if not self._registrada(tabla):
+                df = pd.read_excel(archivo)
+                self._conn.execute("BEGIN")
+                try:
+                    self._crear(tabla, archivo)
+                    self._insertar(tabla, df)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        return tabla
+
+    def _insertar(self, tabla, df):
+        if df.empty and not len(df.columns):
+            return
+        self._asegurar_columnas(tabla, df)
+        if df.empty:
+            return
+        columnas = ", ".join(_q(c) for c in df.columns)
+        marcas = ", ".join("?" for _ in df.columns)
+        filas = [tuple(_a_sql(v) for v in fila) for fila in df.itertuples(index=False, name=None)]
+        self._conn.executemany(f"INSERT INTO {_q(tabla)} ({columnas}) VALUES ({marcas})", filas)
+
+    def _escritura(self):
+        self._escrituras += 1
+        if COMPACTAR_CADA and self._escrituras % COMPACTAR_CADA == 0:
+            self.compactar()
+
+    # ---------------------------------------------------------------- lectura
+    def existe(self, archivo):
+        return self._preparar(archivo) is not None
+
+    def leer(self, archivo, columnas=None):
+        """Filas vivas del archivo (índice = id interno). Vacío con `columnas` si no existe"""
+        tabla = self._preparar(archivo)
+        if tabla is None:
+            return pd.DataFrame(columns=columnas or [])
+        tipos = self._columnas(tabla)
+        select = ", ".join(["_id"] + [_q(c) for c in tipos])
+        with self._lock:
+            df = pd.read_sql_query(f"SELECT {select} FROM {_q(tabla)} WHERE _borrado = 0 ORDER BY _id", self._conn)
+        df = df.set_index("_id")
+        df.index.name = None
+        for col, tipo in tipos.items():
+            df[col] = _restaurar(df[col], tipo)
+        return df
+
+    # ---------------------------------------------------------------- escritura
+    def agregar(self, archivo, filas):
+        """Agrega una fila (dict) o varias (lista de dicts / DataFrame) al final"""
+        df = filas if isinstance(filas, pd.DataFrame) else pd.DataFrame([filas] if isinstance(filas, dict) else filas)
+        with self._lock:
+            tabla = self._preparar(archivo)
+            self._conn.execute("BEGIN")
+            try:
+                if tabla is None:
+                    tabla = _nombre_tabla(archivo)
+                    self._crear(tabla, archivo)
+                self._insertar(tabla, df)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._escritura()
+
+    def borrar(self, archivo, ids):
+        """Marca como borradas las filas con esos ids (se eliminan al compactar)"""
+        tabla = self._preparar(archivo)
+        ids = [int(i) for i in ids]
+        if tabla is None or not ids:
+            return 0
+        with self._lock:
+            marcas = ", ".join("?" for _ in ids)
+            cursor = self._conn.execute(
+                f"UPDATE {_q(tabla)} SET _borrado = 1 WHERE _borrado = 0 AND _id IN ({marcas})", ids)
+            self._escritura()
+        return cursor.rowcount
+
+    def actualizar(self, archivo, id_fila, cambios):
+        """Modifica columnas de una fila existente"""
+        tabla = self._preparar(archivo)
+        if tabla is None:
+            return 0
+        with self._lock:
+            self._asegurar_columnas(tabla, pd.DataFrame([cambios]))
+            asignaciones = ", ".join(f"{_q(c)} = ?" for c in cambios)
+            cursor = self._conn.execute(
+                f"UPDATE {_q(tabla)} SET {asignaciones} WHERE _id = ? AND _borrado = 0",
+                [_a_sql(v) for v in cambios.values()] + [int(id_fila)])
+            self._escritura()
+        return cursor.rowcount
+
+    def reemplazar(self, archivo, filas):
+        """Sustituye todo el contenido (p. ej. el inventario de una sola fila)"""
+        df = filas if isinstance(filas, pd.DataFrame) else pd.DataFrame([filas] if isinstance(filas, dict) else filas)
+        with self._lock:
+            tabla = self._preparar(archivo)
+            self._conn.execute("BEGIN")
+            try:
+                if tabla is None:
+                    tabla = _nombre_tabla(archivo)
+                    self._crear(tabla, archivo)
+                self._conn.execute(f"UPDATE {_q(tabla)} SET _borrado = 1 WHERE _borrado = 0")
+                self._insertar(tabla, df)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._escritura()
+
+    # ---------------------------------------------------------------- mantenimiento
+    def compactar(self):
+        """Elimina lápidas, vacía el WAL y reorganiza el archivo"""
+        with self._lock:
+            tablas = [t for (t,) in self._conn.execute(f"SELECT tabla FROM {_ARCHIVOS}")]
+            for tabla in tablas:
+                self._conn.execute(f"DELETE FROM {_q(tabla)} WHERE _borrado = 1")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("VACUUM")
+
+    def exportar_xlsx(self, archivo, destino=None):
+        """Escribe el archivo como .xlsx en `destino`; sin destino devuelve los bytes"""
+        df = self.leer(archivo)
+        if destino is None:
+            buffer = io.BytesIO()
+            df.to_excel(buffer, index=False)
+            return buffer.getvalue()
+        df.to_excel(destino, index=False)
+        return destino
+
+    def archivos(self):
+        with self._lock:
+            return [origen for (origen,) in self._conn.execute(f"SELECT origen FROM {_ARCHIVOS} ORDER BY origen")]
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+
+_ALMACENES = {}
+_LOCK_ALMACENES = threading.Lock()
+
+
+def obtener_almacen_excel(ruta):
+    """Un AlmacenExcel por archivo SQLite y por proceso"""
+    ruta = os.path.abspath(ruta)
+    with _LOCK_ALMACENES:
+        if ruta not in _ALMACENES:
+            _ALMACENES[ruta] = AlmacenExcel(ruta)
+        return _ALMACENES[ruta]
@@ -0,0 +1,117 @@
+# ============================================================================
+# ALMACÉN INCREMENTAL DE PEDIDOS (pedidos_cliente)
+# ============================================================================
+# Mantiene en memoria del proceso una copia de pedidos_cliente compartida por
+# todas las sesiones. La primera lectura descarga la tabla completa; después
+# solo se piden las filas con id mayor al último visto (MAX(id) por el índice
+# de la clave primaria). Las eliminaciones hechas desde este proceso se aplican
+# directamente (descartar); las de otros procesos se leen como lápidas de
+# log_eliminaciones_pedidos, donde cada eliminación deja el id del pedido:
+# solo las filas con fecha_eliminacion desde la última vista (con un margen
+# por diferencias de reloj entre servidores), por el índice de esa fecha.
+# Un DELETE hecho fuera de los dashboards no deja lápida: reiniciar() recarga.
+import datetime
+import threading
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+TABLA_ELIMINACIONES = "log_eliminaciones_pedidos"
+# Las lápidas se releen desde un poco antes de la última vista (quitar un id es idempotente)
+MARGEN_ELIMINACIONES = datetime.timedelta(minutes=5)
+
+
+class AlmacenPedidos:
+    """Copia local de pedidos_cliente que se sincroniza por id creciente"""
+
+    def __init__(self, engine, tabla="pedidos_cliente"):
+        self.engine = engine
+        self.tabla = tabla
+        self._df = None
+        self._ultimo_id = 0
+        self._ultima_eliminacion = None
+        self._hay_eliminaciones = False
+        self._lock = threading.Lock()
+
+    def _hay_lapidas(self, conn):
+        # La tabla de log se crea con la primera eliminación; una vez que existe no se vuelve a mirar
+        if not self._hay_eliminaciones:
+            self._hay_eliminaciones = inspect(conn).has_table(TABLA_ELIMINACIONES)
+        return self._hay_eliminaciones
+
+    def _carga_completa(self, conn):
+        # La marca se toma antes de leer: lo borrado durante la lectura se vuelve a aplicar
+        self._ultima_eliminacion = None
+        if self._hay_lapidas(conn):
+            self._ultima_eliminacion = pd.to_datetime(
+                conn.execute(text(f"SELECT MAX(fecha_eliminacion) FROM {TABLA_ELIMINACIONES}")).scalar())
+        df = pd.read_sql(text(f"SELECT * FROM {self.tabla} ORDER BY id"), conn)
+        self._df = df
+        self._ultimo_id = int(df['id'].max()) if not df.empty else 0
+
+    def _aplicar_lapidas(self, conn):
+        """Quita los pedidos registrados como eliminados desde la última sincronización"""
+        if not self._hay_lapidas(conn):
+            return
+        query = f"SELECT id, fecha_eliminacion FROM {TABLA_ELIMINACIONES}"
+        params = {}
+        if self._ultima_eliminacion is not None:
+            query += " WHERE fecha_eliminacion >= :desde"
+            params["desde"] = (self._ultima_eliminacion - MARGEN_ELIMINACIONES).to_pydatetime()
+        lapidas = pd.read_sql(text(query), conn, params=params)
+        if lapidas.empty:
+            return
+        fechas = pd.to_datetime(lapidas['fecha_eliminacion'], errors='coerce').dropna()
+        if not fechas.empty:
+            self._ultima_eliminacion = max([fechas.max()] + [f for f in (self._ultima_eliminacion,) if f is not None])
+        ids = pd.to_numeric(lapidas['id'], errors='coerce').dropna()
+        self._df = self._df[~self._df['id'].isin(ids)].reset_index(drop=True)
+
+    def sincronizar(self):
+        """Trae filas nuevas y quita las borradas; devuelve el DataFrame interno"""
+        with self._lock:
+            with self.engine.connect() as conn:
+                if self._df is None:
+                    self._carga_completa(conn)
+                    return self._df
+
+                max_id = int(conn.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {self.tabla}")).scalar())
+                if max_id > self._ultimo_id:
+                    nuevas = pd.read_sql(
+                        text(f"SELECT * FROM {self.tabla} WHERE id > :ultimo ORDER BY id"),
+                        conn, params={"ultimo": self._ultimo_id}
+                    )
+                    if not nuevas.empty:
+                        self._df = pd.concat([self._df, nuevas], ignore_index=True) if not self._df.empty else nuevas
+                    self._ultimo_id = max_id
+                self._aplicar_lapidas(conn)
+            return self._df
+
+    def pedidos(self):
+        """Copia actualizada de todos los pedidos"""
+        return self.sincronizar().copy()
+
+    def descartar(self, ids):
+        """Quita de la copia local pedidos eliminados por este proceso"""
+        with self._lock:
+            if self._df is not None:
+                self._df = self._df[~self._df['id'].isin(list(ids))].reset_index(drop=True)
+
+    def reiniciar(self):
+        """Olvida la copia local; la próxima lectura recarga la tabla completa"""
+        with self._lock:
+            self._df = None
+            self._ultimo_id = 0
+            self._ultima_eliminacion = None
+
+
+_ALMACENES = {}
+_LOCK_ALMACENES = threading.Lock()
+
+
+def obtener_almacen_pedidos(engine):
+    """Almacén compartido por proceso para el engine dado"""
+    with _LOCK_ALMACENES:
+        if engine not in _ALMACENES:
+            _ALMACENES[engine] = AlmacenPedidos(engine)
+        return _ALMACENES[engine]
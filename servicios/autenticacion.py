@@ -0,0 +1,158 @@
+# ============================================================================
+# AUTENTICACIÓN: BÚSQUEDA DE UN SOLO USUARIO (SQL CON RESPALDO EN EXCEL)
+# ============================================================================
+# Antes cada intento de login abría una conexión MySQL nueva, descargaba la
+# tabla Usuarios completa y filtraba en pandas; si MySQL fallaba se volvía a
+# leer usuarios.xlsx con openpyxl. Ahora:
+# - SQL: una consulta parametrizada por usuario sobre el pool compartido
+#   (servicios.conexion), apoyada en el índice idx_usuarios_usuario
+#   (servicios.migraciones). Como antes, los nombres guardados con espacios
+#   alrededor también valen: si ninguna fila exacta acepta la contraseña se
+#   buscan las que coinciden con TRIM(usuario) (recorre la tabla, pero solo en
+#   los intentos fallidos).
+# - Excel: el archivo se lee solo cuando cambia su mtime; el resto de los
+#   intentos son una búsqueda en un diccionario.
+# - Si un nombre está repetido vale cualquiera de sus filas cuya contraseña
+#   coincida (el rol es el de la primera), igual que el filtro de pandas de antes.
+# - La contraseña se compara con hmac.compare_digest, también cuando el
+#   usuario no existe, para no revelar por el tiempo de respuesta cuáles existen.
+#
+# sqlalchemy, pandas y openpyxl se importan dentro de las funciones: Log_in.py
+# los necesita solo al pulsar "Ingresar", no para dibujar el formulario.
+import hmac
+import os
+import threading
+
+TABLA_USUARIOS = os.getenv("TABLA_USUARIOS", "Usuarios")
+USUARIOS_INICIALES = {
+    'usuario': ["proveedor1", "cliente1", "admin"],
+    'rol': ["Proveedor", "Cliente", "Proveedor"],
+    'contrasena': ["16", "1", "16"],
+}
+
+_LOCK = threading.Lock()
+_CACHE_EXCEL = {}
+# Se compara contra esto cuando el usuario no existe (mismo costo que uno real)
+_CONTRASENA_FICTICIA = "\0" * 32
+
+
+def _normalizar(valor):
+    return "" if valor is None else str(valor).strip()
+
+
+def contrasena_correcta(guardada, recibida):
+    """Comparación en tiempo constante de dos contraseñas (como texto normalizado)"""
+    return hmac.compare_digest(_normalizar(guardada).encode("utf-8"), _normalizar(recibida).encode("utf-8"))
+
+
+def _resultado(filas, contrasena):
+    """(valido, rol) a partir de las filas (contrasena, rol) del usuario; vacío si no existe"""
+    # Se comparan todas las filas (o la ficticia): el tiempo no depende de cuál coincide
+    roles = [rol for guardada, rol in filas or [(_CONTRASENA_FICTICIA, None)]
+             if contrasena_correcta(guardada, contrasena)]
+    if filas and roles:
+        return True, _normalizar(roles[0])
+    return False, None
+
+
+# ---------------------------------------------------------------------------
+# SQL
+# ---------------------------------------------------------------------------
+def buscar_usuario_sql(engine, usuario, contrasena=None):
+    """Filas [(contrasena, rol)] con ese nombre de usuario.
+
+    Primero por igualdad (usa el índice); si ninguna de esas filas acepta
+    `contrasena`, se agregan las que solo coinciden sin espacios alrededor.
+    """
+    from sqlalchemy import text
+
+    usuario = _normalizar(usuario)
+    with engine.connect() as conn:
+        filas = [tuple(f) for f in conn.execute(
+            text(f"SELECT contrasena, rol FROM {TABLA_USUARIOS} WHERE usuario = :usuario"), {"usuario": usuario})]
+        if not _resultado(filas, contrasena)[0]:
+            filas += [tuple(f) for f in conn.execute(
+                text(f"SELECT contrasena, rol FROM {TABLA_USUARIOS} "
+                     "WHERE TRIM(usuario) = :usuario AND usuario <> :usuario"), {"usuario": usuario})]
+    return filas
+
+
+def validar_sql(engine, usuario, contrasena):
+    """(valido, rol) consultando la base de datos"""
+    return _resultado(buscar_usuario_sql(engine, usuario, contrasena), contrasena)
+
+
+# ---------------------------------------------------------------------------
+# Excel
+# ---------------------------------------------------------------------------
+def crear_archivo_usuarios_si_no_existe(ruta):
+    if not os.path.exists(ruta):
+        import pandas as pd
+
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        pd.DataFrame(USUARIOS_INICIALES).to_excel(ruta, index=False)
+
+
+def usuarios_excel(ruta):
+    """{usuario: [(contrasena, rol), ...]} del archivo; se relee solo si cambió su mtime"""
+    crear_archivo_usuarios_si_no_existe(ruta)
+    mtime = os.stat(ruta).st_mtime_ns
+    with _LOCK:
+        entrada = _CACHE_EXCEL.get(ruta)
+        if entrada is not None and entrada[0] == mtime:
+            return entrada[1]
+
+    import pandas as pd
+
+    df = pd.read_excel(ruta, dtype=str).fillna("")
+    if "contraseña" in df.columns and "contrasena" not in df.columns:
+        df = df.rename(columns={"contraseña": "contrasena"})
+    usuarios = {}
+    for usuario, contrasena, rol in zip(df["usuario"], df["contrasena"], df["rol"]):
+        usuarios.setdefault(_normalizar(usuario), []).append((_normalizar(contrasena), _normalizar(rol)))
+    with _LOCK:
+        _CACHE_EXCEL[ruta] = (mtime, usuarios)
+    return usuarios
+
+
+def validar_excel(ruta, usuario, contrasena):
+    """(valido, rol) usando el archivo de usuarios"""
+    return _resultado(usuarios_excel(ruta).get(_normalizar(usuario), []), contrasena)
+
+
+# ---------------------------------------------------------------------------
+# Punto de entrada del login
+# ---------------------------------------------------------------------------
+def validar(usuario, contrasena, ruta_excel):
+    """(valido, rol, metodo): primero SQL y, si la base no responde, Excel.
+
+    La consulta pasa por el cortacircuitos de la base: con el túnel caído los
+    logins van directo al archivo sin esperar el timeout de conexión.
+    """
+    from servicios.circuito import CircuitoAbierto
+    from servicios.conexion import BACKENDS_SQL, backend_configurado, circuito_base_datos, obtener_engine
+
+    backend = backend_configurado()
+    if backend in BACKENDS_SQL:
+        try:
+            valido, rol = circuito_base_datos(backend).llamar(
+                lambda: validar_sql(obtener_engine(backend), usuario, contrasena)
+            )
+            return valido, rol, "SQL"
+        except CircuitoAbierto:
+            pass
+        except Exception:
+            # El circuito ya registró el fallo; se usa el respaldo
+            pass
+    valido, rol = validar_excel(ruta_excel, usuario, contrasena)
+    return valido, rol, "Excel"
+
+
+def estado_base_datos():
+    """Estado del cortacircuitos de la base (None si el backend no es SQL)"""
+    from servicios.conexion import BACKENDS_SQL, backend_configurado, circuito_base_datos
+
+    backend = backend_configurado()
+    if backend not in BACKENDS_SQL:
+        return None
+    return circuito_base_datos(backend).estado()
@@ -0,0 +1,175 @@
+# ============================================================================
+# CACHÉ DE CONSULTAS VERSIONADA POR TABLA
+# ============================================================================
+# Cada lectura cacheada declara de qué tablas depende. Las funciones de escritura
+# incrementan la versión de las tablas que tocan, de modo que una entrada solo se
+# reutiliza si ninguna de sus tablas cambió desde que se calculó. Además hay TTL
+# (por si otro proceso escribe en la base) y expulsión LRU por número de entradas.
+import copy
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+import pandas as pd
+
+TTL_DEFECTO = float(os.getenv("CACHE_TTL_SEGUNDOS", "300"))
+MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", "256"))
+
+_VERSIONES = defaultdict(int)
+_ENTRADAS = OrderedDict()
+_LOCK = threading.RLock()
+ESTADISTICAS = {"aciertos": 0, "fallos": 0, "invalidaciones": 0, "expulsiones": 0}
+
+
+class _Entrada:
+    __slots__ = ("valor", "tablas", "versiones", "expira")
+
+    def __init__(self, valor, tablas, versiones, expira):
+        self.valor = valor
+        self.tablas = tablas
+        self.versiones = versiones
+        self.expira = expira
+
+
+def _versiones_de(tablas):
+    return tuple(_VERSIONES[t] for t in tablas)
+
+
+def _copiar(valor):
+    # Las vistas modifican los DataFrames que reciben; nunca se entrega el objeto cacheado
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor.copy()
+    if isinstance(valor, (dict, list, set)):
+        return copy.copy(valor)
+    if isinstance(valor, tuple):
+        # p. ej. (df, etiquetas, hay_mas): se copia cada elemento
+        return tuple(_copiar(v) for v in valor)
+    return valor
+
+
+def _huella(datos):
+    return hashlib.blake2b(datos, digest_size=16).hexdigest()
+
+
+def _congelar(valor):
+    """Clave hashable que depende del contenido completo del argumento.
+
+    Listas, dicts y conjuntos se congelan elemento a elemento; DataFrames,
+    Series y arrays por una huella de sus valores (hash_pandas_object). Lo
+    que no se sabe congelar se rechaza: un repr() truncado podía hacer que
+    dos argumentos distintos compartieran resultado.
+    """
+    try:
+        hash(valor)
+        return valor
+    except TypeError:
+        pass
+    if isinstance(valor, (list, tuple)):
+        return (type(valor).__name__, tuple(_congelar(v) for v in valor))
+    if isinstance(valor, dict):
+        return ("dict", tuple(sorted(((k, _congelar(v)) for k, v in valor.items()), key=repr)))
+    if isinstance(valor, (set, frozenset)):
+        return ("set", frozenset(_congelar(v) for v in valor))
+    if isinstance(valor, pd.DataFrame):
+        return ("DataFrame", tuple(map(str, valor.columns)), tuple(map(str, valor.dtypes)),
+                _huella(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes()))
+    if isinstance(valor, pd.Series):
+        return ("Series", str(valor.name), str(valor.dtype),
+                _huella(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes()))
+    if isinstance(valor, np.ndarray):
+        return ("ndarray", valor.shape, str(valor.dtype), _huella(np.ascontiguousarray(valor).tobytes()))
+    raise TypeError(f"Argumento no cacheable de tipo {type(valor).__name__}")
+
+
+def _clave(nombre, args, kwargs):
+    return (
+        nombre,
+        tuple(_congelar(a) for a in args),
+        tuple(sorted((k, _congelar(v)) for k, v in kwargs.items())),
+    )
+
+
+def obtener_o_calcular(clave, tablas, calcular, ttl=None):
+    """Devuelve el valor cacheado para clave o lo calcula y lo guarda"""
+    tablas = tuple(tablas)
+    ttl = TTL_DEFECTO if ttl is None else ttl
+    with _LOCK:
+        entrada = _ENTRADAS.get(clave)
+        versiones = _versiones_de(tablas)
+        if entrada is not None and entrada.expira > time.monotonic() and entrada.versiones == versiones:
+            _ENTRADAS.move_to_end(clave)
+            ESTADISTICAS["aciertos"] += 1
+            return _copiar(entrada.valor)
+        ESTADISTICAS["fallos"] += 1
+
+    valor = calcular()
+
+    with _LOCK:
+        # Si hubo una escritura mientras se consultaba, el resultado ya puede estar viejo
+        if _versiones_de(tablas) == versiones:
+            _ENTRADAS[clave] = _Entrada(valor, tablas, versiones, time.monotonic() + ttl)
+            _ENTRADAS.move_to_end(clave)
+            while len(_ENTRADAS) > MAX_ENTRADAS:
+                _ENTRADAS.popitem(last=False)
+                ESTADISTICAS["expulsiones"] += 1
+    return _copiar(valor)
+
+
+def consulta_cacheada(*tablas, ttl=None):
+    """Decorador: cachea el resultado por argumentos mientras no cambien las tablas"""
+    def decorador(func):
+        nombre = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            return obtener_o_calcular(
+                _clave(nombre, args, kwargs), tablas, lambda: func(*args, **kwargs), ttl
+            )
+
+        envoltura.tablas_cache = tablas
+        return envoltura
+    return decorador
+
+
+def leer_sql(engine, query, tablas, params=None, ttl=None):
+    """pd.read_sql cacheado por texto de consulta y parámetros"""
+    from sqlalchemy import text
+
+    clave = ("leer_sql", query, _congelar(tuple(sorted((params or {}).items()))))
+    return obtener_o_calcular(
+        clave, tablas, lambda: pd.read_sql(text(query), engine, params=params), ttl
+    )
+
+
+def invalidar(*tablas):
+    """Marca las tablas como modificadas y descarta las entradas que dependen de ellas"""
+    with _LOCK:
+        for t in tablas:
+            _VERSIONES[t] += 1
+        afectadas = [k for k, e in _ENTRADAS.items() if set(e.tablas) & set(tablas)]
+        for k in afectadas:
+            del _ENTRADAS[k]
+        ESTADISTICAS["invalidaciones"] += 1
+
+
+def invalida_tablas(*tablas):
+    """Decorador para funciones de escritura: invalida sus tablas al terminar"""
+    def decorador(func):
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                invalidar(*tablas)
+        return envoltura
+    return decorador
+
+
+def limpiar_cache():
+    """Vacía por completo la caché (no cambia las versiones)"""
+    with _LOCK:
+        _ENTRADAS.clear()
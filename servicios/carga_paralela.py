@@ -0,0 +1,64 @@
+# ============================================================================
+# CARGA EN PARALELO DE CONSULTAS INDEPENDIENTES
+# ============================================================================
+# Varias vistas hacen 3-5 lecturas que no dependen entre sí (pedidos,
+# inventario, clientes, logs...). Por un enlace con mucha latencia, hacerlas
+# una tras otra suma los viajes de ida y vuelta; aquí se lanzan a la vez en un
+# pool de hilos compartido por el proceso (cada una toma su conexión del pool
+# de SQLAlchemy) y la vista espera a la más lenta.
+#
+# Las tareas solo deben leer datos: nada de st.* dentro de ellas, porque los
+# hilos del pool no tienen el contexto de la sesión de Streamlit. Las
+# consultas que hacen cuentan en el panel Diagnóstico de la vista que las lanzó.
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from servicios import instrumentacion
+
+HILOS = int(os.getenv("CARGA_PARALELA_HILOS", "4"))
+
+_EJECUTOR = None
+_LOCK = threading.Lock()
+_EN_HILO_DEL_POOL = threading.local()
+
+
+def _ejecutor():
+    global _EJECUTOR
+    if _EJECUTOR is None:
+        with _LOCK:
+            if _EJECUTOR is None:
+                _EJECUTOR = ThreadPoolExecutor(max_workers=HILOS, thread_name_prefix="carga")
+    return _EJECUTOR
+
+
+def _ejecutar(func, mediciones):
+    _EN_HILO_DEL_POOL.activo = True
+    try:
+        with instrumentacion.adoptar(mediciones):
+            return func()
+    finally:
+        _EN_HILO_DEL_POOL.activo = False
+
+
+def cargar_en_paralelo(tareas):
+    """Ejecuta {nombre: función sin argumentos} a la vez y devuelve {nombre: resultado}.
+
+    Si alguna tarea falla se espera al resto y se relanza la primera excepción.
+    Dentro de un hilo del pool (llamadas anidadas) o con CARGA_PARALELA_HILOS=1
+    las tareas se ejecutan en orden, sin riesgo de bloquear el pool.
+    """
+    if HILOS <= 1 or len(tareas) <= 1 or getattr(_EN_HILO_DEL_POOL, "activo", False):
+        return {nombre: func() for nombre, func in tareas.items()}
+
+    mediciones = instrumentacion.mediciones_actuales()
+    futuros = {nombre: _ejecutor().submit(_ejecutar, func, mediciones) for nombre, func in tareas.items()}
+    resultados, error = {}, None
+    for nombre, futuro in futuros.items():
+        try:
+            resultados[nombre] = futuro.result()
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+    return resultados
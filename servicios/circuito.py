@@ -0,0 +1,157 @@
+# ============================================================================
+# CORTACIRCUITOS (CIRCUIT BREAKER) CON SONDA EN SEGUNDO PLANO
+# ============================================================================
+# Cuando la base de datos no responde (túnel caído), cada intento espera el
+# timeout de conexión completo antes de pasar al respaldo. El circuito cuenta
+# los fallos seguidos y, al llegar a CIRCUITO_FALLOS, se "abre": las llamadas
+# siguientes fallan al instante (CircuitoAbierto) y el llamador usa su
+# respaldo sin esperar. Mientras está abierto, un hilo de fondo ejecuta la
+# sonda cada CIRCUITO_SONDA_SEGUNDOS; en cuanto la sonda funciona el circuito
+# se cierra y las llamadas vuelven a ir a la base.
+#
+# Estados: "cerrado" (normal), "abierto" (falla rápido) y "semiabierto" (sin
+# sonda: tras el intervalo se deja pasar una sola llamada de prueba).
+import os
+import threading
+import time
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+FALLOS_MAX = int(os.getenv("CIRCUITO_FALLOS", "3"))
+INTERVALO_SONDA = float(os.getenv("CIRCUITO_SONDA_SEGUNDOS", "15"))
+
+
+class CircuitoAbierto(Exception):
+    """La llamada no se hizo porque el circuito está abierto"""
+
+
+class Circuito:
+    """Cortacircuitos con contador de fallos seguidos y sonda opcional"""
+
+    def __init__(self, nombre, sonda=None, fallos_max=FALLOS_MAX, intervalo=INTERVALO_SONDA):
+        self.nombre = nombre
+        self.sonda = sonda
+        self.fallos_max = fallos_max
+        self.intervalo = intervalo
+        self._estado = CERRADO
+        self._fallos = 0
+        self._ultimo_error = None
+        self._cambio = time.time()
+        self._ultima_sonda = None
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+
+    # ------------------------------------------------------------ llamadas
+    def permitir(self):
+        """True si la llamada puede ir a la base; en semiabierto solo una a la vez"""
+        with self._lock:
+            if self._estado == CERRADO:
+                return True
+            if self.sonda is None and self._estado == ABIERTO and time.time() - self._cambio >= self.intervalo:
+                self._estado = SEMIABIERTO
+            if self._estado == SEMIABIERTO and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return True
+            return False
+
+    def exito(self):
+        with self._lock:
+            self._prueba_en_curso = False
+            self._fallos = 0
+            if self._estado != CERRADO:
+                self._cerrar()
+
+    def fallo(self, error):
+        with self._lock:
+            self._prueba_en_curso = False
+            self._fallos += 1
+            self._ultimo_error = f"{type(error).__name__}: {error}"
+            if self._estado == SEMIABIERTO or (self._estado == CERRADO and self._fallos >= self.fallos_max):
+                self._abrir()
+
+    def llamar(self, func, *args, **kwargs):
+        """Ejecuta func si el circuito lo permite; si no, lanza CircuitoAbierto"""
+        if not self.permitir():
+            raise CircuitoAbierto(f"{self.nombre}: circuito abierto ({self._ultimo_error})")
+        try:
+            resultado = func(*args, **kwargs)
+        except Exception as e:
+            self.fallo(e)
+            raise
+        self.exito()
+        return resultado
+
+    # ------------------------------------------------------------ transiciones
+    def _abrir(self):
+        self._estado = ABIERTO
+        self._cambio = time.time()
+        self._despertar.clear()
+        if self.sonda is not None and self._hilo is None:
+            self._hilo = threading.Thread(target=self._sondear, name=f"sonda-{self.nombre}", daemon=True)
+            self._hilo.start()
+
+    def _cerrar(self):
+        self._estado = CERRADO
+        self._cambio = time.time()
+        self._despertar.set()
+
+    def _sondear(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            with self._lock:
+                if self._estado == CERRADO:
+                    self._hilo = None
+                    return
+            try:
+                self.sonda()
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            with self._lock:
+                self._ultima_sonda = time.time()
+                if error is None:
+                    self._fallos = 0
+                    self._cerrar()
+                else:
+                    self._ultimo_error = error
+
+    def reiniciar(self):
+        """Vuelve a cerrado sin esperar a la sonda (p. ej. tras cambiar el .env)"""
+        with self._lock:
+            self._fallos = 0
+            self._prueba_en_curso = False
+            self._cerrar()
+
+    # ------------------------------------------------------------ estado
+    def estado(self):
+        """Resumen para mostrar en la interfaz"""
+        with self._lock:
+            proxima = None
+            if self._estado == ABIERTO:
+                desde = self._ultima_sonda or self._cambio
+                proxima = max(0.0, desde + self.intervalo - time.time())
+            return {
+                "nombre": self.nombre,
+                "estado": self._estado,
+                "fallos": self._fallos,
+                "ultimo_error": self._ultimo_error,
+                "desde": self._cambio,
+                "ultima_sonda": self._ultima_sonda,
+                "proxima_sonda": proxima,
+            }
+
+
+_CIRCUITOS = {}
+_LOCK = threading.Lock()
+
+
+def obtener_circuito(nombre, sonda=None, **opciones):
+    """Circuito compartido por proceso con ese nombre (se crea la primera vez)"""
+    with _LOCK:
+        if nombre not in _CIRCUITOS:
+            _CIRCUITOS[nombre] = Circuito(nombre, sonda=sonda, **opciones)
+        return _CIRCUITOS[nombre]
@@ -0,0 +1,87 @@
+# ============================================================================
+# COBERTURA DE INVENTARIO ("¿PARA CUÁNTO ME ALCANZA EL CAFÉ?")
+# ============================================================================
+# Cálculo único usado por todos los dashboards. Con el consumo predicho ordenado
+# por fecha, el acumulado es creciente, así que la fecha de quiebre de stock es
+# la primera posición donde acumulado >= inventario (np.searchsorted), sin
+# recorrer fila por fila. Acepta un inventario escalar o un arreglo de niveles.
+#
+# Convenciones (las mismas en todos los dashboards):
+# - Solo cuentan predicciones con fecha >= desde (por defecto hoy).
+# - pedidos_cubiertos incluye el pedido con el que se agota el inventario.
+# - dias_cubiertos son días de calendario desde `desde` hasta la fecha de quiebre.
+# - Si el inventario supera todo el horizonte, fecha_quiebre es NaT y alcanza=True.
+import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def _hoy():
+    return pd.Timestamp(datetime.date.today())
+
+
+def preparar_consumo(fechas, consumo, desde=None):
+    """Ordena por fecha, descarta fechas anteriores a `desde` y acumula el consumo.
+
+    Devuelve (fechas datetime64[ns], consumo float, acumulado float).
+    """
+    desde = _hoy() if desde is None else pd.Timestamp(desde)
+    f = pd.to_datetime(pd.Series(fechas), errors='coerce').to_numpy(dtype='datetime64[ns]')
+    c = pd.to_numeric(pd.Series(consumo), errors='coerce').to_numpy(dtype=float)
+    validos = ~np.isnat(f) & ~np.isnan(c) & (f >= desde.to_datetime64())
+    f, c = f[validos], c[validos]
+    orden = np.argsort(f, kind='stable')
+    f, c = f[orden], c[orden]
+    return f, c, np.cumsum(c)
+
+
+def calcular_cobertura(fechas, consumo, inventario, desde=None):
+    """Fecha de quiebre, pedidos y días cubiertos para uno o varios inventarios.
+
+    Devuelve un DataFrame con una fila por nivel de inventario y columnas
+    inventario, pedidos_cubiertos, fecha_quiebre, dias_cubiertos, alcanza.
+    """
+    desde = _hoy() if desde is None else pd.Timestamp(desde)
+    f, _, acumulado = preparar_consumo(fechas, consumo, desde)
+    niveles = np.atleast_1d(np.asarray(inventario, dtype=float))
+    n = len(acumulado)
+
+    idx = np.searchsorted(acumulado, niveles, side='left')
+    agotado = idx < n
+    sin_stock = niveles <= 0
+    pedidos = np.where(sin_stock, 0, np.where(agotado, idx + 1, n))
+
+    fecha_quiebre = np.full(len(niveles), np.datetime64('NaT'), dtype='datetime64[ns]')
+    fecha_quiebre[agotado] = f[idx[agotado]]
+    fecha_quiebre[sin_stock] = desde.to_datetime64()
+    dias = (fecha_quiebre - desde.to_datetime64()) / np.timedelta64(1, 'D')
+
+    return pd.DataFrame({
+        'inventario': niveles,
+        'pedidos_cubiertos': pedidos.astype(int),
+        'fecha_quiebre': pd.to_datetime(fecha_quiebre),
+        'dias_cubiertos': dias,
+        'alcanza': ~agotado & ~sin_stock,
+    })
+
+
+def cobertura(fechas, consumo, inventario, desde=None):
+    """Versión escalar de calcular_cobertura: devuelve un dict"""
+    return calcular_cobertura(fechas, consumo, inventario, desde).iloc[0].to_dict()
+
+
+def consumo_hasta(fechas, consumo, fechas_limite, desde=None):
+    """Consumo predicho acumulado entre `desde` y cada fecha límite (incluida)"""
+    f, _, acumulado = preparar_consumo(fechas, consumo, desde)
+    limites = pd.to_datetime(pd.Series(np.atleast_1d(fechas_limite))).to_numpy(dtype='datetime64[ns]')
+    # Incluye todo el día límite aunque las predicciones traigan hora
+    limites = limites.astype('datetime64[D]') + np.timedelta64(1, 'D')
+    pos = np.searchsorted(f, limites.astype('datetime64[ns]'), side='left')
+    return np.where(pos > 0, acumulado[np.maximum(pos - 1, 0)] if len(acumulado) else 0.0, 0.0)
+
+
+def compra_necesaria(fechas, consumo, inventario, fechas_limite, desde=None):
+    """Kg a comprar para cubrir el consumo hasta cada fecha límite (nunca negativo)"""
+    consumo_periodo = consumo_hasta(fechas, consumo, fechas_limite, desde)
+    return np.maximum(0.0, consumo_periodo - np.asarray(inventario, dtype=float))
@@ -0,0 +1,127 @@
+# ============================================================================
+# ENGINE SQLALCHEMY COMPARTIDO POR PROCESO
+# ============================================================================
+# Streamlit vuelve a ejecutar el script principal en cada interacción, pero los
+# módulos importados permanecen en sys.modules. Guardar aquí el engine hace que
+# todas las ejecuciones (y todas las sesiones) del mismo servidor reutilicen el
+# mismo pool de conexiones en lugar de abrir un TCP + autenticación por consulta.
+#
+# CAFE_BACKEND elige el motor: "mysql" (por defecto) o "sqlite", una base local
+# en DB_SQLITE_RUTA sembrada desde datos_prueba/*.csv. El dashboard Excel usa
+# además "excel" (ver servicios.repositorios).
+import os
+import threading
+
+from dotenv import load_dotenv
+
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv(os.path.join(RAIZ_PROYECTO, '.env'))
+
+CARPETA_DATOS = os.path.join(RAIZ_PROYECTO, 'datos_prueba')
+BACKENDS_SQL = ("mysql", "sqlite")
+
+_ENGINES = {}
+_LOCK = threading.Lock()
+
+
+def _env_int(nombre, defecto):
+    valor = os.getenv(nombre)
+    return int(valor) if valor not in (None, "") else defecto
+
+
+def _env_bool(nombre, defecto):
+    valor = os.getenv(nombre)
+    if valor in (None, ""):
+        return defecto
+    return valor.strip().lower() in ("1", "true", "si", "sí", "yes")
+
+
+def configuracion_pool():
+    """Parámetros del pool leídos del .env (con valores por defecto)"""
+    return {
+        "pool_size": _env_int("DB_POOL_SIZE", 5),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 5),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "connect_timeout": _env_int("DB_CONNECT_TIMEOUT", 10),
+    }
+
+
+def url_mysql():
+    """URL de conexión a MySQL construida con las variables DB_* del .env"""
+    from sqlalchemy.engine import URL
+
+    return URL.create(
+        "mysql+mysqlconnector",
+        username=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=_env_int("DB_PORT", 3306),
+        database=os.getenv("DB_DATABASE"),
+    )
+
+
+def backend_configurado(defecto="mysql"):
+    """Backend elegido en CAFE_BACKEND (mysql, sqlite o excel)"""
+    return (os.getenv("CAFE_BACKEND") or defecto).strip().lower()
+
+
+def ruta_sqlite():
+    return os.getenv("DB_SQLITE_RUTA") or os.path.join(CARPETA_DATOS, 'cafe.sqlite')
+
+
+def crear_engine(backend=None):
+    """Crea un engine nuevo con el pool configurado (usar obtener_engine)"""
+    # sqlalchemy se carga con el primer engine: el dashboard Excel no lo necesita
+    from sqlalchemy import create_engine
+
+    backend = backend or backend_configurado()
+    if backend == "sqlite":
+        from servicios.repositorios.sqlite_local import crear_engine_sqlite
+        return crear_engine_sqlite(ruta_sqlite(), CARPETA_DATOS)
+    if backend != "mysql":
+        raise ValueError(f"Backend SQL no soportado: {backend!r} (usa uno de {BACKENDS_SQL})")
+    cfg = configuracion_pool()
+    return create_engine(
+        url_mysql(),
+        pool_size=cfg["pool_size"],
+        max_overflow=cfg["max_overflow"],
+        pool_pre_ping=cfg["pool_pre_ping"],
+        pool_recycle=cfg["pool_recycle"],
+        connect_args={"connection_timeout": cfg["connect_timeout"]},
+    )
+
+
+def obtener_engine(backend=None):
+    """Devuelve el engine único del proceso para el backend, creándolo la primera vez"""
+    backend = backend or backend_configurado()
+    engine = _ENGINES.get(backend)
+    if engine is None:
+        with _LOCK:
+            engine = _ENGINES.get(backend)
+            if engine is None:
+                engine = _ENGINES[backend] = crear_engine(backend)
+    return engine
+
+
+def cerrar_engine():
+    """Cierra los pools actuales; la próxima llamada a obtener_engine crea otros"""
+    with _LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
+
+
+def circuito_base_datos(backend=None):
+    """Cortacircuitos del backend SQL; su sonda es un SELECT 1 sobre el pool"""
+    from servicios.circuito import obtener_circuito
+
+    backend = backend or backend_configurado()
+
+    def sonda():
+        from sqlalchemy import text
+
+        with obtener_engine(backend).connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    return obtener_circuito(f"base_datos:{backend}", sonda=sonda)
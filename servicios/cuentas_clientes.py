@@ -0,0 +1,257 @@
+# ============================================================================
+# CUENTAS DE CLIENTES: CARGOS, PAGOS, SALDO Y ANTIGÜEDAD
+# ============================================================================
+# Apartado pagos leía log_pedidos_entregados completo y todos los precios para
+# sumar en pandas lo entregado a un cliente, y no tenía noción de saldo. Aquí
+# se llevan dos tablas materializadas:
+# - saldo_clientes: una fila por cliente con cargos, pagos, kg y número de
+#   entregas acumulados y las fechas de la última entrega y del último pago.
+# - cargos_clientes_mes: cargos y kg por cliente × año × mes, para la
+#   antigüedad del saldo (los pagos se aplican a los cargos más viejos).
+# Ambas se actualizan en la misma transacción que registra la entrega
+# (servicios.entregas) o el pago (RepositorioSQL.registrar_pago), así que el
+# estado de cuenta es una búsqueda por clave primaria: no depende de cuántas
+# entregas o pagos tenga el cliente.
+#
+# El cargo se valora con el precio vigente al entregar (antes se usaba el
+# precio actual). reconstruir() recalcula todo con los precios actuales, igual
+# que hacía la vista, y también sirve tras cargas masivas externas.
+import datetime
+from collections import defaultdict
+
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from servicios import materializadas
+from servicios.cache_consultas import consulta_cacheada, invalidar
+from servicios.materializadas import clave_cliente
+from servicios.resumen_mensual import ANIO_MES
+
+TABLA_SALDOS = "saldo_clientes"
+TABLA_CARGOS = "cargos_clientes_mes"
+TABLAS = (TABLA_SALDOS, TABLA_CARGOS)
+# Tramos de antigüedad en meses desde el mes del cargo (el último es "o más")
+TRAMOS = ("Corriente", "30 días", "60 días", "90+ días")
+
+DDL = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {TABLA_SALDOS} (
+        cliente_id VARCHAR(100) NOT NULL,
+        cargos DOUBLE NOT NULL DEFAULT 0,
+        pagos DOUBLE NOT NULL DEFAULT 0,
+        kg_entregados DOUBLE NOT NULL DEFAULT 0,
+        entregas INT NOT NULL DEFAULT 0,
+        ultima_entrega DATETIME,
+        ultimo_pago DATETIME,
+        PRIMARY KEY (cliente_id)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {TABLA_CARGOS} (
+        cliente_id VARCHAR(100) NOT NULL,
+        anio INT NOT NULL,
+        mes INT NOT NULL,
+        cargos DOUBLE NOT NULL DEFAULT 0,
+        kg DOUBLE NOT NULL DEFAULT 0,
+        PRIMARY KEY (cliente_id, anio, mes)
+    )
+    """,
+)
+
+_COLUMNAS_SALDO = "cliente_id, cargos, pagos, kg_entregados, entregas, ultima_entrega, ultimo_pago"
+_VALORES_SALDO = ":cliente_id, :cargos, :pagos, :kg_entregados, :entregas, :ultima_entrega, :ultimo_pago"
+_COLUMNAS_CARGOS = "cliente_id, anio, mes, cargos, kg"
+_VALORES_CARGOS = ":cliente_id, :anio, :mes, :cargos, :kg"
+
+UPSERT_SALDO = {
+    "mysql": (
+        f"INSERT INTO {TABLA_SALDOS} ({_COLUMNAS_SALDO}) VALUES ({_VALORES_SALDO}) "
+        "ON DUPLICATE KEY UPDATE cargos = cargos + VALUES(cargos), pagos = pagos + VALUES(pagos), "
+        "kg_entregados = kg_entregados + VALUES(kg_entregados), entregas = entregas + VALUES(entregas), "
+        "ultima_entrega = COALESCE(GREATEST(ultima_entrega, VALUES(ultima_entrega)), ultima_entrega, VALUES(ultima_entrega)), "
+        "ultimo_pago = COALESCE(GREATEST(ultimo_pago, VALUES(ultimo_pago)), ultimo_pago, VALUES(ultimo_pago))"
+    ),
+    "sqlite": (
+        f"INSERT INTO {TABLA_SALDOS} ({_COLUMNAS_SALDO}) VALUES ({_VALORES_SALDO}) "
+        "ON CONFLICT(cliente_id) DO UPDATE SET cargos = cargos + excluded.cargos, pagos = pagos + excluded.pagos, "
+        "kg_entregados = kg_entregados + excluded.kg_entregados, entregas = entregas + excluded.entregas, "
+        "ultima_entrega = COALESCE(MAX(ultima_entrega, excluded.ultima_entrega), ultima_entrega, excluded.ultima_entrega), "
+        "ultimo_pago = COALESCE(MAX(ultimo_pago, excluded.ultimo_pago), ultimo_pago, excluded.ultimo_pago)"
+    ),
+}
+
+UPSERT_CARGOS = {
+    "mysql": (
+        f"INSERT INTO {TABLA_CARGOS} ({_COLUMNAS_CARGOS}) VALUES ({_VALORES_CARGOS}) "
+        "ON DUPLICATE KEY UPDATE cargos = cargos + VALUES(cargos), kg = kg + VALUES(kg)"
+    ),
+    "sqlite": (
+        f"INSERT INTO {TABLA_CARGOS} ({_COLUMNAS_CARGOS}) VALUES ({_VALORES_CARGOS}) "
+        "ON CONFLICT(cliente_id, anio, mes) DO UPDATE SET cargos = cargos + excluded.cargos, kg = kg + excluded.kg"
+    ),
+}
+
+SQL_PRECIOS = text(
+    "SELECT nombre, precio FROM precios_producto WHERE nombre IN :nombres"
+).bindparams(bindparam("nombres", expanding=True))
+
+
+def _fecha(valor):
+    fecha = pd.Timestamp(valor) if valor is not None else pd.NaT
+    return None if pd.isna(fecha) else fecha.to_pydatetime()
+
+
+def _movimiento(cliente):
+    return {"cliente_id": cliente, "cargos": 0.0, "pagos": 0.0, "kg_entregados": 0.0,
+            "entregas": 0, "ultima_entrega": None, "ultimo_pago": None}
+
+
+def _mas_reciente(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+# ---------------------------------------------------------------------------
+# Tablas
+# ---------------------------------------------------------------------------
+def preparar(engine):
+    """Crea y llena las dos tablas si falta alguna, antes de registrar entregas o pagos"""
+    materializadas.preparar(engine, TABLAS, DDL, reconstruir)
+
+
+def recalcular(engine):
+    """Revalúa los saldos (reconstruir) en una transacción propia; la caché se invalida ya confirmada"""
+    preparar(engine)
+    with engine.begin() as conn:
+        reconstruir(conn)
+    invalidar(*TABLAS)
+
+
+def _acumular(conn, saldos, cargos):
+    dialecto = conn.dialect.name
+    if saldos:
+        conn.execute(text(UPSERT_SALDO[dialecto]), list(saldos.values()))
+    filas = [{"cliente_id": c, "anio": a, "mes": m, "cargos": imp, "kg": kg}
+             for (c, a, m), (imp, kg) in cargos.items()]
+    if filas:
+        conn.execute(text(UPSERT_CARGOS[dialecto]), filas)
+
+
+def registrar_entregas(conn, entregas):
+    """Carga al cliente las entregas (dicts con cliente_id, producto, cantidad y
+    fecha_entrega) al precio vigente, dentro de la transacción de conn; quien
+    la abre invalida TABLAS después del commit"""
+    entregas = [e for e in entregas if e.get("cantidad") is not None and _fecha(e.get("fecha_entrega"))]
+    if not entregas:
+        return
+    nombres = sorted({str(e.get("producto")) for e in entregas if e.get("producto") is not None})
+    precios = dict(conn.execute(SQL_PRECIOS, {"nombres": nombres}).all()) if nombres else {}
+
+    saldos, cargos = {}, defaultdict(lambda: [0.0, 0.0])
+    for e in entregas:
+        cliente, fecha, kg = clave_cliente(e.get("cliente_id")), _fecha(e["fecha_entrega"]), float(e["cantidad"])
+        importe = kg * float(precios.get(str(e.get("producto")), 0) or 0)
+        mov = saldos.setdefault(cliente, _movimiento(cliente))
+        mov["cargos"] += importe
+        mov["kg_entregados"] += kg
+        mov["entregas"] += 1
+        mov["ultima_entrega"] = _mas_reciente(mov["ultima_entrega"], fecha)
+        cargos[(cliente, fecha.year, fecha.month)][0] += importe
+        cargos[(cliente, fecha.year, fecha.month)][1] += kg
+    _acumular(conn, saldos, cargos)
+
+
+def registrar_pagos(conn, pagos):
+    """Abona a cada cliente sus pagos (dicts con cliente_id, monto y fecha_pago);
+    invalidación como registrar_entregas"""
+    saldos = {}
+    for p in pagos:
+        if p.get("monto") is None or pd.isna(p.get("monto")):
+            continue
+        cliente = clave_cliente(p.get("cliente_id"))
+        mov = saldos.setdefault(cliente, _movimiento(cliente))
+        mov["pagos"] += float(p["monto"])
+        mov["ultimo_pago"] = _mas_reciente(mov["ultimo_pago"], _fecha(p.get("fecha_pago")))
+    _acumular(conn, saldos, {})
+
+
+def reconstruir(conn):
+    """Recalcula cargos (con los precios actuales) y pagos agregando en la base de datos"""
+    anio, mes = (f.format(c="l.fecha_entrega") for f in ANIO_MES[conn.dialect.name])
+    por_mes = conn.execute(text(
+        f"SELECT COALESCE(l.cliente_id, '') AS cliente_id, {anio} AS anio, {mes} AS mes, "
+        "SUM(l.cantidad * COALESCE(p.precio, 0)) AS cargos, SUM(l.cantidad) AS kg, "
+        "COUNT(*) AS entregas, MAX(l.fecha_entrega) AS ultima_entrega "
+        "FROM log_pedidos_entregados l LEFT JOIN precios_producto p ON p.nombre = l.producto "
+        "WHERE l.fecha_entrega IS NOT NULL AND l.cantidad IS NOT NULL "
+        f"GROUP BY COALESCE(l.cliente_id, ''), {anio}, {mes}"
+    )).mappings().all()
+    pagos = conn.execute(text(
+        "SELECT COALESCE(cliente_id, '') AS cliente_id, SUM(monto) AS pagos, MAX(fecha_pago) AS ultimo_pago "
+        "FROM pagos_cliente WHERE monto IS NOT NULL GROUP BY COALESCE(cliente_id, '')"
+    )).mappings().all()
+
+    saldos, cargos = {}, {}
+    for f in por_mes:
+        mov = saldos.setdefault(f["cliente_id"], _movimiento(f["cliente_id"]))
+        mov["cargos"] += float(f["cargos"] or 0)
+        mov["kg_entregados"] += float(f["kg"] or 0)
+        mov["entregas"] += int(f["entregas"])
+        mov["ultima_entrega"] = _mas_reciente(mov["ultima_entrega"], _fecha(f["ultima_entrega"]))
+        cargos[(f["cliente_id"], int(f["anio"]), int(f["mes"]))] = (float(f["cargos"] or 0), float(f["kg"] or 0))
+    for f in pagos:
+        mov = saldos.setdefault(f["cliente_id"], _movimiento(f["cliente_id"]))
+        mov["pagos"] = float(f["pagos"] or 0)
+        mov["ultimo_pago"] = _fecha(f["ultimo_pago"])
+
+    for tabla in TABLAS:
+        conn.execute(text(f"DELETE FROM {tabla}"))
+    _acumular(conn, saldos, cargos)
+
+
+# ---------------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------------
+def antiguedad(cargos_por_mes, pagos, hoy=None):
+    """{tramo: importe pendiente}: los pagos cubren primero los cargos más viejos.
+
+    cargos_por_mes es una lista de (anio, mes, importe) en cualquier orden.
+    """
+    hoy = hoy or datetime.date.today()
+    tramos = dict.fromkeys(TRAMOS, 0.0)
+    disponible = float(pagos)
+    for a, m, importe in sorted(cargos_por_mes):
+        aplicado = min(disponible, importe)
+        disponible -= aplicado
+        pendiente = importe - aplicado
+        if pendiente > 0:
+            meses = (hoy.year - a) * 12 + hoy.month - m
+            tramos[TRAMOS[min(max(meses, 0), len(TRAMOS) - 1)]] += pendiente
+    return tramos
+
+
+@consulta_cacheada(*TABLAS)
+def estado_cuenta(engine, cliente_id):
+    """Cargos, pagos, saldo, kg, fechas y antigüedad del saldo de un cliente"""
+    preparar(engine)
+    cliente = clave_cliente(cliente_id)
+    with engine.connect() as conn:
+        fila = conn.execute(
+            text(f"SELECT {_COLUMNAS_SALDO} FROM {TABLA_SALDOS} WHERE cliente_id = :c"), {"c": cliente}
+        ).mappings().first()
+        meses = conn.execute(
+            text(f"SELECT anio, mes, cargos FROM {TABLA_CARGOS} WHERE cliente_id = :c AND cargos <> 0"),
+            {"c": cliente},
+        ).all()
+    cuenta = dict(fila) if fila is not None else _movimiento(cliente)
+    cuenta["saldo"] = cuenta["cargos"] - cuenta["pagos"]
+    cuenta["antiguedad"] = antiguedad([tuple(m) for m in meses], cuenta["pagos"])
+    return cuenta
+
+
+@consulta_cacheada(TABLA_SALDOS)
+def clientes_con_cuenta(engine):
+    """Clientes con entregas o pagos registrados, ordenados por nombre"""
+    preparar(engine)
+    with engine.connect() as conn:
+        filas = conn.execute(text(f"SELECT cliente_id FROM {TABLA_SALDOS} ORDER BY cliente_id")).all()
+    return [f[0] for f in filas]
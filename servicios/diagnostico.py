@@ -0,0 +1,134 @@
+# ============================================================================
+# DIAGNÓSTICO DE RENDIMIENTO POR VISTA
+# ============================================================================
+# medir_vista() envuelve cada vista que despacha el menú: con
+# servicios.instrumentacion registra tiempo total, tiempo en la base,
+# consultas, filas leídas, tiempo de gráficas y las sentencias más lentas de
+# esa re-ejecución. Se guardan las últimas DIAGNOSTICO_ULTIMOS por vista en
+# memoria del proceso (todas las sesiones) y cada registro se agrega a un
+# JSONL (DIAGNOSTICO_LOG; vacío lo desactiva).
+#
+# panel() dibuja en la barra lateral la sección "Diagnóstico", oculta salvo
+# que la URL lleve ?diagnostico=1 o DIAGNOSTICO_PANEL=1 en el .env.
+import datetime
+import json
+import os
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from servicios import instrumentacion
+from servicios.conexion import RAIZ_PROYECTO
+
+ULTIMOS = int(os.getenv("DIAGNOSTICO_ULTIMOS", "20"))
+RUTA_LOG = os.getenv("DIAGNOSTICO_LOG", os.path.join(RAIZ_PROYECTO, "logs", "diagnostico_vistas.jsonl"))
+SENTENCIAS_POR_REGISTRO = 5
+
+_REGISTROS = defaultdict(lambda: deque(maxlen=ULTIMOS))
+_LOCK = threading.Lock()
+
+
+def _escribir_log(registro):
+    if not RUTA_LOG:
+        return
+    try:
+        os.makedirs(os.path.dirname(RUTA_LOG), exist_ok=True)
+        with open(RUTA_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+    except OSError:
+        # El diagnóstico nunca debe tumbar la vista
+        pass
+
+
+def registrar(vista, medicion, usuario=None, error=None):
+    """Guarda el resultado de una re-ejecución de `vista`"""
+    registro = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "vista": vista,
+        "usuario": usuario,
+        "error": error,
+        **medicion.como_dict(),
+        "sentencias": [
+            {"sql": sql, "ejecuciones": n, "segundos": round(seg, 6)}
+            for sql, n, seg in medicion.sentencias_mas_lentas(SENTENCIAS_POR_REGISTRO)
+        ],
+    }
+    registro.pop("memoria_pico", None)
+    with _LOCK:
+        _REGISTROS[vista].append(registro)
+        _escribir_log(registro)
+    return registro
+
+
+@contextmanager
+def medir_vista(vista, usuario=None):
+    """Mide el bloque como una re-ejecución de `vista`"""
+    error = None
+    try:
+        with instrumentacion.medir() as medicion:
+            yield medicion
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        # st.rerun()/st.stop() no heredan de Exception: también se registran
+        registrar(vista, medicion, usuario, error)
+
+
+def ultimos(vista=None):
+    """Registros recientes de una vista (o de todas), del más nuevo al más viejo"""
+    with _LOCK:
+        if vista is not None:
+            return list(reversed(_REGISTROS.get(vista, ())))
+        todos = [r for registros in _REGISTROS.values() for r in registros]
+    return sorted(todos, key=lambda r: r["fecha"], reverse=True)
+
+
+def limpiar():
+    with _LOCK:
+        _REGISTROS.clear()
+
+
+def panel_visible():
+    import streamlit as st
+
+    if os.getenv("DIAGNOSTICO_PANEL", "").strip().lower() in ("1", "true", "si", "sí"):
+        return True
+    try:
+        return st.query_params.get("diagnostico") in ("1", "true")
+    except Exception:
+        return False
+
+
+def panel():
+    """Sección "Diagnóstico" de la barra lateral con las últimas re-ejecuciones por vista"""
+    import pandas as pd
+    import streamlit as st
+
+    if not panel_visible():
+        return
+    with st.sidebar.expander("🩺 Diagnóstico", expanded=False):
+        with _LOCK:
+            vistas = sorted(_REGISTROS)
+        if not vistas:
+            st.caption("Sin re-ejecuciones registradas todavía.")
+            return
+        vista = st.selectbox("Vista", vistas, key="diagnostico_vista")
+        registros = ultimos(vista)
+        tabla = pd.DataFrame([{
+            "fecha": r["fecha"][11:],
+            "total ms": round(r["segundos"] * 1000, 1),
+            "BD ms": round(r["segundos_sql"] * 1000, 1),
+            "consultas": r["consultas"],
+            "filas": r["filas"],
+            "gráficas ms": round(r["segundos_graficas"] * 1000, 1),
+            "error": r["error"] or "",
+        } for r in registros])
+        st.dataframe(tabla, hide_index=True)
+
+        indice = st.selectbox("Re-ejecución", range(len(registros)), key="diagnostico_indice",
+                              format_func=lambda i: f"{registros[i]['fecha'][11:]} · {registros[i]['segundos'] * 1000:.0f} ms")
+        st.caption("Sentencias con más tiempo en la base:")
+        st.dataframe(pd.DataFrame([{
+            "ms": round(s["segundos"] * 1000, 1), "veces": s["ejecuciones"], "sql": s["sql"]
+        } for s in registros[indice]["sentencias"]]), hide_index=True)
@@ -0,0 +1,108 @@
+# ============================================================================
+# SERVICIO DE ENTREGA DE PEDIDOS PENDIENTES
+# ============================================================================
+# Entregar un pendiente implica: insertarlo en pedidos_cliente, dejar registro en
+# log_pedidos_entregados (y el cargo en la cuenta del cliente), opcionalmente
+# guardar la comparación con la predicción y borrarlo de pedidos_pendientes.
+# Todo se hace en UNA transacción con sentencias preparadas (servicios.escritura)
+# y executemany, de modo que un lote de N entregas cuesta unas pocas idas y
+# vueltas y nunca queda a medias si la conexión se corta.
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from servicios import cuentas_clientes, exactitud_predicciones, resumen_mensual
+from servicios.cache_consultas import invalidar
+from servicios.escritura import insertar
+from servicios.paginacion import a_python
+
+TABLAS_ENTREGA = ("pedidos_cliente", "log_pedidos_entregados",
+                  "comparacion_prediccion_vs_real", "pedidos_pendientes", resumen_mensual.TABLA,
+                  exactitud_predicciones.TABLA) + cuentas_clientes.TABLAS
+
+SQL_PENDIENTES = text(
+    "SELECT id, cliente_id, producto, cantidad, detalle, fecha "
+    "FROM pedidos_pendientes WHERE id IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+# En MySQL se bloquean las filas para que dos usuarios no entreguen el mismo pendiente
+SQL_PENDIENTES_BLOQUEO = text(
+    "SELECT id, cliente_id, producto, cantidad, detalle, fecha "
+    "FROM pedidos_pendientes WHERE id IN :ids FOR UPDATE"
+).bindparams(bindparam("ids", expanding=True))
+
+SQL_BORRAR_PENDIENTES = text(
+    "DELETE FROM pedidos_pendientes WHERE id IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+
+def _comparacion(pendiente, fecha_entrega, prediccion, ahora):
+    fecha_pred, kg_pred = prediccion
+    fecha_pred = pd.Timestamp(fecha_pred)
+    return {
+        "cliente_id": pendiente['cliente_id'],
+        "fecha_real": fecha_entrega,
+        "kg_real": float(pendiente['cantidad']),
+        "fecha_predicha": fecha_pred.to_pydatetime(),
+        "kg_predicha": float(kg_pred),
+        "dif_dias": int((pd.Timestamp(fecha_entrega) - fecha_pred).days),
+        "dif_kg": float(pendiente['cantidad']) - float(kg_pred),
+        "registro": ahora,
+        "fue_pred_usada": True,
+    }
+
+
+def entregar_pendientes(engine, ids_pendientes, fecha_entrega, predicciones=None):
+    """Entrega un lote de pedidos pendientes en una sola transacción.
+
+    predicciones es un dict opcional {id_pendiente: (fecha_predicha, kg_predicha)}
+    para guardar la comparación con la predicción asociada.
+    Devuelve la lista de ids entregados (los que ya no estaban pendientes se omiten).
+    """
+    ids = [int(i) for i in ids_pendientes]
+    if not ids:
+        return []
+    predicciones = predicciones or {}
+    ahora = pd.Timestamp.now().to_pydatetime()
+
+    resumen_mensual.preparar(engine)
+    exactitud_predicciones.preparar(engine)
+    cuentas_clientes.preparar(engine)
+    with engine.begin() as conn:
+        consulta = SQL_PENDIENTES_BLOQUEO if conn.dialect.name == "mysql" else SQL_PENDIENTES
+        pendientes = [dict(r) for r in conn.execute(consulta, {"ids": ids}).mappings()]
+        if not pendientes:
+            return []
+
+        pedidos, logs, comparaciones = [], [], []
+        for p in pendientes:
+            p = {k: a_python(v) for k, v in p.items()}
+            pedidos.append({
+                'cliente_id': p['cliente_id'],
+                'producto': p['producto'],
+                'cantidad': p['cantidad'],
+                'detalle': p['detalle'],
+                'fecha': fecha_entrega,
+            })
+            logs.append({
+                'cliente_id': p['cliente_id'],
+                'producto': p['producto'],
+                'cantidad': p['cantidad'],
+                'detalle': p['detalle'],
+                'fecha_solicitada': p['fecha'],
+                'fecha_entrega': fecha_entrega,
+                'id_pendiente': p['id'],
+            })
+            if p['id'] in predicciones:
+                comparaciones.append(_comparacion(p, fecha_entrega, predicciones[p['id']], ahora))
+
+        entregados = [p['id'] for p in pendientes]
+        insertar(conn, "pedidos_cliente", pedidos)
+        resumen_mensual.registrar_pedidos(conn, pedidos)
+        insertar(conn, "log_pedidos_entregados", logs)
+        cuentas_clientes.registrar_entregas(conn, logs)
+        insertar(conn, "comparacion_prediccion_vs_real", comparaciones)
+        exactitud_predicciones.registrar_comparaciones(conn, comparaciones)
+        conn.execute(SQL_BORRAR_PENDIENTES, {"ids": entregados})
+
+    invalidar(*TABLAS_ENTREGA)
+    return entregados
@@ -0,0 +1,77 @@
+# ============================================================================
+# INSERCIONES LIGERAS CON SENTENCIAS CACHEADAS
+# ============================================================================
+# DataFrame.to_sql para una sola fila construye un DataFrame, infiere tipos y
+# refleja la tabla antes de cada INSERT. Aquí el INSERT se arma una sola vez por
+# (tabla, columnas) y SQLAlchemy reutiliza su forma compilada; varias filas se
+# envían con executemany (que mysql-connector agrupa en un INSERT multi-fila).
+import functools
+import re
+
+import pandas as pd
+from sqlalchemy import column, table
+from sqlalchemy.engine import Engine
+
+from servicios.paginacion import a_python
+
+_IDENTIFICADOR = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+@functools.lru_cache(maxsize=256)
+def sentencia_insert(tabla, columnas):
+    """INSERT reutilizable para la tabla y la tupla de columnas dadas"""
+    for nombre in (tabla,) + tuple(columnas):
+        if not _IDENTIFICADOR.match(nombre):
+            raise ValueError(f"Identificador SQL no válido: {nombre!r}")
+    return table(tabla, *[column(c) for c in columnas]).insert()
+
+
+def _normalizar_filas(filas):
+    if isinstance(filas, pd.DataFrame):
+        df = filas.astype(object).where(filas.notna(), None)
+        return df.to_dict('records')
+    if isinstance(filas, (dict, pd.Series)):
+        filas = [filas]
+    return [dict(f) for f in filas]
+
+
+def _columnas(filas):
+    columnas = []
+    vistas = set()
+    for f in filas:
+        for c in f:
+            if c not in vistas:
+                vistas.add(c)
+                columnas.append(c)
+    return tuple(columnas)
+
+
+def insertar(destino, tabla, filas):
+    """Inserta una fila (dict) o varias (lista de dicts / DataFrame) en `tabla`.
+
+    `destino` puede ser un Engine (abre su propia transacción) o una Connection
+    ya dentro de una transacción. Devuelve el número de filas insertadas.
+    """
+    filas = _normalizar_filas(filas)
+    if not filas:
+        return 0
+    columnas = _columnas(filas)
+    parametros = [{c: a_python(f.get(c)) for c in columnas} for f in filas]
+    stmt = sentencia_insert(tabla, columnas)
+    datos = parametros[0] if len(parametros) == 1 else parametros
+
+    if isinstance(destino, Engine):
+        with destino.begin() as conn:
+            conn.execute(stmt, datos)
+    else:
+        destino.execute(stmt, datos)
+    return len(parametros)
+
+
+def insertar_por_lotes(destino, tabla, filas, tamano_lote=5000):
+    """Inserta muchas filas en bloques de tamano_lote (executemany por bloque)"""
+    filas = _normalizar_filas(filas)
+    total = 0
+    for inicio in range(0, len(filas), tamano_lote):
+        total += insertar(destino, tabla, filas[inicio:inicio + tamano_lote])
+    return total
@@ -0,0 +1,70 @@
+# ============================================================================
+# ESTADÍSTICAS DE PEDIDOS CALCULADAS EN LA BASE
+# ============================================================================
+# El resumen global descargaba todos los pedidos para hacer len(), sum(),
+# groupby('producto') y el ranking de clientes en pandas. Aquí cada métrica es
+# una sola consulta agregada (COUNT/SUM, GROUP BY producto, GROUP BY cliente_id
+# ... LIMIT k), así que lo que viaja por la red depende del número de
+# productos y del tamaño del ranking, no del de pedidos.
+#
+# Todas aceptan una ventana opcional [desde, hasta] (fechas, día final
+# incluido) y pasan por la caché versionada de la tabla pedidos_cliente.
+import datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+from servicios.cache_consultas import consulta_cacheada
+
+TABLA = "pedidos_cliente"
+LIMITE_RANKING = 20
+
+
+def _ventana(desde=None, hasta=None):
+    """WHERE parametrizado para la ventana de fechas ("" si no hay ventana)"""
+    condiciones, params = [], {}
+    if desde is not None:
+        condiciones.append("fecha >= :desde")
+        params["desde"] = datetime.datetime.combine(desde, datetime.time.min)
+    if hasta is not None:
+        # Incluye todo el día final
+        condiciones.append("fecha < :hasta")
+        params["hasta"] = datetime.datetime.combine(hasta + datetime.timedelta(days=1), datetime.time.min)
+    where = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+    return where, params
+
+
+@consulta_cacheada(TABLA)
+def totales_pedidos(engine, desde=None, hasta=None):
+    """{"pedidos": n, "kg": total} de la ventana"""
+    where, params = _ventana(desde, hasta)
+    with engine.connect() as conn:
+        fila = conn.execute(
+            text(f"SELECT COUNT(*), COALESCE(SUM(cantidad), 0) FROM {TABLA}{where}"), params
+        ).first()
+    return {"pedidos": int(fila[0]), "kg": float(fila[1] or 0)}
+
+
+@consulta_cacheada(TABLA)
+def pedidos_por_producto(engine, desde=None, hasta=None):
+    """kg y número de pedidos por producto (índice producto, columnas cantidad y num_pedidos)"""
+    where, params = _ventana(desde, hasta)
+    query = (f"SELECT producto, SUM(cantidad) AS cantidad, COUNT(*) AS num_pedidos FROM {TABLA}{where} "
+             "GROUP BY producto ORDER BY producto")
+    return pd.read_sql(text(query), engine, params=params).set_index("producto")
+
+
+@consulta_cacheada(TABLA)
+def ranking_clientes(engine, limite=LIMITE_RANKING, desde=None, hasta=None):
+    """Los `limite` clientes con más kg (índice cliente_id, columnas total_kg y pedidos)"""
+    where, params = _ventana(desde, hasta)
+    query = (f"SELECT cliente_id, SUM(cantidad) AS total_kg, COUNT(*) AS pedidos FROM {TABLA}{where} "
+             f"GROUP BY cliente_id ORDER BY total_kg DESC, cliente_id LIMIT {int(limite)}")
+    return pd.read_sql(text(query), engine, params=params).set_index("cliente_id")
+
+
+@consulta_cacheada("usuarios")
+def contar_clientes(engine):
+    """Número de usuarios con rol cliente"""
+    with engine.connect() as conn:
+        return int(conn.execute(text("SELECT COUNT(DISTINCT usuario) FROM usuarios WHERE LOWER(rol)='cliente'")).scalar() or 0)
@@ -0,0 +1,150 @@
+# ============================================================================
+# ESTADO ACTUAL DEL INVENTARIO (UNA FILA POR PRODUCTO, CON VERSIÓN)
+# ============================================================================
+# El inventario actual se obtenía ordenando todo el historial de
+# inventario_cafe (ORDER BY fecha_actualizacion DESC LIMIT 1), y actualizarlo
+# era leer ese valor y después hacer dos inserts sin relación entre sí: si dos
+# proveedores actualizaban a la vez, el segundo guardaba un cantidad_antes que
+# ya no era cierto.
+#
+# La tabla estado_inventario guarda la cantidad vigente por producto y un
+# número de versión. actualizar() cambia la fila solo si la versión sigue
+# siendo la que leyó (UPDATE ... WHERE version = :leida) y, en la misma
+# transacción, agrega el movimiento a control_inventario_cafe (y el valor a
+# inventario_cafe, que otros dashboards siguen leyendo). Si otro usuario ganó
+# la carrera se vuelve a intentar con el valor nuevo; en MySQL además se
+# bloquea la fila con FOR UPDATE. Leer el inventario es una búsqueda por clave
+# primaria, sin importar cuánto historial haya.
+#
+# Si la tabla no existe, preparar() la crea y la llena con el último valor de
+# inventario_cafe en su propia transacción, antes de la que actualiza
+# (servicios.materializadas); reconstruir() también sirve tras cargas externas.
+import datetime
+import time
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from servicios import materializadas
+from servicios.cache_consultas import consulta_cacheada, invalidar
+from servicios.escritura import insertar
+
+TABLA = "estado_inventario"
+# El inventario de los dashboards es uno solo, el del café
+PRODUCTO = "cafe"
+INTENTOS = 5
+
+DDL = f"""
+CREATE TABLE IF NOT EXISTS {TABLA} (
+    producto VARCHAR(100) NOT NULL,
+    cantidad_kg DOUBLE NOT NULL,
+    version INT NOT NULL DEFAULT 0,
+    fecha_actualizacion DATETIME,
+    usuario VARCHAR(100),
+    PRIMARY KEY (producto)
+)
+"""
+
+SQL_ESTADO = f"SELECT cantidad_kg, version, fecha_actualizacion FROM {TABLA} WHERE producto = :producto"
+
+SQL_ACTUALIZAR = text(
+    f"UPDATE {TABLA} SET cantidad_kg = :cantidad, version = version + 1, "
+    "fecha_actualizacion = :fecha, usuario = :usuario "
+    "WHERE producto = :producto AND version = :version"
+)
+
+SQL_INSERTAR = text(
+    f"INSERT INTO {TABLA} (producto, cantidad_kg, version, fecha_actualizacion, usuario) "
+    "VALUES (:producto, :cantidad, :version, :fecha, :usuario)"
+)
+
+class ConflictoInventario(Exception):
+    """Otro usuario cambió el inventario en cada uno de los intentos"""
+
+
+class _VersionCambiada(Exception):
+    pass
+
+
+def preparar(engine):
+    """Crea el estado y lo llena desde inventario_cafe si no existe (antes de actualizar)"""
+    materializadas.preparar(engine, (TABLA,), DDL, reconstruir)
+
+
+def reconstruir(conn):
+    """Vuelve a tomar el último valor de inventario_cafe (la versión sigue creciendo).
+
+    Quien abre la transacción invalida TABLA después del commit.
+    """
+    version = conn.execute(text(f"SELECT MAX(version) FROM {TABLA}")).scalar() or 0
+    conn.execute(text(f"DELETE FROM {TABLA}"))
+    if inspect(conn).has_table("inventario_cafe"):
+        ultimo = conn.execute(text(
+            "SELECT cantidad_kg, fecha_actualizacion FROM inventario_cafe "
+            "ORDER BY fecha_actualizacion DESC LIMIT 1"
+        )).first()
+        if ultimo is not None and ultimo[0] is not None:
+            conn.execute(SQL_INSERTAR, {"producto": PRODUCTO, "cantidad": float(ultimo[0]),
+                                        "version": int(version) + 1, "fecha": ultimo[1], "usuario": None})
+
+
+@consulta_cacheada(TABLA)
+def leer_estado(engine, producto=PRODUCTO):
+    """dict con cantidad_kg, version y fecha_actualizacion, o None si nunca se registró"""
+    with engine.connect() as conn:
+        fila = conn.execute(text(SQL_ESTADO), {"producto": producto}).mappings().first()
+    return dict(fila) if fila is not None else None
+
+
+def _reintentable(error):
+    """Base bloqueada / instantánea vieja (SQLite) o interbloqueo (MySQL)"""
+    mensaje = str(error).lower()
+    return "locked" in mensaje or "busy" in mensaje or "deadlock" in mensaje
+
+
+def _actualizar(conn, nueva_cantidad, usuario, inicial, producto):
+    consulta = SQL_ESTADO + (" FOR UPDATE" if conn.dialect.name == "mysql" else "")
+    fila = conn.execute(text(consulta), {"producto": producto}).first()
+    ahora = datetime.datetime.now()
+    valores = {"producto": producto, "cantidad": float(nueva_cantidad), "fecha": ahora, "usuario": usuario}
+    if fila is None:
+        anterior, version = float(inicial), 1
+        conn.execute(SQL_INSERTAR, {**valores, "version": version})
+    else:
+        anterior, version = float(fila[0]), int(fila[1]) + 1
+        if conn.execute(SQL_ACTUALIZAR, {**valores, "version": version - 1}).rowcount != 1:
+            raise _VersionCambiada()
+    insertar(conn, 'inventario_cafe', {"cantidad_kg": float(nueva_cantidad), "fecha_actualizacion": ahora})
+    insertar(conn, 'control_inventario_cafe', {
+        "cantidad_antes": anterior,
+        "cantidad_despues": float(nueva_cantidad),
+        "fecha_cambio": ahora,
+        "usuario": usuario,
+    })
+    return {"cantidad_antes": anterior, "cantidad_despues": float(nueva_cantidad), "version": version}
+
+
+def actualizar(engine, nueva_cantidad, usuario, inicial, producto=PRODUCTO, intentos=INTENTOS):
+    """Fija el inventario de `producto` y registra el movimiento en una transacción.
+
+    `inicial` es el cantidad_antes del primer movimiento si aún no hay estado.
+    Devuelve {"cantidad_antes", "cantidad_despues", "version"}; lanza
+    ConflictoInventario si otro usuario ganó todos los intentos.
+    """
+    preparar(engine)
+    ultimo_error = None
+    for intento in range(intentos):
+        try:
+            with engine.begin() as conn:
+                resultado = _actualizar(conn, nueva_cantidad, usuario, inicial, producto)
+            invalidar(TABLA, "inventario_cafe", "control_inventario_cafe")
+            return resultado
+        except (_VersionCambiada, IntegrityError) as e:
+            ultimo_error = e
+        except OperationalError as e:
+            if not _reintentable(e):
+                raise
+            ultimo_error = e
+        time.sleep(0.01 * (intento + 1))
+    raise ConflictoInventario(f"No se pudo actualizar el inventario de {producto} "
+                              f"tras {intentos} intentos ({type(ultimo_error).__name__})")
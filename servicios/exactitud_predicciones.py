@@ -0,0 +1,268 @@
+# ============================================================================
+# EXACTITUD DE LAS PREDICCIONES COMO AGREGADOS INCREMENTALES
+# ============================================================================
+# El resumen global leía comparacion_prediccion_vs_real completa en cada visita
+# para calcular media, desviación, mínimo y máximo de los errores en kg y en
+# días y los porcentajes de acierto (±1 kg, ±1 día y ambos). La tabla
+# exactitud_predicciones guarda esos agregados por cliente y una fila global
+# (cliente_id = GLOBAL): número de comparaciones, media y suma de cuadrados de
+# las desviaciones (algoritmo de Welford), mínimo, máximo y contadores de
+# aciertos. Se actualiza en la misma transacción que inserta las comparaciones,
+# así que la vista lee una fila sin importar cuántas comparaciones haya.
+#
+# Como resumen_mensual, si la tabla no existe se crea y se reconstruye
+# agregando en la base; reconstruir() sirve tras cargas masivas externas.
+import math
+
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from servicios import materializadas
+from servicios.cache_consultas import consulta_cacheada
+from servicios.materializadas import clave_cliente
+
+TABLA = "exactitud_predicciones"
+TABLA_COMPARACIONES = "comparacion_prediccion_vs_real"
+GLOBAL = "*"
+# Un error absoluto hasta este valor cuenta como acierto (kg y días)
+TOLERANCIA = 1
+
+METRICAS = ("kg", "dias")
+COLUMNAS = ("n", "media_kg", "m2_kg", "min_kg", "max_kg",
+            "media_dias", "m2_dias", "min_dias", "max_dias",
+            "aciertos_kg", "aciertos_dias", "aciertos_ambos")
+
+DDL = f"""
+CREATE TABLE IF NOT EXISTS {TABLA} (
+    cliente_id VARCHAR(100) NOT NULL,
+    n INT NOT NULL DEFAULT 0,
+    media_kg DOUBLE NOT NULL DEFAULT 0,
+    m2_kg DOUBLE NOT NULL DEFAULT 0,
+    min_kg DOUBLE,
+    max_kg DOUBLE,
+    media_dias DOUBLE NOT NULL DEFAULT 0,
+    m2_dias DOUBLE NOT NULL DEFAULT 0,
+    min_dias DOUBLE,
+    max_dias DOUBLE,
+    aciertos_kg INT NOT NULL DEFAULT 0,
+    aciertos_dias INT NOT NULL DEFAULT 0,
+    aciertos_ambos INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (cliente_id)
+)
+"""
+
+_LISTA = ", ".join(COLUMNAS)
+_VALORES = ", ".join(f":{c}" for c in COLUMNAS)
+UPSERT = {
+    "mysql": (
+        f"INSERT INTO {TABLA} (cliente_id, {_LISTA}) VALUES (:cliente_id, {_VALORES}) "
+        "ON DUPLICATE KEY UPDATE " + ", ".join(f"{c} = VALUES({c})" for c in COLUMNAS)
+    ),
+    "sqlite": (
+        f"INSERT INTO {TABLA} (cliente_id, {_LISTA}) VALUES (:cliente_id, {_VALORES}) "
+        "ON CONFLICT(cliente_id) DO UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in COLUMNAS)
+    ),
+}
+
+# Fila en cero para los clientes nuevos: así FOR UPDATE siempre tiene qué bloquear
+INSERTAR_VACIO = {
+    "mysql": f"INSERT IGNORE INTO {TABLA} (cliente_id, {_LISTA}) VALUES (:cliente_id, {_VALORES})",
+    "sqlite": (
+        f"INSERT INTO {TABLA} (cliente_id, {_LISTA}) VALUES (:cliente_id, {_VALORES}) "
+        "ON CONFLICT(cliente_id) DO NOTHING"
+    ),
+}
+
+# Errores absolutos de una comparación, calculados igual en SQL y en Python
+ERROR_KG = "ABS(kg_real - kg_predicha)"
+ERROR_DIAS = "ABS(dif_dias)"
+
+
+# ---------------------------------------------------------------------------
+# Agregados en memoria
+# ---------------------------------------------------------------------------
+def vacio():
+    estado = dict.fromkeys(COLUMNAS, 0)
+    for m in METRICAS:
+        estado[f"min_{m}"] = estado[f"max_{m}"] = None
+    return estado
+
+
+def agregar(estado, error_kg, error_dias):
+    """Suma una comparación al estado (actualización de Welford)"""
+    estado["n"] += 1
+    for m, x in zip(METRICAS, (error_kg, error_dias)):
+        delta = x - estado[f"media_{m}"]
+        estado[f"media_{m}"] += delta / estado["n"]
+        estado[f"m2_{m}"] += delta * (x - estado[f"media_{m}"])
+        estado[f"min_{m}"] = x if estado[f"min_{m}"] is None else min(estado[f"min_{m}"], x)
+        estado[f"max_{m}"] = x if estado[f"max_{m}"] is None else max(estado[f"max_{m}"], x)
+    acierto_kg, acierto_dias = error_kg <= TOLERANCIA, error_dias <= TOLERANCIA
+    estado["aciertos_kg"] += int(acierto_kg)
+    estado["aciertos_dias"] += int(acierto_dias)
+    estado["aciertos_ambos"] += int(acierto_kg and acierto_dias)
+    return estado
+
+
+def combinar(a, b):
+    """Estado equivalente a haber agregado las comparaciones de a y de b (Chan et al.)"""
+    if not b["n"]:
+        return dict(a)
+    if not a["n"]:
+        return dict(b)
+    n = a["n"] + b["n"]
+    estado = {"n": n}
+    for m in METRICAS:
+        delta = b[f"media_{m}"] - a[f"media_{m}"]
+        estado[f"media_{m}"] = a[f"media_{m}"] + delta * b["n"] / n
+        estado[f"m2_{m}"] = a[f"m2_{m}"] + b[f"m2_{m}"] + delta * delta * a["n"] * b["n"] / n
+        estado[f"min_{m}"] = min(a[f"min_{m}"], b[f"min_{m}"])
+        estado[f"max_{m}"] = max(a[f"max_{m}"], b[f"max_{m}"])
+    for c in ("aciertos_kg", "aciertos_dias", "aciertos_ambos"):
+        estado[c] = a[c] + b[c]
+    return estado
+
+
+def _errores(comparacion):
+    """(error_kg, error_dias) o None si a la comparación le faltan datos"""
+    valores = [comparacion.get(c) for c in ("kg_real", "kg_predicha", "dif_dias")]
+    if any(v is None or pd.isna(v) for v in valores):
+        return None
+    kg_real, kg_predicha, dif_dias = (float(v) for v in valores)
+    return abs(kg_real - kg_predicha), abs(dif_dias)
+
+
+# ---------------------------------------------------------------------------
+# Tabla
+# ---------------------------------------------------------------------------
+def preparar(engine):
+    """Crea y llena los agregados si no existen (ver servicios.materializadas)"""
+    materializadas.preparar(engine, (TABLA,), DDL, reconstruir)
+
+
+def _guardar(conn, estados):
+    filas = [{"cliente_id": cliente, **{c: estado[c] for c in COLUMNAS}} for cliente, estado in estados.items()]
+    if filas:
+        conn.execute(text(UPSERT[conn.dialect.name]), filas)
+
+
+def _leer_estados(conn, clientes, bloquear=False):
+    query = f"SELECT cliente_id, {_LISTA} FROM {TABLA} WHERE cliente_id IN :clientes"
+    if bloquear:
+        query += " FOR UPDATE"
+    sentencia = text(query).bindparams(bindparam("clientes", expanding=True))
+    return {fila["cliente_id"]: dict(fila) for fila in conn.execute(sentencia, {"clientes": list(clientes)}).mappings()}
+
+
+def registrar_comparaciones(conn, comparaciones):
+    """Suma comparaciones (dicts con cliente_id, kg_real, kg_predicha, dif_dias)
+    a los agregados de su cliente y al global, dentro de la transacción de conn
+    (TABLA se invalida después del commit, al cerrarla); requiere preparar()"""
+    if isinstance(comparaciones, pd.DataFrame):
+        comparaciones = comparaciones.to_dict('records')
+    elif isinstance(comparaciones, (dict, pd.Series)):
+        comparaciones = [comparaciones]
+    lote = {}
+    for c in comparaciones:
+        errores = _errores(c)
+        if errores is not None:
+            agregar(lote.setdefault(clave_cliente(c.get("cliente_id")), vacio()), *errores)
+    if not lote:
+        return
+    total = vacio()
+    for estado in lote.values():
+        total = combinar(total, estado)
+    lote[GLOBAL] = total
+
+    # En MySQL se bloquean las filas: dos entregas a la vez no pierden comparaciones.
+    # FOR UPDATE no bloquea una fila que no existe (dos primeras entregas de un
+    # cliente se interbloquearían o una pisaría a la otra), así que antes se
+    # inserta en cero, en orden de cliente para que todas tomen los candados igual.
+    conn.execute(text(INSERTAR_VACIO[conn.dialect.name]),
+                 [{"cliente_id": cliente, **vacio()} for cliente in sorted(lote)])
+    actuales = _leer_estados(conn, lote, bloquear=conn.dialect.name == "mysql")
+    _guardar(conn, {cliente: combinar(actuales.get(cliente, vacio()), estado) for cliente, estado in lote.items()})
+
+
+def reconstruir(conn):
+    """Recalcula todos los agregados agregando en la base de datos.
+
+    M2 se suma como SUM((x - media)²) contra la media de cada cliente
+    (subconsulta), no como SUM(x²) - n·media², que pierde precisión.
+    """
+    completas = "kg_real IS NOT NULL AND kg_predicha IS NOT NULL AND dif_dias IS NOT NULL"
+    filas = conn.execute(text(
+        f"SELECT m.cliente, COUNT(*) AS n, "
+        f"MAX(m.media_kg) AS media_kg, SUM(({ERROR_KG} - m.media_kg) * ({ERROR_KG} - m.media_kg)) AS m2_kg, "
+        f"MIN({ERROR_KG}) AS min_kg, MAX({ERROR_KG}) AS max_kg, "
+        f"MAX(m.media_dias) AS media_dias, SUM(({ERROR_DIAS} - m.media_dias) * ({ERROR_DIAS} - m.media_dias)) AS m2_dias, "
+        f"MIN({ERROR_DIAS}) AS min_dias, MAX({ERROR_DIAS}) AS max_dias, "
+        f"SUM(CASE WHEN {ERROR_KG} <= {TOLERANCIA} THEN 1 ELSE 0 END) AS aciertos_kg, "
+        f"SUM(CASE WHEN {ERROR_DIAS} <= {TOLERANCIA} THEN 1 ELSE 0 END) AS aciertos_dias, "
+        f"SUM(CASE WHEN {ERROR_KG} <= {TOLERANCIA} AND {ERROR_DIAS} <= {TOLERANCIA} THEN 1 ELSE 0 END) AS aciertos_ambos "
+        f"FROM {TABLA_COMPARACIONES} c JOIN ("
+        f"SELECT COALESCE(cliente_id, '') AS cliente, AVG({ERROR_KG}) AS media_kg, AVG({ERROR_DIAS}) AS media_dias "
+        f"FROM {TABLA_COMPARACIONES} WHERE {completas} GROUP BY COALESCE(cliente_id, '')"
+        f") m ON COALESCE(c.cliente_id, '') = m.cliente "
+        f"WHERE {completas} "
+        "GROUP BY m.cliente"
+    )).mappings().all()
+
+    estados, total = {}, vacio()
+    for f in filas:
+        n = int(f["n"])
+        estado = {"n": n}
+        for m in METRICAS:
+            estado[f"media_{m}"] = float(f[f"media_{m}"])
+            estado[f"m2_{m}"] = float(f[f"m2_{m}"])
+            estado[f"min_{m}"] = float(f[f"min_{m}"])
+            estado[f"max_{m}"] = float(f[f"max_{m}"])
+        for c in ("aciertos_kg", "aciertos_dias", "aciertos_ambos"):
+            estado[c] = int(f[c] or 0)
+        estados[f["cliente"]] = estado
+        total = combinar(total, estado)
+    estados[GLOBAL] = total
+
+    conn.execute(text(f"DELETE FROM {TABLA}"))
+    _guardar(conn, estados)
+
+
+# ---------------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------------
+def metricas(estado):
+    """Medias, desviaciones (muestrales, como pandas.std) y porcentajes de acierto"""
+    n = estado["n"]
+    resultado = {"n": n}
+    for m in METRICAS:
+        resultado[f"media_{m}"] = estado[f"media_{m}"] if n else math.nan
+        resultado[f"std_{m}"] = math.sqrt(estado[f"m2_{m}"] / (n - 1)) if n > 1 else math.nan
+        resultado[f"min_{m}"] = estado[f"min_{m}"] if n else math.nan
+        resultado[f"max_{m}"] = estado[f"max_{m}"] if n else math.nan
+    for c in ("aciertos_kg", "aciertos_dias", "aciertos_ambos"):
+        resultado[c] = int(estado[c])
+        resultado[f"porcentaje_{c}"] = estado[c] / n * 100 if n else 0.0
+    return resultado
+
+
+@consulta_cacheada(TABLA)
+def leer_exactitud(engine, cliente_id=None):
+    """metricas() de un cliente o, con cliente_id=None, de todas las comparaciones"""
+    preparar(engine)
+    with engine.connect() as conn:
+        fila = conn.execute(
+            text(f"SELECT {_LISTA} FROM {TABLA} WHERE cliente_id = :c"),
+            {"c": GLOBAL if cliente_id is None else clave_cliente(cliente_id)},
+        ).mappings().first()
+    return metricas(dict(fila) if fila is not None else vacio())
+
+
+@consulta_cacheada(TABLA)
+def clientes_evaluados(engine):
+    """Clientes con al menos una comparación registrada"""
+    preparar(engine)
+    with engine.connect() as conn:
+        filas = conn.execute(text(
+            f"SELECT cliente_id FROM {TABLA} WHERE cliente_id <> :g AND n > 0 ORDER BY cliente_id"
+        ), {"g": GLOBAL}).all()
+    return [f[0] for f in filas]
@@ -0,0 +1,210 @@
+# ============================================================================
+# GRÁFICAS CACHEADAS POR CONTENIDO
+# ============================================================================
+# Streamlit vuelve a ejecutar la vista en cada interacción y, con st.pyplot,
+# cada histograma o heatmap se redibuja aunque los datos no hayan cambiado.
+# Aquí la clave de caché es un hash de los datos de entrada, los parámetros y
+# la función que dibuja: si ya se renderizó esa combinación se devuelven los
+# bytes PNG/SVG guardados; si no, se dibuja, se serializa y la figura se cierra
+# SIEMPRE (plt.close) para que no se acumulen figuras en el proceso.
+#
+# Las funciones de dibujo devuelven la figura sin mostrarla; mostrar() se
+# encarga de cachear y de pasar la imagen a st.image.
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from servicios import instrumentacion
+
+MAX_BYTES = int(float(os.getenv("GRAFICAS_CACHE_MB", "32")) * 1024 * 1024)
+DPI = int(os.getenv("GRAFICAS_DPI", "150"))
+
+_IMAGENES = OrderedDict()
+_LOCK = threading.Lock()
+_bytes_ocupados = 0
+ESTADISTICAS = {"aciertos": 0, "fallos": 0, "expulsiones": 0}
+
+
+# ---------------------------------------------------------------------------
+# Huella de los datos
+# ---------------------------------------------------------------------------
+def _actualizar_huella(h, valor):
+    if isinstance(valor, pd.DataFrame):
+        h.update(b"DF")
+        h.update(repr((list(valor.columns), list(valor.index.names), [str(t) for t in valor.dtypes])).encode())
+        h.update(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes())
+    elif isinstance(valor, pd.Series):
+        h.update(b"SR")
+        h.update(repr((valor.name, str(valor.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes())
+    elif isinstance(valor, np.ndarray):
+        h.update(b"NP")
+        h.update(repr((valor.dtype.str, valor.shape)).encode())
+        if valor.dtype == object:
+            h.update(repr(valor.tolist()).encode())
+        else:
+            h.update(np.ascontiguousarray(valor).tobytes())
+    elif isinstance(valor, (list, tuple)):
+        h.update(b"L%d" % len(valor))
+        for v in valor:
+            _actualizar_huella(h, v)
+    elif isinstance(valor, dict):
+        h.update(b"D%d" % len(valor))
+        for k in sorted(valor, key=repr):
+            h.update(repr(k).encode())
+            _actualizar_huella(h, valor[k])
+    else:
+        h.update(repr(valor).encode())
+
+
+def huella(dibujar, args=(), kwargs=None, formato="png"):
+    """Hash del contenido: función de dibujo + datos + parámetros + formato"""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{dibujar.__module__}.{dibujar.__qualname__}|{formato}|{DPI}".encode())
+    _actualizar_huella(h, list(args))
+    _actualizar_huella(h, kwargs or {})
+    return h.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Caché de imágenes
+# ---------------------------------------------------------------------------
+def _guardar(clave, datos):
+    global _bytes_ocupados
+    if len(datos) > MAX_BYTES:
+        return
+    with _LOCK:
+        anterior = _IMAGENES.pop(clave, None)
+        if anterior is not None:
+            _bytes_ocupados -= len(anterior)
+        _IMAGENES[clave] = datos
+        _bytes_ocupados += len(datos)
+        while _bytes_ocupados > MAX_BYTES and _IMAGENES:
+            _, expulsada = _IMAGENES.popitem(last=False)
+            _bytes_ocupados -= len(expulsada)
+            ESTADISTICAS["expulsiones"] += 1
+
+
+def renderizar(fig, formato="png"):
+    """Serializa la figura y la cierra aunque savefig falle"""
+    import matplotlib.pyplot as plt
+
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=formato, dpi=DPI, bbox_inches="tight")
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def _imagen(dibujar, args, kwargs, formato):
+    """(bytes, renderizada) de la gráfica, dibujándola solo si no está en caché"""
+    clave = huella(dibujar, args, kwargs, formato)
+    with _LOCK:
+        datos = _IMAGENES.get(clave)
+        if datos is not None:
+            _IMAGENES.move_to_end(clave)
+            ESTADISTICAS["aciertos"] += 1
+            return datos, False
+        ESTADISTICAS["fallos"] += 1
+    datos = renderizar(dibujar(*args, **kwargs), formato)
+    _guardar(clave, datos)
+    return datos, True
+
+
+def imagen_cacheada(dibujar, *args, formato="png", **kwargs):
+    """Bytes de la gráfica dibujar(*args, **kwargs); solo se dibuja si cambia el contenido"""
+    return _imagen(dibujar, args, kwargs, formato)[0]
+
+
+def mostrar(dibujar, *args, formato="png", **kwargs):
+    """Muestra en Streamlit la gráfica cacheada"""
+    import streamlit as st
+
+    inicio = time.perf_counter()
+    datos, renderizada = _imagen(dibujar, args, kwargs, formato)
+    st.image(datos.decode("utf-8") if formato == "svg" else datos, width="stretch")
+    instrumentacion.registrar_grafica(time.perf_counter() - inicio, renderizada)
+
+
+def mostrar_figura(fig):
+    """Para figuras que no vale la pena cachear: se muestran y se cierran"""
+    import matplotlib.pyplot as plt
+    import streamlit as st
+
+    inicio = time.perf_counter()
+    try:
+        st.pyplot(fig)
+    finally:
+        plt.close(fig)
+        instrumentacion.registrar_grafica(time.perf_counter() - inicio, True)
+
+
+def limpiar_cache():
+    global _bytes_ocupados
+    with _LOCK:
+        _IMAGENES.clear()
+        _bytes_ocupados = 0
+
+
+def bytes_en_cache():
+    return _bytes_ocupados
+
+
+# ---------------------------------------------------------------------------
+# Funciones de dibujo compartidas por los dashboards
+# ---------------------------------------------------------------------------
+def linea_tiempo(fechas, valores, titulo="", xlabel="", ylabel="", figsize=(10, 4)):
+    """Serie temporal con marcadores (evolución de pedidos)"""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=figsize)
+    ax.plot(fechas, valores, marker='o')
+    ax.set_title(titulo)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    return fig
+
+
+def histograma(valores, bins=10, color=None, edgecolor=None, alpha=None, titulo="", xlabel="", ylabel="Frecuencia"):
+    """Histograma simple de una serie numérica"""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    ax.hist(valores, bins=bins, color=color, edgecolor=edgecolor, alpha=alpha)
+    if titulo:
+        ax.set_title(titulo)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    return fig
+
+
+def histogramas(series, bins=15, colores=None, titulos=None, xlabels=None, ylabel="", figsize=(10, 4)):
+    """Varios histogramas lado a lado (uno por serie)"""
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, len(series), figsize=figsize, squeeze=False)
+    for i, (ax, valores) in enumerate(zip(axes[0], series)):
+        pd.Series(valores).hist(ax=ax, bins=bins, color=colores[i] if colores else None)
+        if titulos:
+            ax.set_title(titulos[i])
+        if xlabels:
+            ax.set_xlabel(xlabels[i])
+    axes[0][0].set_ylabel(ylabel)
+    return fig
+
+
+def heatmap(tabla, cmap="YlOrBr", annot=True, fmt=".1f", figsize=(10, 6)):
+    """Heatmap con anotaciones (seaborn)"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots(figsize=figsize)
+    sns.heatmap(tabla, cmap=cmap, annot=annot, fmt=fmt, ax=ax)
+    return fig
@@ -0,0 +1,357 @@
+# ============================================================================
+# IMPORTACIÓN MASIVA DE PEDIDOS DESDE CSV / XLSX
+# ============================================================================
+# Uso: python -m servicios.importacion ARCHIVO [--backend mysql|sqlite] [--bloque 50000]
+#                                      [--dia-primero] [--hoja NOMBRE] [--simular]
+#
+# Las consolidaciones históricas (p. ej. las filas "Consolidación histórica" de
+# datos_prueba/pedidos_cliente.csv) había que capturarlas una por una en
+# Registrar pedido. Aquí el archivo se lee por bloques (pd.read_csv con
+# chunksize; openpyxl en modo read_only para XLSX), cada bloque se limpia en
+# forma vectorizada y se inserta con un solo executemany, que mysql-connector
+# convierte en INSERT multi-fila. La memoria depende del tamaño del bloque, no
+# del archivo.
+#
+# Limpieza: codificación (UTF-8 o la ANSI/OEM que produzca más letras en
+# español), separador (, ; o tabulador), BOM, columnas vacías al final, filas en
+# blanco, decimales con coma y fechas ISO o con formato libre (--dia-primero
+# para 31/12/2024). Las filas sin cliente, producto, cantidad o fecha válidas
+# se rechazan y se informan con su número de línea.
+#
+# Cada bloque se inserta en su propia transacción junto con su aporte a
+# resumen_mensual_kg; si la importación se corta (archivo dañado, error de la
+# base...) lo ya importado queda consistente y ImportacionInterrumpida lleva
+# el progreso con cuántas filas entraron. El resultado también cuenta los
+# pedidos que ya existían en el rango de fechas del archivo (por el índice
+# (fecha, id), sin contar los recién importados): importar dos veces el mismo
+# archivo duplica el historial y la vista lo advierte. No se usa LOAD DATA
+# LOCAL INFILE: exige local_infile activado en el servidor y en el cliente, y
+# el INSERT multi-fila ya evita una ida y vuelta por fila.
+import argparse
+import contextlib
+import csv
+import io
+import os
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from servicios import resumen_mensual
+from servicios.cache_consultas import invalidar
+from servicios.escritura import insertar
+from servicios.repositorios.sqlite_local import CODIFICACIONES_ANSI, LETRAS_ESPANOL
+
+TABLA = "pedidos_cliente"
+COLUMNAS = ["cliente_id", "producto", "cantidad", "detalle", "fecha"]
+OBLIGATORIAS = ("cliente_id", "producto", "cantidad", "fecha")
+TAMANO_BLOQUE = 50_000
+MUESTRA_BYTES = 64 * 1024
+MAX_RECHAZOS_INFORMADOS = 20
+# Tope del conteo de pedidos previos en el rango del archivo (basta saber que hay)
+MAX_PREVIOS_CONTADOS = 1000
+# Negativo: KiB (PRAGMA cache_size de SQLite)
+CACHE_SQLITE_KB = -64 * 1024
+
+# Encabezados alternativos que se aceptan (en minúsculas)
+ALIAS = {
+    "cliente": "cliente_id", "id_cliente": "cliente_id", "usuario": "cliente_id",
+    "kg": "cantidad", "kilos": "cantidad", "cantidad_kg": "cantidad",
+    "fecha_pedido": "fecha", "observaciones": "detalle",
+}
+
+
+class ImportacionInterrumpida(Exception):
+    """La importación falló a mitad; `progreso` dice cuántas filas ya se confirmaron"""
+
+    def __init__(self, causa, progreso):
+        super().__init__(f"{type(causa).__name__}: {causa}")
+        self.causa = causa
+        self.progreso = progreso
+
+
+# ---------------------------------------------------------------------------
+# Lectura por bloques
+# ---------------------------------------------------------------------------
+def detectar_codificacion(muestra):
+    """UTF-8 si la muestra lo es (aunque termine a mitad de un carácter); si no, la ANSI más probable"""
+    try:
+        muestra.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError as e:
+        if e.start >= len(muestra) - 3 and e.reason == "unexpected end of data":
+            return "utf-8-sig"
+    return max(CODIFICACIONES_ANSI,
+               key=lambda c: sum(muestra.decode(c, errors="replace").count(ch) for ch in LETRAS_ESPANOL))
+
+
+def _separador(texto):
+    try:
+        return csv.Sniffer().sniff(texto.split("\n", 1)[0], delimiters=",;\t").delimiter
+    except csv.Error:
+        return ","
+
+
+def _abrir(origen):
+    """(archivo binario, nombre, tamaño en bytes) de una ruta o de un archivo subido"""
+    if isinstance(origen, (str, os.PathLike)):
+        return open(origen, "rb"), os.fspath(origen), os.path.getsize(origen)
+    origen.seek(0, io.SEEK_END)
+    tamano = origen.tell()
+    origen.seek(0)
+    return origen, getattr(origen, "name", ""), tamano
+
+
+def _bloques_csv(archivo, tamano, tamano_bloque):
+    muestra = archivo.read(MUESTRA_BYTES)
+    archivo.seek(0)
+    codificacion = detectar_codificacion(muestra)
+    lector = pd.read_csv(archivo, encoding=codificacion, encoding_errors="replace",
+                         sep=_separador(muestra.decode(codificacion, errors="replace")),
+                         dtype=str, chunksize=tamano_bloque, skip_blank_lines=False)
+    for df in lector:
+        yield df, (archivo.tell() / tamano if tamano else 1.0)
+
+
+def _bloques_xlsx(archivo, tamano_bloque, hoja=None):
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        ws = libro[hoja] if hoja else libro.worksheets[0]
+        total = ws.max_row or 0
+        filas = ws.iter_rows(values_only=True)
+        encabezado = [("" if c is None else str(c)) for c in next(filas, ())]
+        bloque, inicio = [], 0
+        for fila in filas:
+            bloque.append(fila[:len(encabezado)])
+            if len(bloque) == tamano_bloque:
+                yield pd.DataFrame(bloque, columns=encabezado, index=range(inicio, inicio + len(bloque))), \
+                    ((inicio + len(bloque)) / total if total else 0.0)
+                inicio += len(bloque)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=encabezado, index=range(inicio, inicio + len(bloque))), 1.0
+    finally:
+        libro.close()
+
+
+def leer_bloques(origen, tamano_bloque=TAMANO_BLOQUE, hoja=None):
+    """Genera (DataFrame crudo, fracción leída) por bloque; el índice es la línea tras el encabezado (0 = primera)"""
+    archivo, nombre, tamano = _abrir(origen)
+    try:
+        if nombre.lower().endswith((".xlsx", ".xlsm")):
+            yield from _bloques_xlsx(archivo, tamano_bloque, hoja)
+        else:
+            yield from _bloques_csv(archivo, tamano, tamano_bloque)
+    finally:
+        if archivo is not origen:
+            archivo.close()
+
+
+# ---------------------------------------------------------------------------
+# Normalización
+# ---------------------------------------------------------------------------
+def _texto(serie):
+    serie = serie.astype("string").str.strip()
+    return serie.mask(serie == "")
+
+
+def _fechas(serie, dia_primero=False):
+    """ISO en forma vectorizada; lo que no lo sea, con formato libre"""
+    fechas = pd.to_datetime(serie, format="ISO8601", errors="coerce")
+    resto = fechas.isna() & serie.notna()
+    if resto.any():
+        fechas[resto] = pd.to_datetime(serie[resto], format="mixed", dayfirst=dia_primero, errors="coerce")
+    return fechas
+
+
+def normalizar(df, dia_primero=False):
+    """(pedidos válidos con COLUMNAS, índice de las filas rechazadas)"""
+    df = df.copy()
+    df.columns = [str(c).lstrip("\ufeff").strip().lower() for c in df.columns]
+    df = df.loc[:, [c for c in df.columns if c and not c.startswith("unnamed")]].rename(columns=ALIAS)
+    faltan = [c for c in OBLIGATORIAS if c not in df.columns]
+    if faltan:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltan)} (hay: {', '.join(df.columns)})")
+    df = df.dropna(how="all")
+
+    pedidos = pd.DataFrame(index=df.index)
+    pedidos["cliente_id"] = _texto(df["cliente_id"])
+    pedidos["producto"] = _texto(df["producto"])
+    pedidos["cantidad"] = pd.to_numeric(_texto(df["cantidad"]).str.replace(",", ".", regex=False), errors="coerce")
+    pedidos["detalle"] = _texto(df["detalle"]) if "detalle" in df.columns else pd.NA
+    pedidos["fecha"] = _fechas(_texto(df["fecha"]), dia_primero)
+
+    valido = (pedidos["cliente_id"].notna() & pedidos["producto"].notna()
+              & pedidos["cantidad"].notna() & pedidos["fecha"].notna())
+    return pedidos[valido.to_numpy()], df.index[~valido.to_numpy()]
+
+
+# ---------------------------------------------------------------------------
+# Inserción
+# ---------------------------------------------------------------------------
+def _filas(pedidos):
+    """Tuplas con tipos de Python en el orden de COLUMNAS"""
+    columnas = [pedidos[c].astype(object).where(pedidos[c].notna(), None).tolist()
+                for c in ("cliente_id", "producto", "cantidad", "detalle")]
+    columnas.append(list(pedidos["fecha"].array.to_pydatetime()))
+    return list(zip(*columnas))
+
+
+def insertar_bloque(conn, pedidos):
+    """executemany de un bloque normalizado dentro de la transacción de conn"""
+    marca = {"qmark": "?", "format": "%s", "pyformat": "%s"}.get(conn.dialect.paramstyle)
+    if marca is None:
+        return insertar(conn, TABLA, pedidos[COLUMNAS])
+    sql = f"INSERT INTO {TABLA} ({', '.join(COLUMNAS)}) VALUES ({', '.join([marca] * len(COLUMNAS))})"
+    # En orden de fecha el índice (fecha, id) crece por el final en vez de partirse al azar
+    filas = _filas(pedidos.sort_values("fecha", kind="stable"))
+    conn.exec_driver_sql(sql, filas)
+    return len(filas)
+
+
+def _ultimo_id(engine):
+    with engine.connect() as conn:
+        return int(conn.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {TABLA}")).scalar())
+
+
+def contar_previos(engine, fecha_min, fecha_max, hasta_id, tope=MAX_PREVIOS_CONTADOS):
+    """Pedidos con id <= hasta_id y fecha en [fecha_min, fecha_max], hasta `tope`"""
+    if fecha_min is None:
+        return 0
+    with engine.connect() as conn:
+        return int(conn.execute(text(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {TABLA} WHERE fecha >= :ini AND fecha <= :fin "
+            f"AND id <= :hasta LIMIT {int(tope)}) t"
+        ), {"ini": fecha_min, "fin": fecha_max, "hasta": hasta_id}).scalar())
+
+
+@contextlib.contextmanager
+def _conexion(engine, simular):
+    """Una conexión para toda la importación (None si solo se valida).
+
+    En SQLite se agranda la caché de páginas mientras dura: con los índices de
+    pedidos_cliente cada bloque toca páginas dispersas de cuatro árboles.
+    """
+    if simular:
+        yield None
+        return
+    with engine.connect() as conn:
+        if conn.dialect.name != "sqlite":
+            yield conn
+            return
+        anterior = conn.exec_driver_sql("PRAGMA cache_size").scalar()
+        conn.exec_driver_sql(f"PRAGMA cache_size={CACHE_SQLITE_KB}")
+        conn.commit()
+        try:
+            yield conn
+        finally:
+            conn.exec_driver_sql(f"PRAGMA cache_size={int(anterior)}")
+            conn.commit()
+
+
+def _avanzar(progreso, crudo, pedidos, rechazadas, fraccion, inicio):
+    """Suma un bloque al progreso"""
+    progreso["leidas"] += len(crudo)
+    progreso["importadas"] += len(pedidos)
+    progreso["rechazadas"] += len(rechazadas)
+    libres = MAX_RECHAZOS_INFORMADOS - len(progreso["lineas_rechazadas"])
+    # +2: el encabezado es la línea 1 y el índice empieza en 0
+    progreso["lineas_rechazadas"] += [int(i) + 2 for i in rechazadas[:max(libres, 0)]]
+    if len(pedidos):
+        minimo, maximo = pedidos["fecha"].min().to_pydatetime(), pedidos["fecha"].max().to_pydatetime()
+        progreso["fecha_min"] = min(minimo, progreso["fecha_min"] or minimo)
+        progreso["fecha_max"] = max(maximo, progreso["fecha_max"] or maximo)
+    progreso["fraccion"] = min(fraccion, 1.0)
+    progreso["segundos"] = time.perf_counter() - inicio
+    progreso["filas_por_segundo"] = progreso["leidas"] / progreso["segundos"] if progreso["segundos"] else 0.0
+
+
+def importar_pedidos(engine, origen, tamano_bloque=TAMANO_BLOQUE, dia_primero=False, hoja=None,
+                     simular=False, al_progreso=None):
+    """Importa un CSV/XLSX (ruta o archivo abierto) a pedidos_cliente.
+
+    al_progreso(progreso) se llama tras cada bloque con el mismo dict que se
+    devuelve al final: leidas, importadas, rechazadas, lineas_rechazadas
+    (número de línea del archivo, hasta MAX_RECHAZOS_INFORMADOS), fraccion,
+    segundos, filas_por_segundo, fecha_min y fecha_max del archivo; al final
+    además previos_en_rango (pedidos que ya había en esas fechas, hasta
+    MAX_PREVIOS_CONTADOS). Con simular=True solo valida. Cualquier error se
+    relanza como ImportacionInterrumpida con el progreso hasta ese momento.
+    """
+    progreso = {"leidas": 0, "importadas": 0, "rechazadas": 0, "lineas_rechazadas": [],
+                "fraccion": 0.0, "segundos": 0.0, "filas_por_segundo": 0.0,
+                "fecha_min": None, "fecha_max": None, "previos_en_rango": 0}
+    inicio = time.perf_counter()
+    try:
+        # Los pedidos previos se cuentan hasta este id: los que se importen no cuentan
+        hasta_id = _ultimo_id(engine)
+        if not simular:
+            resumen_mensual.preparar(engine)
+        try:
+            with _conexion(engine, simular) as conn:
+                for crudo, fraccion in leer_bloques(origen, tamano_bloque, hoja):
+                    pedidos, rechazadas = normalizar(crudo, dia_primero)
+                    if len(pedidos) and conn is not None:
+                        with conn.begin():
+                            insertar_bloque(conn, pedidos)
+                            resumen_mensual.registrar_pedidos(conn, pedidos)
+                    _avanzar(progreso, crudo, pedidos, rechazadas, fraccion, inicio)
+                    if al_progreso is not None:
+                        al_progreso(dict(progreso))
+        finally:
+            if progreso["importadas"] and not simular:
+                invalidar(TABLA, resumen_mensual.TABLA)
+        progreso["previos_en_rango"] = contar_previos(engine, progreso["fecha_min"], progreso["fecha_max"], hasta_id)
+    except Exception as e:
+        raise ImportacionInterrumpida(e, dict(progreso)) from e
+    progreso["fraccion"] = 1.0
+    return progreso
+
+
+def main():
+    from servicios.conexion import BACKENDS_SQL, backend_configurado, obtener_engine
+
+    parser = argparse.ArgumentParser(description="Importa pedidos desde un CSV o XLSX")
+    parser.add_argument("archivo")
+    parser.add_argument("--backend", choices=BACKENDS_SQL, default=None)
+    parser.add_argument("--bloque", type=int, default=TAMANO_BLOQUE, help="filas por bloque y transacción")
+    parser.add_argument("--dia-primero", action="store_true", help="fechas como 31/12/2024")
+    parser.add_argument("--hoja", default=None, help="hoja del XLSX (por defecto la primera)")
+    parser.add_argument("--simular", action="store_true", help="solo valida, no inserta")
+    args = parser.parse_args()
+
+    engine = obtener_engine(args.backend or backend_configurado())
+
+    def mostrar(p):
+        print(f"  {p['fraccion']:6.1%}  {p['importadas']:>10,d} importadas  {p['rechazadas']:>8,d} rechazadas  "
+              f"{p['filas_por_segundo']:>10,.0f} filas/s")
+
+    try:
+        r = importar_pedidos(engine, args.archivo, args.bloque, args.dia_primero, args.hoja, args.simular, mostrar)
+    except ImportacionInterrumpida as e:
+        print(f"Error: {e}")
+        if e.progreso["importadas"] and not args.simular:
+            print(f"La importación se detuvo a la mitad: {e.progreso['importadas']:,d} filas ya quedaron importadas.")
+        raise SystemExit(1)
+    accion = "validadas" if args.simular else "importadas"
+    print(f"{r['importadas']:,d} filas {accion}, {r['rechazadas']:,d} rechazadas de {r['leidas']:,d} "
+          f"en {r['segundos']:.2f} s ({r['filas_por_segundo']:,.0f} filas/s)")
+    if r["lineas_rechazadas"]:
+        print(f"Líneas rechazadas (primeras {len(r['lineas_rechazadas'])}): "
+              f"{', '.join(map(str, r['lineas_rechazadas']))}")
+    if r["previos_en_rango"]:
+        print(f"Aviso: {texto_previos(r)}")
+
+
+def texto_previos(resultado):
+    """Aviso de posible duplicado si ya había pedidos en el rango de fechas del archivo"""
+    n = resultado["previos_en_rango"]
+    cantidad = f"más de {MAX_PREVIOS_CONTADOS - 1:,d}" if n >= MAX_PREVIOS_CONTADOS else f"{n:,d}"
+    return (f"ya había {cantidad} pedidos entre {resultado['fecha_min']:%Y-%m-%d} y {resultado['fecha_max']:%Y-%m-%d}; "
+            "si este archivo ya se había importado, esos pedidos quedan duplicados.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# ============================================================================
+# INSTRUMENTACIÓN DE CONSULTAS (número, filas, tiempo en SQL y memoria)
+# ============================================================================
+# medir() abre una ventana de medición: mientras está activa, cada sentencia
+# que ejecuta cualquier engine de SQLAlchemy suma una consulta, su tiempo en el
+# driver (ejecución y lectura de filas) y las filas que el código realmente lee
+# del cursor; servicios.graficas suma además el tiempo de cada gráfica
+# mostrada. Fuera de una ventana los eventos solo comprueban una lista vacía.
+#
+# Las filas se cuentan envolviendo el cursor DBAPI que usará el resultado
+# (context.cursor) en after_cursor_execute, así funciona igual con
+# mysql-connector que con sqlite3, donde rowcount de un SELECT es -1.
+import re
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+_ACTIVAS = []
+_LOCK = threading.Lock()
+# Mediciones de otro hilo a las que este hilo también suma (ver adoptar)
+_ADOPTADAS = threading.local()
+# Varios hilos pueden sumar a la misma medición a la vez
+_LOCK_CONTEO = threading.Lock()
+_REGISTRADO = False
+_ESPACIOS = re.compile(r"\s+")
+LARGO_SENTENCIA = 80
+
+
+class Medicion:
+    """Totales acumulados durante una ventana de medir()"""
+
+    def __init__(self, hilo=None):
+        self.hilo = hilo
+        self.consultas = 0
+        self.filas = 0
+        self.segundos_sql = 0.0
+        self.segundos = 0.0
+        self.memoria_pico = None
+        self.graficas = 0
+        self.graficas_renderizadas = 0
+        self.segundos_graficas = 0.0
+        self.sentencias = Counter()
+        self.tiempo_sentencias = Counter()
+
+    def como_dict(self):
+        return {
+            "segundos": round(self.segundos, 6),
+            "segundos_sql": round(self.segundos_sql, 6),
+            "consultas": self.consultas,
+            "filas": self.filas,
+            "memoria_pico": self.memoria_pico,
+            "graficas": self.graficas,
+            "graficas_renderizadas": self.graficas_renderizadas,
+            "segundos_graficas": round(self.segundos_graficas, 6),
+        }
+
+    def sentencias_mas_lentas(self, n=5):
+        """[(sentencia, ejecuciones, segundos)] ordenadas por tiempo total"""
+        return [(s, self.sentencias[s], t) for s, t in self.tiempo_sentencias.most_common(n)]
+
+    def __repr__(self):
+        return (f"Medicion({self.segundos * 1000:.1f} ms, {self.consultas} consultas, "
+                f"{self.filas} filas, sql {self.segundos_sql * 1000:.1f} ms)")
+
+
+class _CursorContador:
+    """Cursor DBAPI que suma a las mediciones las filas leídas y el tiempo de lectura"""
+
+    def __init__(self, cursor, mediciones, clave):
+        self._cursor = cursor
+        self._mediciones = mediciones
+        self._clave = clave
+
+    def _leer(self, metodo, *args):
+        inicio = time.perf_counter()
+        resultado = metodo(*args)
+        transcurrido = time.perf_counter() - inicio
+        n = (resultado is not None) if metodo == self._cursor.fetchone else len(resultado)
+        with _LOCK_CONTEO:
+            for m in self._mediciones:
+                m.filas += n
+                m.segundos_sql += transcurrido
+                m.tiempo_sentencias[self._clave] += transcurrido
+        return resultado
+
+    def fetchone(self):
+        return self._leer(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._leer(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._leer(self._cursor.fetchall)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+def _mediciones_del_hilo():
+    hilo = threading.get_ident()
+    propias = [m for m in _ACTIVAS if m.hilo is None or m.hilo == hilo]
+    adoptadas = [m for m in getattr(_ADOPTADAS, "lista", ()) if m not in propias]
+    return propias + adoptadas
+
+
+def mediciones_actuales():
+    """Mediciones activas que cuentan lo que hace el hilo actual"""
+    return _mediciones_del_hilo() if _ACTIVAS else []
+
+
+@contextmanager
+def adoptar(mediciones):
+    """Hace que el hilo actual (p. ej. un hilo de servicios.carga_paralela) sume
+    también a mediciones abiertas en otro hilo"""
+    anteriores = getattr(_ADOPTADAS, "lista", [])
+    _ADOPTADAS.lista = anteriores + list(mediciones)
+    try:
+        yield
+    finally:
+        _ADOPTADAS.lista = anteriores
+
+
+def _antes(conn, cursor, sentencia, parametros, contexto, executemany):
+    # El inicio va en el contexto de ejecución: si la sentencia falla se descarta con él
+    if _ACTIVAS and contexto is not None:
+        contexto._inicio = time.perf_counter()
+
+
+def _despues(conn, cursor, sentencia, parametros, contexto, executemany):
+    if not _ACTIVAS:
+        return
+    inicio = getattr(contexto, "_inicio", None)
+    # Sin inicio (la medición empezó durante la sentencia) no se le atribuye tiempo
+    transcurrido = time.perf_counter() - inicio if inicio is not None else 0.0
+    mediciones = _mediciones_del_hilo()
+    if not mediciones:
+        return
+    clave = _ESPACIOS.sub(" ", sentencia).strip()[:LARGO_SENTENCIA]
+    with _LOCK_CONTEO:
+        for m in mediciones:
+            m.consultas += 1
+            m.segundos_sql += transcurrido
+            m.sentencias[clave] += 1
+            m.tiempo_sentencias[clave] += transcurrido
+    if contexto is not None and cursor.description is not None:
+        contexto.cursor = _CursorContador(cursor, mediciones, clave)
+
+
+def registrar_grafica(segundos, renderizada):
+    """Suma una gráfica mostrada (renderizada=False si salió de la caché)"""
+    if not _ACTIVAS:
+        return
+    with _LOCK_CONTEO:
+        for m in _mediciones_del_hilo():
+            m.graficas += 1
+            m.graficas_renderizadas += int(renderizada)
+            m.segundos_graficas += segundos
+
+
+def _registrar():
+    # sqlalchemy se importa aquí: servicios.graficas usa este módulo y el
+    # dashboard Excel no necesita cargarlo al arrancar
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    global _REGISTRADO
+    with _LOCK:
+        if not _REGISTRADO:
+            event.listen(Engine, "before_cursor_execute", _antes)
+            event.listen(Engine, "after_cursor_execute", _despues)
+            _REGISTRADO = True
+
+
+@contextmanager
+def medir(memoria=False, todos_los_hilos=False):
+    """Mide el bloque: tiempo total, consultas, filas leídas y (opcional) pico de memoria.
+
+    Por defecto solo cuenta las consultas del hilo actual (cada sesión de
+    Streamlit corre en su propio hilo); todos_los_hilos=True incluye también
+    las de hilos auxiliares. memoria=True usa tracemalloc, que ralentiza el
+    bloque: conviene medir tiempo y memoria en pasadas separadas.
+    """
+    _registrar()
+    medicion = Medicion(None if todos_los_hilos else threading.get_ident())
+    iniciar_traza = memoria and not tracemalloc.is_tracing()
+    if iniciar_traza:
+        tracemalloc.start()
+    if memoria:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    with _LOCK:
+        _ACTIVAS.append(medicion)
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    finally:
+        medicion.segundos = time.perf_counter() - inicio
+        with _LOCK:
+            _ACTIVAS.remove(medicion)
+        if memoria:
+            medicion.memoria_pico = max(0, tracemalloc.get_traced_memory()[1] - base)
+            if iniciar_traza:
+                tracemalloc.stop()
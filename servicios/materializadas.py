@@ -0,0 +1,48 @@
+# ============================================================================
+# TABLAS MATERIALIZADAS: CREACIÓN Y PRIMER LLENADO
+# ============================================================================
+# resumen_mensual, exactitud_predicciones, cuentas_clientes y estado_inventario
+# guardan agregados que se actualizan en la misma transacción que el cambio
+# que los afecta. Sus tablas se crean y se llenan con reconstruir() la primera
+# vez que un proceso las usa, y eso se hace con preparar() en una transacción
+# propia, antes de abrir la de escritura:
+# - el DDL de MySQL hace commit implícito de lo que hubiera pendiente;
+# - en SQLite, crear la tabla dentro de una escritura obligaría a tomar el
+#   candado del proceso con la base ya bloqueada: otro hilo que espera ese
+#   candado con su propia escritura abierta acabaría en "database is locked".
+import threading
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from servicios.cache_consultas import invalidar
+
+_PREPARADAS = set()
+_LOCK = threading.Lock()
+
+
+def clave_cliente(valor):
+    """cliente_id como se guarda en las tablas por cliente (sin cliente → "")"""
+    return "" if valor is None or pd.isna(valor) else str(valor)
+
+
+def preparar(engine, tablas, ddl, reconstruir):
+    """Crea `tablas` (sentencias de `ddl`) y las llena con reconstruir(conn) si falta alguna.
+
+    Se comprueba una vez por proceso y engine; la caché de las tablas se
+    invalida después del commit.
+    """
+    clave = (str(engine.url), tuple(tablas))
+    if clave in _PREPARADAS:
+        return
+    with _LOCK:
+        if clave in _PREPARADAS:
+            return
+        with engine.begin() as conn:
+            inspector = inspect(conn)
+            if not all(inspector.has_table(t) for t in tablas):
+                for sentencia in ((ddl,) if isinstance(ddl, str) else ddl):
+                    conn.execute(text(sentencia))
+                reconstruir(conn)
+        invalidar(*tablas)
+        _PREPARADAS.add(clave)
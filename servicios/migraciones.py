@@ -0,0 +1,336 @@
+# ============================================================================
+# MIGRACIONES VERSIONADAS DEL ESQUEMA (ÍNDICES Y COLUMNAS TIPADAS)
+# ============================================================================
+# Uso: python -m servicios.migraciones [--backend mysql|sqlite] [--estado]
+#
+# Las consultas frecuentes (pedidos de un cliente, pagos por fecha, último
+# inventario, predicción de una fecha, historial de inventario, páginas por
+# fecha e id...) necesitan índices que la aplicación no garantizaba. Cada
+# migración tiene un número de versión y una lista de pasos; la tabla
+# version_esquema registra las aplicadas y migrar() ejecuta solo las
+# pendientes, en orden.
+#
+# Los pasos son idempotentes (comprueban el esquema antes de tocarlo), así que
+# si una migración se corta a la mitad basta con volver a lanzarla; en MySQL
+# el DDL hace commit implícito y no hay otra forma de reanudar. Por eso, antes
+# de tocar nada, se revisan los datos de todos los pasos de la migración: si
+# una columna de texto tiene valores que no son fechas, se rechaza entera.
+# Las tablas que no existen se omiten.
+#
+# Una columna solo cambia de tipo si es de otra familia (texto -> fecha); las
+# claves de texto se dejan como están (nunca se acorta una longitud) y en
+# MySQL las de tipo TEXT se indexan por prefijo.
+#
+# La base SQLite local se migra al crear su engine; en MySQL se lanza a mano
+# (o en el despliegue) con este módulo, para no abrir una conexión ni hacer
+# DDL al importar los dashboards.
+import argparse
+import datetime
+import re
+import threading
+
+from sqlalchemy import inspect, text
+
+TABLA_VERSION = "version_esquema"
+
+DDL_VERSION = f"""
+CREATE TABLE IF NOT EXISTS {TABLA_VERSION} (
+    version INT NOT NULL,
+    descripcion VARCHAR(200),
+    aplicada DATETIME,
+    PRIMARY KEY (version)
+)
+"""
+
+# Familias de tipos (por el nombre del tipo, sin longitud)
+_FAMILIAS = {
+    "texto": ("VARCHAR", "CHAR", "NVARCHAR", "NCHAR", "TEXT", "TINYTEXT", "MEDIUMTEXT", "LONGTEXT"),
+    "fecha": ("DATETIME", "TIMESTAMP", "DATE"),
+}
+# Tipos de MySQL que solo se pueden indexar con una longitud de prefijo
+_SIN_LONGITUD = ("TEXT", "TINYTEXT", "MEDIUMTEXT", "LONGTEXT", "BLOB", "TINYBLOB", "MEDIUMBLOB", "LONGBLOB")
+LONGITUD_PREFIJO = 100
+
+# Fechas que MySQL convierte sin pérdida al cambiar la columna a DATETIME
+_PATRON_FECHA = r"^[0-9]{4}-[0-9]{1,2}-[0-9]{1,2}([ T][0-9]{1,2}:[0-9]{1,2}(:[0-9]{1,2}([.][0-9]{1,6})?)?)?$"
+
+_MIGRADOS = set()
+_LOCK = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Pasos
+# ---------------------------------------------------------------------------
+class MigracionRechazada(Exception):
+    """Los datos actuales no permiten aplicar un paso sin perder información"""
+
+
+def _tabla_real(conn, tabla):
+    """Nombre de la tabla tal como existe (MySQL en Windows puede cambiar mayúsculas) o None"""
+    return next((t for t in inspect(conn).get_table_names() if t.lower() == tabla.lower()), None)
+
+
+def _columna(conn, tabla, columna):
+    """Descripción de la columna según el inspector de SQLAlchemy, o None"""
+    return next((c for c in inspect(conn).get_columns(tabla) if c["name"].lower() == columna.lower()), None)
+
+
+def _nombre_tipo(tipo):
+    return str(tipo).upper().split("(")[0].split()[0]
+
+
+def _familia(tipo):
+    nombre = _nombre_tipo(tipo)
+    return next((f for f, nombres in _FAMILIAS.items() if nombre in nombres), nombre)
+
+
+def indice(nombre, tabla, *columnas):
+    """Paso: CREATE INDEX nombre ON tabla (columnas) si no hay ya uno con esas columnas"""
+    def paso(conn):
+        real = _tabla_real(conn, tabla)
+        if real is None:
+            return False
+        inspector = inspect(conn)
+        existentes = [tuple(i["column_names"]) for i in inspector.get_indexes(real)]
+        existentes.append(tuple(inspector.get_pk_constraint(real).get("constrained_columns") or ()))
+        # Un índice existente que empieza por las mismas columnas ya sirve
+        if nombre in {i["name"] for i in inspector.get_indexes(real)} or any(
+                e[:len(columnas)] == columnas for e in existentes):
+            return False
+        partes = []
+        for col in columnas:
+            actual = _columna(conn, real, col)
+            if actual is None:
+                raise MigracionRechazada(f"{real} no tiene la columna {col} para el índice {nombre}")
+            sin_longitud = conn.dialect.name == "mysql" and _nombre_tipo(actual["type"]) in _SIN_LONGITUD
+            partes.append(f"{actual['name']}({LONGITUD_PREFIJO})" if sin_longitud else actual["name"])
+        conn.execute(text(f"CREATE INDEX {nombre} ON {real} ({', '.join(partes)})"))
+        return True
+
+    paso.descripcion = f"índice {nombre} en {tabla} ({', '.join(columnas)})"
+    return paso
+
+
+def columna_id(tabla):
+    """Paso (solo MySQL): agrega un id autoincremental si la tabla no tiene columna id.
+
+    Las páginas por (fecha, id) lo usan para desempatar; las filas existentes
+    se numeran en el orden en que las guarda la tabla. En SQLite las tablas
+    del esquema local ya lo tienen y una columna autoincremental no se puede
+    agregar después.
+    """
+    def paso(conn):
+        if conn.dialect.name != "mysql":
+            return False
+        real = _tabla_real(conn, tabla)
+        if real is None or _columna(conn, real, "id") is not None:
+            return False
+        conn.execute(text(f"ALTER TABLE {real} ADD COLUMN id BIGINT NOT NULL AUTO_INCREMENT, "
+                          f"ADD UNIQUE KEY uq_{real.lower()}_id (id)"))
+        return True
+
+    paso.descripcion = f"columna id en {tabla}"
+    return paso
+
+
+def _defecto(columna):
+    """Valor DEFAULT de una columna de texto sin comillas; None si no tiene o es vacío"""
+    defecto = columna.get("default")
+    if defecto is None:
+        return None
+    defecto = str(defecto).strip()
+    if len(defecto) >= 2 and defecto[0] == defecto[-1] == "'":
+        defecto = defecto[1:-1].replace("''", "'")
+    return None if defecto.strip() in ("", "NULL") else defecto
+
+
+def _literal(valor):
+    return "'" + str(valor).replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def columna_tipada(tabla, columna, tipo):
+    """Paso (solo MySQL): cambia a `tipo` una columna de texto si `tipo` es de otra familia.
+
+    Hoy solo se admite texto -> fecha. Antes de cambiarla, comprobar() cuenta
+    los valores que no son fechas AAAA-MM-DD[ HH:MM[:SS]] y rechaza la
+    migración si hay alguno; los vacíos pasan a NULL si la columna lo admite.
+    Se conservan NOT NULL, DEFAULT y COMMENT. SQLite no tiene tipos estrictos
+    y su esquema local ya los declara.
+    """
+    if _familia(tipo) != "fecha":
+        raise ValueError(f"columna_tipada solo convierte texto a fecha, no a {tipo}")
+
+    def _pendiente(conn):
+        """(tabla real, columna) si hay que convertirla; None si no aplica"""
+        if conn.dialect.name != "mysql":
+            return None
+        real = _tabla_real(conn, tabla)
+        actual = _columna(conn, real, columna) if real is not None else None
+        if actual is None or _familia(actual["type"]) != "texto":
+            return None
+        return real, actual
+
+    def comprobar(conn):
+        pendiente = _pendiente(conn)
+        if pendiente is None:
+            return
+        real, actual = pendiente
+        col = actual["name"]
+        defecto = _defecto(actual)
+        if defecto is not None and not re.match(_PATRON_FECHA, defecto):
+            raise MigracionRechazada(f"{real}.{col}: el DEFAULT {defecto!r} no es una fecha")
+        vacio = f"TRIM({col}) = ''"
+        invalido = (f"{col} IS NOT NULL AND NOT ({vacio} OR (TRIM({col}) REGEXP :patron "
+                    f"AND STR_TO_DATE(TRIM({col}), :formato) IS NOT NULL))")
+        if not actual["nullable"]:
+            invalido = f"({invalido}) OR ({col} IS NOT NULL AND {vacio})"
+        params = {"patron": _PATRON_FECHA, "formato": "%Y-%m-%d"}
+        total = conn.execute(text(f"SELECT COUNT(*) FROM {real} WHERE {invalido}"), params).scalar()
+        if total:
+            ejemplos = [v for (v,) in conn.execute(
+                text(f"SELECT DISTINCT {col} FROM {real} WHERE {invalido} LIMIT 3"), params)]
+            raise MigracionRechazada(
+                f"{real}.{col}: {total} valor(es) no son fechas AAAA-MM-DD (p. ej. {ejemplos}); "
+                "corrígelos antes de convertir la columna a DATETIME"
+            )
+
+    def paso(conn):
+        pendiente = _pendiente(conn)
+        if pendiente is None:
+            return False
+        real, actual = pendiente
+        col = actual["name"]
+        comprobar(conn)
+        definicion = tipo
+        if actual["nullable"]:
+            conn.execute(text(f"UPDATE {real} SET {col} = NULL WHERE TRIM({col}) = ''"))
+        else:
+            definicion += " NOT NULL"
+        if _defecto(actual) is not None:
+            definicion += f" DEFAULT {_literal(_defecto(actual))}"
+        if actual.get("comment"):
+            definicion += f" COMMENT {_literal(actual['comment'])}"
+        # Sin text(): el DEFAULT o el COMMENT pueden tener ':' que no son parámetros
+        conn.exec_driver_sql(f"ALTER TABLE {real} MODIFY {col} {definicion}")
+        return True
+
+    paso.comprobar = comprobar
+    paso.descripcion = f"columna {tabla}.{columna} como {tipo}"
+    return paso
+
+
+# ---------------------------------------------------------------------------
+# Migraciones (nunca se editan las ya publicadas: se agrega una nueva)
+# ---------------------------------------------------------------------------
+MIGRACIONES = [
+    (1, "Fechas con tipo DATETIME (indexables y comparables en MySQL)", [
+        columna_tipada("pedidos_cliente", "fecha", "DATETIME"),
+        columna_tipada("pedidos_pendientes", "fecha", "DATETIME"),
+        columna_tipada("log_pedidos_entregados", "fecha_entrega", "DATETIME"),
+        columna_tipada("pagos_cliente", "fecha_pago", "DATETIME"),
+        columna_tipada("inventario_cafe", "fecha_actualizacion", "DATETIME"),
+        columna_tipada("control_inventario_cafe", "fecha_cambio", "DATETIME"),
+        columna_tipada("predicciones_cafe_365_dias", "Fecha", "DATETIME"),
+        columna_tipada("comparacion_prediccion_vs_real", "fecha_real", "DATETIME"),
+        columna_tipada("log_eliminaciones_pedidos", "fecha_eliminacion", "DATETIME"),
+    ]),
+    (2, "Índices de las consultas frecuentes", [
+        # El desempate de las páginas por fecha necesita un id en las tablas históricas
+        # (log_eliminaciones_pedidos ya trae el id del pedido eliminado)
+        columna_id("log_pedidos_entregados"),
+        columna_id("pagos_cliente"),
+        columna_id("control_inventario_cafe"),
+        columna_id("comparacion_prediccion_vs_real"),
+        # Páginas de pedidos (fecha, id) y filtros por cliente o producto
+        indice("idx_pedidos_fecha_id", "pedidos_cliente", "fecha", "id"),
+        indice("idx_pedidos_cliente_fecha", "pedidos_cliente", "cliente_id", "fecha", "id"),
+        indice("idx_pedidos_producto_fecha", "pedidos_cliente", "producto", "fecha", "id"),
+        indice("idx_pendientes_fecha", "pedidos_pendientes", "fecha"),
+        indice("idx_entregados_cliente_fecha", "log_pedidos_entregados", "cliente_id", "fecha_entrega", "id"),
+        indice("idx_pagos_cliente_fecha", "pagos_cliente", "cliente_id", "fecha_pago"),
+        indice("idx_inventario_fecha", "inventario_cafe", "fecha_actualizacion"),
+        indice("idx_control_fecha", "control_inventario_cafe", "fecha_cambio"),
+        indice("idx_predicciones_fecha", "predicciones_cafe_365_dias", "Fecha"),
+        indice("idx_comparaciones_fecha_id", "comparacion_prediccion_vs_real", "fecha_real", "id"),
+        indice("idx_comparaciones_cliente_fecha", "comparacion_prediccion_vs_real", "cliente_id", "fecha_real", "id"),
+        indice("idx_eliminaciones_fecha", "log_eliminaciones_pedidos", "fecha_eliminacion"),
+        indice("idx_usuarios_rol", "usuarios", "rol"),
+    ]),
+    (3, "Índices de las tablas históricas paginadas", [
+        indice("idx_control_fecha_id", "control_inventario_cafe", "fecha_cambio", "id"),
+        indice("idx_eliminaciones_fecha_id", "log_eliminaciones_pedidos", "fecha_eliminacion", "id"),
+        indice("idx_pagos_cliente_fecha_id", "pagos_cliente", "cliente_id", "fecha_pago", "id"),
+    ]),
+    (4, "Índice del login por nombre de usuario", [
+        indice("idx_usuarios_usuario", "usuarios", "usuario"),
+    ]),
+]
+
+VERSION_ACTUAL = max(v for v, _, _ in MIGRACIONES)
+
+
+# ---------------------------------------------------------------------------
+# Ejecución
+# ---------------------------------------------------------------------------
+def versiones_aplicadas(conn):
+    if _tabla_real(conn, TABLA_VERSION) is None:
+        return set()
+    return {int(v) for (v,) in conn.execute(text(f"SELECT version FROM {TABLA_VERSION}"))}
+
+
+def migrar(engine, hasta=None, verbose=False):
+    """Aplica las migraciones pendientes (hasta la versión `hasta`); devuelve las versiones aplicadas"""
+    hasta = VERSION_ACTUAL if hasta is None else hasta
+    clave = (str(engine.url), hasta)
+    if clave in _MIGRADOS:
+        return []
+    aplicadas = []
+    with _LOCK:
+        if clave in _MIGRADOS:
+            return []
+        with engine.begin() as conn:
+            conn.execute(text(DDL_VERSION))
+            hechas = versiones_aplicadas(conn)
+        for version, descripcion, pasos in MIGRACIONES:
+            if version in hechas or version > hasta:
+                continue
+            # Primero se revisan los datos de todos los pasos: el DDL de MySQL no se deshace
+            with engine.connect() as conn:
+                for paso in pasos:
+                    if hasattr(paso, "comprobar"):
+                        paso.comprobar(conn)
+            with engine.begin() as conn:
+                for paso in pasos:
+                    cambio = paso(conn)
+                    if verbose:
+                        print(f"  v{version}: {paso.descripcion}{'' if cambio else ' (ya estaba)'}")
+                conn.execute(
+                    text(f"INSERT INTO {TABLA_VERSION} (version, descripcion, aplicada) VALUES (:v, :d, :f)"),
+                    {"v": version, "d": descripcion, "f": datetime.datetime.now()},
+                )
+            aplicadas.append(version)
+        _MIGRADOS.add(clave)
+    return aplicadas
+
+
+def main():
+    from servicios.conexion import BACKENDS_SQL, backend_configurado, obtener_engine
+
+    parser = argparse.ArgumentParser(description="Aplica las migraciones de esquema pendientes")
+    parser.add_argument("--backend", choices=BACKENDS_SQL, default=None)
+    parser.add_argument("--estado", action="store_true", help="solo muestra las versiones aplicadas")
+    args = parser.parse_args()
+
+    backend = args.backend or backend_configurado()
+    engine = obtener_engine(backend)
+    if not args.estado:
+        aplicadas = migrar(engine, verbose=True)
+        print(f"Aplicadas: {aplicadas or 'ninguna (ya estaba al día)'}")
+    with engine.connect() as conn:
+        hechas = versiones_aplicadas(conn)
+    for version, descripcion, _ in MIGRACIONES:
+        print(f"  [{'x' if version in hechas else ' '}] v{version} {descripcion}")
+
+
+if __name__ == "__main__":
+    main()
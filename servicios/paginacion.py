@@ -0,0 +1,94 @@
+# ============================================================================
+# PAGINACIÓN POR CLAVE (KEYSET)
+# ============================================================================
+# En lugar de OFFSET (que obliga a la base a recorrer todas las filas
+# anteriores), cada página continúa desde los valores de orden de la última
+# fila mostrada: WHERE (fecha, id) < (:fecha, :id) ORDER BY fecha DESC, id DESC.
+# Con un índice sobre las columnas de orden el coste depende solo del tamaño
+# de la página.
+#
+# La primera columna de orden (la fecha) puede tener NULL: esas filas van al
+# final en orden descendente y al principio en ascendente, como las ordenan
+# MySQL y SQLite. Se leen como un tramo aparte (fecha IS NULL, por id), así
+# cada consulta sigue siendo un rango del índice y el cursor nunca queda en
+# "fecha = NULL".
+import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+
+def a_python(valor):
+    """Convierte escalares de pandas/numpy a tipos que acepta el driver"""
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, datetime.date) or valor is None:
+        return valor
+    if pd.isna(valor):
+        return None
+    return valor
+
+
+def condicion_keyset(orden, descendente=True, prefijo="_k"):
+    """Construye la condición (c0, c1, ...) < (:_k0, :_k1, ...) expandida con OR"""
+    op = "<" if descendente else ">"
+    partes = []
+    for i in range(len(orden)):
+        iguales = [f"{orden[j]} = :{prefijo}{j}" for j in range(i)]
+        partes.append("(" + " AND ".join(iguales + [f"{orden[i]} {op} :{prefijo}{i}"]) + ")")
+    return "(" + " OR ".join(partes) + ")"
+
+
+def _consulta(tabla, columnas, condiciones, orden, direccion, limite):
+    query = f"SELECT {columnas} FROM {tabla}"
+    if condiciones:
+        query += " WHERE " + " AND ".join(condiciones)
+    query += " ORDER BY " + ", ".join(f"{c} {direccion}" for c in orden)
+    return query + f" LIMIT {int(limite)}"
+
+
+def pagina_keyset(engine, tabla, columnas="*", where=None, params=None, cursor=None,
+                  limite=50, orden=("fecha", "id"), descendente=True):
+    """Lee una página ordenada por `orden` que empieza después de `cursor`.
+
+    Devuelve (df, siguiente_cursor). siguiente_cursor es None en la última página.
+    """
+    params = dict(params or {})
+    # El filtro va entre paréntesis: un OR suyo no debe mezclarse con la condición del cursor
+    base = [f"({where})"] if where else []
+    cursor = tuple(a_python(v) for v in cursor) if cursor is not None else None
+    direccion = "DESC" if descendente else "ASC"
+
+    # Tramos: True = filas con la primera columna NULL; se empieza en el del cursor
+    tramos = [False, True] if descendente else [True, False]
+    if cursor is not None:
+        tramos = tramos[tramos.index(cursor[0] is None):]
+
+    partes, faltan = [], int(limite) + 1
+    with engine.connect() as conn:
+        for nulos in tramos:
+            condiciones = base + [f"{orden[0]} IS NULL" if nulos else f"{orden[0]} IS NOT NULL"]
+            valores = dict(params)
+            if cursor is not None and (cursor[0] is None) == nulos:
+                # En el tramo de NULL solo desempatan las columnas siguientes
+                resto, claves = (orden[1:], cursor[1:]) if nulos else (orden, cursor)
+                condiciones.append(condicion_keyset(resto, descendente) if resto else "1 = 0")
+                valores.update({f"_k{i}": v for i, v in enumerate(claves)})
+            df = pd.read_sql(text(_consulta(tabla, columnas, condiciones, orden, direccion, faltan)),
+                             conn, params=valores)
+            partes.append(df)
+            faltan -= len(df)
+            if faltan <= 0:
+                break
+    con_filas = [p for p in partes if not p.empty]
+    df = pd.concat(con_filas, ignore_index=True) if len(con_filas) > 1 else (con_filas or partes)[0]
+
+    siguiente = None
+    if len(df) > limite:
+        df = df.iloc[:limite]
+        ultima = df.iloc[-1]
+        siguiente = tuple(a_python(ultima[c]) for c in orden)
+    return df, siguiente
@@ -0,0 +1,38 @@
+"""Repositorios de datos intercambiables (MySQL, SQLite local o archivos Excel).
+
+El backend se elige con la variable CAFE_BACKEND (mysql, sqlite o excel);
+obtener_repositorio() devuelve una instancia compartida por proceso.
+"""
+import os
+import threading
+
+from servicios.conexion import BACKENDS_SQL, CARPETA_DATOS, backend_configurado, obtener_engine
+from servicios.repositorios.base import Repositorio
+
+__all__ = ["Repositorio", "obtener_repositorio", "BACKENDS"]
+
+BACKENDS = BACKENDS_SQL + ("excel",)
+
+_REPOSITORIOS = {}
+_LOCK = threading.Lock()
+
+
+def _crear(backend):
+    if backend in BACKENDS_SQL:
+        from servicios.repositorios.sql import RepositorioSQL
+        return RepositorioSQL(obtener_engine(backend))
+    if backend == "excel":
+        from servicios.almacen_excel import obtener_almacen_excel
+        from servicios.repositorios.excel import RepositorioExcel
+        almacen = obtener_almacen_excel(os.path.join(CARPETA_DATOS, 'almacen_excel.sqlite'))
+        return RepositorioExcel(almacen, CARPETA_DATOS)
+    raise ValueError(f"CAFE_BACKEND desconocido: {backend!r} (usa uno de {BACKENDS})")
+
+
+def obtener_repositorio(backend=None, defecto="mysql"):
+    """Repositorio del backend dado (o el de CAFE_BACKEND), uno por proceso"""
+    backend = (backend or backend_configurado(defecto)).strip().lower()
+    with _LOCK:
+        if backend not in _REPOSITORIOS:
+            _REPOSITORIOS[backend] = _crear(backend)
+        return _REPOSITORIOS[backend]
@@ -0,0 +1,92 @@
+# ============================================================================
+# INTERFAZ COMÚN DE ACCESO A DATOS
+# ============================================================================
+# Cada dashboard tenía su propia versión de cargar_todos_pedidos,
+# obtener_inventario_actual, actualizar_inventario, cargar_predicciones...
+# Un Repositorio agrupa esas operaciones para pedidos, inventario,
+# predicciones, usuarios, pagos y logs; las implementaciones (SQL para MySQL y
+# SQLite, Excel) devuelven siempre las mismas columnas.
+#
+# Convenciones:
+# - cargar_pedidos(): id, cliente_id, producto, cantidad, detalle, fecha (datetime).
+# - cargar_predicciones(): fecha, prediccion ordenadas por fecha.
+# - inventario_actual(): dict con cantidad_kg y fecha_actualizacion.
+# - actualizar_inventario(): dict con cantidad_antes y cantidad_despues del movimiento.
+
+COLUMNAS_PEDIDOS = ['id', 'cliente_id', 'producto', 'cantidad', 'detalle', 'fecha']
+COLUMNAS_HISTORIAL = ['cantidad_antes', 'cantidad_despues', 'fecha_cambio', 'usuario']
+INVENTARIO_INICIAL = 50.0
+
+
+class Repositorio:
+    """Operaciones de datos que comparten los dashboards"""
+
+    nombre = "base"
+
+    # ------------------------------------------------------------ pedidos
+    def cargar_pedidos(self):
+        raise NotImplementedError
+
+    def guardar_pedido(self, pedido):
+        raise NotImplementedError
+
+    def eliminar_pedido(self, id_pedido):
+        raise NotImplementedError
+
+    # ------------------------------------------------------------ inventario
+    def inventario_actual(self):
+        raise NotImplementedError
+
+    def actualizar_inventario(self, nueva_cantidad, usuario):
+        raise NotImplementedError
+
+    def historial_inventario(self):
+        raise NotImplementedError
+
+    # ------------------------------------------------------------ predicciones
+    def cargar_predicciones(self):
+        raise NotImplementedError
+
+    def eliminar_prediccion(self, fecha, kg):
+        raise NotImplementedError
+
+    # ------------------------------------------------------------ usuarios
+    def cargar_usuarios(self):
+        raise NotImplementedError
+
+    def cargar_clientes(self):
+        """Nombres de usuario con rol cliente, ordenados"""
+        usuarios = self.cargar_usuarios()
+        if usuarios.empty:
+            return []
+        clientes = usuarios[usuarios['rol'].astype(str).str.lower().str.strip() == "cliente"]['usuario']
+        return sorted(clientes.dropna().astype(str).unique().tolist())
+
+    def crear_usuario(self, datos):
+        raise NotImplementedError
+
+    def actualizar_usuario(self, usuario, cambios):
+        raise NotImplementedError
+
+    def eliminar_usuario(self, usuario):
+        raise NotImplementedError
+
+    # ------------------------------------------------------------ pagos
+    def cargar_pagos(self, cliente_id):
+        raise NotImplementedError
+
+    def registrar_pago(self, pago):
+        raise NotImplementedError
+
+    # ------------------------------------------------------------ logs
+    def registrar_eliminacion(self, fila, usuario):
+        raise NotImplementedError
+
+    def cargar_eliminaciones(self):
+        raise NotImplementedError
+
+    def guardar_comparacion(self, datos):
+        raise NotImplementedError
+
+    def cargar_comparaciones(self):
+        raise NotImplementedError
@@ -0,0 +1,142 @@
+# ============================================================================
+# REPOSITORIO EXCEL (almacén SQLite con importación/exportación .xlsx)
+# ============================================================================
+# Implementa la interfaz común sobre servicios.almacen_excel: cada "archivo"
+# es una tabla append-only y el id de un pedido es el id interno de su fila.
+#
+# Log_in.py sigue autenticando con usuarios.xlsx, así que cada cambio de
+# usuarios vuelve a exportar ese archivo (es pequeño; se escribe a un temporal
+# y se reemplaza para que el login nunca lea un libro a medio escribir).
+import os
+
+import pandas as pd
+
+from servicios.repositorios.base import COLUMNAS_HISTORIAL, COLUMNAS_PEDIDOS, INVENTARIO_INICIAL, Repositorio
+
+ARCHIVOS = {
+    "pedidos": "pedidos_cliente.xlsx",
+    "inventario": "inventario_cafe.xlsx",
+    "control": "control_inventario_cafe.xlsx",
+    "predicciones": "predicciones_cafe_365_dias.xlsx",
+    "usuarios": "usuarios.xlsx",
+    "comparacion": "comparacion_prediccion_vs_real.xlsx",
+    "eliminados": "log_eliminaciones_pedidos.xlsx",
+    "pagos": "pagos_cliente.xlsx",
+}
+
+
+class RepositorioExcel(Repositorio):
+    """Acceso a datos sobre los archivos .xlsx de datos_prueba"""
+
+    nombre = "excel"
+
+    def __init__(self, almacen, carpeta):
+        self.almacen = almacen
+        self.carpeta = carpeta
+
+    def archivo(self, clave):
+        return os.path.join(self.carpeta, ARCHIVOS[clave])
+
+    # ------------------------------------------------------------ pedidos
+    def cargar_pedidos(self):
+        df = self.almacen.leer(self.archivo("pedidos"), columnas=COLUMNAS_PEDIDOS[1:])
+        df['id'] = df.index.astype(int)
+        df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
+        return df.reset_index(drop=True)[COLUMNAS_PEDIDOS]
+
+    def guardar_pedido(self, pedido):
+        self.almacen.agregar(self.archivo("pedidos"), pedido)
+
+    def eliminar_pedido(self, id_pedido):
+        self.almacen.borrar(self.archivo("pedidos"), [id_pedido])
+
+    # ------------------------------------------------------------ inventario
+    def inventario_actual(self):
+        archivo = self.archivo("inventario")
+        if not self.almacen.existe(archivo):
+            self.almacen.reemplazar(archivo, {'cantidad_kg': INVENTARIO_INICIAL,
+                                              'fecha_actualizacion': pd.Timestamp.now()})
+        return self.almacen.leer(archivo).iloc[-1].to_dict()
+
+    def actualizar_inventario(self, nueva_cantidad, usuario):
+        anterior = self.inventario_actual()['cantidad_kg']
+        fecha_actual = pd.Timestamp.now()
+        self.almacen.reemplazar(self.archivo("inventario"),
+                                {'cantidad_kg': nueva_cantidad, 'fecha_actualizacion': fecha_actual})
+        self.almacen.agregar(self.archivo("control"), {
+            'cantidad_antes': anterior,
+            'cantidad_despues': nueva_cantidad,
+            'fecha_cambio': fecha_actual,
+            'usuario': usuario,
+        })
+        return {'cantidad_antes': anterior, 'cantidad_despues': nueva_cantidad}
+
+    def historial_inventario(self):
+        return self.almacen.leer(self.archivo("control"), columnas=COLUMNAS_HISTORIAL)
+
+    # ------------------------------------------------------------ predicciones
+    def cargar_predicciones(self):
+        df = self.almacen.leer(self.archivo("predicciones"), columnas=['Fecha', 'Kg_Predichos'])
+        df['fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
+        df['prediccion'] = pd.to_numeric(df['Kg_Predichos'], errors='coerce')
+        df = df[df['fecha'].notnull()].sort_values('fecha')
+        return df[['fecha', 'prediccion']]
+
+    def eliminar_prediccion(self, fecha, kg):
+        archivo = self.archivo("predicciones")
+        df = self.almacen.leer(archivo, columnas=['Fecha', 'Kg_Predichos'])
+        mask = (pd.to_datetime(df['Fecha'], errors='coerce') == pd.to_datetime(fecha)) & (df['Kg_Predichos'] == kg)
+        self.almacen.borrar(archivo, df.index[mask])
+
+    # ------------------------------------------------------------ usuarios
+    def cargar_usuarios(self):
+        return self.almacen.leer(self.archivo("usuarios"), columnas=['usuario', 'rol', 'contrasena', 'nombre', 'telefono'])
+
+    def _exportar_usuarios(self):
+        archivo = self.archivo("usuarios")
+        temporal = f"{archivo}.{os.getpid()}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(self.almacen.exportar_xlsx(archivo))
+        os.replace(temporal, archivo)
+
+    def crear_usuario(self, datos):
+        self.almacen.agregar(self.archivo("usuarios"), datos)
+        self._exportar_usuarios()
+
+    def _ids_usuario(self, usuario):
+        df = self.cargar_usuarios()
+        return df.index[df['usuario'].astype(str) == str(usuario)]
+
+    def actualizar_usuario(self, usuario, cambios):
+        for id_fila in self._ids_usuario(usuario):
+            self.almacen.actualizar(self.archivo("usuarios"), id_fila, cambios)
+        self._exportar_usuarios()
+
+    def eliminar_usuario(self, usuario):
+        self.almacen.borrar(self.archivo("usuarios"), self._ids_usuario(usuario))
+        self._exportar_usuarios()
+
+    # ------------------------------------------------------------ pagos
+    def cargar_pagos(self, cliente_id):
+        df = self.almacen.leer(self.archivo("pagos"), columnas=['cliente_id', 'monto', 'fecha_pago', 'observaciones'])
+        df = df[df['cliente_id'] == cliente_id]
+        return df.sort_values('fecha_pago', ascending=False).reset_index(drop=True)
+
+    def registrar_pago(self, pago):
+        self.almacen.agregar(self.archivo("pagos"), pago)
+
+    # ------------------------------------------------------------ logs
+    def registrar_eliminacion(self, fila, usuario):
+        fila = dict(fila)
+        fila["usuario"] = usuario
+        fila["fecha_eliminacion"] = pd.Timestamp.now()
+        self.almacen.agregar(self.archivo("eliminados"), fila)
+
+    def cargar_eliminaciones(self):
+        return self.almacen.leer(self.archivo("eliminados"))
+
+    def guardar_comparacion(self, datos):
+        self.almacen.agregar(self.archivo("comparacion"), datos)
+
+    def cargar_comparaciones(self):
+        return self.almacen.leer(self.archivo("comparacion"))
@@ -0,0 +1,150 @@
+# ============================================================================
+# REPOSITORIO SQL (MySQL o SQLite a través de SQLAlchemy)
+# ============================================================================
+# Las mismas consultas sirven para los dos motores: solo se usa SQL estándar y
+# las diferencias de dialecto (FOR UPDATE, YEAR/MONTH, upserts) viven en
+# servicios.entregas, servicios.resumen_mensual, servicios.exactitud_predicciones
+# y servicios.estado_inventario.
+# Las lecturas pasan por la caché versionada por tabla y las escrituras
+# invalidan lo que tocan.
+import pandas as pd
+from sqlalchemy import column, table, text
+
+from servicios import cuentas_clientes, estado_inventario, exactitud_predicciones, resumen_mensual
+from servicios.almacen_pedidos import obtener_almacen_pedidos
+from servicios.cache_consultas import consulta_cacheada, invalida_tablas
+from servicios.escritura import insertar
+from servicios.repositorios.base import COLUMNAS_PEDIDOS, INVENTARIO_INICIAL, Repositorio
+
+
+class RepositorioSQL(Repositorio):
+    """Acceso a datos sobre un engine SQLAlchemy (MySQL o SQLite)"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.nombre = engine.dialect.name
+        self.almacen_pedidos = obtener_almacen_pedidos(engine)
+
+    # ------------------------------------------------------------ pedidos
+    @consulta_cacheada("pedidos_cliente")
+    def cargar_pedidos(self):
+        df = self.almacen_pedidos.pedidos()
+        df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
+        return df[COLUMNAS_PEDIDOS]
+
+    @invalida_tablas("pedidos_cliente", resumen_mensual.TABLA)
+    def guardar_pedido(self, pedido):
+        resumen_mensual.preparar(self.engine)
+        with self.engine.begin() as conn:
+            insertar(conn, 'pedidos_cliente', pedido)
+            resumen_mensual.registrar_pedidos(conn, [pedido])
+
+    @invalida_tablas("pedidos_cliente", resumen_mensual.TABLA)
+    def eliminar_pedido(self, id_pedido):
+        resumen_mensual.preparar(self.engine)
+        with self.engine.begin() as conn:
+            fila = conn.execute(
+                text("SELECT producto, cantidad, fecha FROM pedidos_cliente WHERE id=:id"), {"id": id_pedido}
+            ).mappings().first()
+            conn.execute(text("DELETE FROM pedidos_cliente WHERE id=:id"), {"id": id_pedido})
+            if fila is not None:
+                resumen_mensual.registrar_pedidos(conn, [fila], signo=-1)
+        self.almacen_pedidos.descartar([id_pedido])
+
+    # ------------------------------------------------------------ inventario
+    def inventario_actual(self):
+        estado_inventario.preparar(self.engine)
+        estado = estado_inventario.leer_estado(self.engine)
+        if estado is None:
+            return {'cantidad_kg': INVENTARIO_INICIAL, 'fecha_actualizacion': pd.Timestamp.now(), 'version': 0}
+        return estado
+
+    @invalida_tablas("inventario_cafe", "control_inventario_cafe", estado_inventario.TABLA)
+    def actualizar_inventario(self, nueva_cantidad, usuario):
+        return estado_inventario.actualizar(self.engine, nueva_cantidad, usuario, inicial=INVENTARIO_INICIAL)
+
+    @consulta_cacheada("control_inventario_cafe")
+    def historial_inventario(self):
+        return pd.read_sql("SELECT * FROM control_inventario_cafe ORDER BY fecha_cambio DESC", self.engine)
+
+    # ------------------------------------------------------------ predicciones
+    @consulta_cacheada("predicciones_cafe_365_dias")
+    def cargar_predicciones(self):
+        df = pd.read_sql("SELECT Fecha, Kg_Predichos FROM predicciones_cafe_365_dias", self.engine)
+        df['fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
+        df['prediccion'] = pd.to_numeric(df['Kg_Predichos'], errors='coerce')
+        df = df[df['fecha'].notnull()].sort_values('fecha')
+        return df[['fecha', 'prediccion']]
+
+    @invalida_tablas("predicciones_cafe_365_dias", resumen_mensual.TABLA)
+    def eliminar_prediccion(self, fecha, kg):
+        resumen_mensual.preparar(self.engine)
+        with self.engine.begin() as conn:
+            res = conn.execute(text(
+                "DELETE FROM predicciones_cafe_365_dias WHERE Fecha=:fecha AND Kg_Predichos=:kg"
+            ), {"fecha": pd.Timestamp(fecha).to_pydatetime(), "kg": float(kg)})
+            if res.rowcount and res.rowcount > 0:
+                resumen_mensual.registrar_predicciones(conn, [(fecha, kg)] * res.rowcount, signo=-1)
+
+    # ------------------------------------------------------------ usuarios
+    @consulta_cacheada("usuarios")
+    def cargar_usuarios(self):
+        return pd.read_sql("SELECT * FROM usuarios", self.engine)
+
+    @consulta_cacheada("usuarios")
+    def cargar_clientes(self):
+        df = pd.read_sql("SELECT usuario FROM usuarios WHERE LOWER(rol)='cliente'", self.engine)
+        return sorted(df['usuario'].dropna().astype(str).tolist())
+
+    @invalida_tablas("usuarios")
+    def crear_usuario(self, datos):
+        insertar(self.engine, 'usuarios', datos)
+
+    @invalida_tablas("usuarios")
+    def actualizar_usuario(self, usuario, cambios):
+        usuarios = table('usuarios', column('usuario'), *[column(c) for c in cambios])
+        with self.engine.begin() as conn:
+            conn.execute(usuarios.update().where(usuarios.c.usuario == usuario).values(**cambios))
+
+    @invalida_tablas("usuarios")
+    def eliminar_usuario(self, usuario):
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM usuarios WHERE usuario=:u"), {"u": usuario})
+
+    # ------------------------------------------------------------ pagos
+    @consulta_cacheada("pagos_cliente")
+    def cargar_pagos(self, cliente_id):
+        return pd.read_sql(
+            text("SELECT * FROM pagos_cliente WHERE cliente_id=:c ORDER BY fecha_pago DESC"),
+            self.engine, params={"c": cliente_id}
+        )
+
+    @invalida_tablas("pagos_cliente", *cuentas_clientes.TABLAS)
+    def registrar_pago(self, pago):
+        cuentas_clientes.preparar(self.engine)
+        with self.engine.begin() as conn:
+            insertar(conn, 'pagos_cliente', pago)
+            cuentas_clientes.registrar_pagos(conn, [pago])
+
+    # ------------------------------------------------------------ logs
+    @invalida_tablas("log_eliminaciones_pedidos")
+    def registrar_eliminacion(self, fila, usuario):
+        fila = dict(fila)
+        fila["usuario"] = usuario
+        fila["fecha_eliminacion"] = pd.Timestamp.now()
+        insertar(self.engine, 'log_eliminaciones_pedidos', fila)
+
+    @consulta_cacheada("log_eliminaciones_pedidos")
+    def cargar_eliminaciones(self):
+        return pd.read_sql("SELECT * FROM log_eliminaciones_pedidos", self.engine)
+
+    @invalida_tablas("comparacion_prediccion_vs_real", exactitud_predicciones.TABLA)
+    def guardar_comparacion(self, datos):
+        exactitud_predicciones.preparar(self.engine)
+        with self.engine.begin() as conn:
+            insertar(conn, 'comparacion_prediccion_vs_real', datos)
+            exactitud_predicciones.registrar_comparaciones(conn, datos)
+
+    @consulta_cacheada("comparacion_prediccion_vs_real")
+    def cargar_comparaciones(self):
+        return pd.read_sql("SELECT * FROM comparacion_prediccion_vs_real", self.engine)
@@ -0,0 +1,185 @@
+# ============================================================================
+# BASE SQLITE LOCAL SEMBRADA DESDE datos_prueba/*.csv
+# ============================================================================
+# Mismo esquema que MySQL en un archivo local: sin red ni servidor, útil para
+# desarrollo, benchmarks y uso sin conexión. Las tablas se crean si no existen
+# y, recién creadas, se llenan con el CSV del mismo nombre.
+#
+# Los CSV exportados desde Excel traen sus mañas: BOM, acentos en latin-1,
+# columnas vacías al final, filas en blanco y booleanos "VERDADERO"/"FALSO".
+import datetime
+import io
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+from sqlalchemy import create_engine, event, inspect, text
+
+from servicios.escritura import insertar_por_lotes
+from servicios.migraciones import migrar
+
+ESQUEMA = {
+    "pedidos_cliente": """
+        CREATE TABLE pedidos_cliente (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id TEXT, producto TEXT, cantidad REAL, detalle TEXT, fecha DATETIME
+        )""",
+    "pedidos_pendientes": """
+        CREATE TABLE pedidos_pendientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id TEXT, producto TEXT, cantidad REAL, detalle TEXT, fecha DATETIME
+        )""",
+    "log_pedidos_entregados": """
+        CREATE TABLE log_pedidos_entregados (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id TEXT, producto TEXT, cantidad REAL, detalle TEXT,
+            fecha_solicitada DATETIME, fecha_entrega DATETIME, id_pendiente INTEGER
+        )""",
+    "inventario_cafe": """
+        CREATE TABLE inventario_cafe (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cantidad_kg REAL, fecha_actualizacion DATETIME
+        )""",
+    "control_inventario_cafe": """
+        CREATE TABLE control_inventario_cafe (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cantidad_antes REAL, cantidad_despues REAL, fecha_cambio DATETIME, usuario TEXT
+        )""",
+    "predicciones_cafe_365_dias": """
+        CREATE TABLE predicciones_cafe_365_dias (
+            Fecha DATETIME, Dia_Semana TEXT, Mes TEXT, Kg_Predichos REAL, Dias_Desde_Hoy INTEGER
+        )""",
+    "usuarios": """
+        CREATE TABLE usuarios (
+            usuario TEXT PRIMARY KEY, rol TEXT, contrasena TEXT, nombre TEXT, telefono TEXT
+        )""",
+    "comparacion_prediccion_vs_real": """
+        CREATE TABLE comparacion_prediccion_vs_real (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id TEXT, fecha_real DATETIME, kg_real REAL, fecha_predicha DATETIME,
+            kg_predicha REAL, dif_dias INTEGER, dif_kg REAL, registro DATETIME, fue_pred_usada BOOLEAN
+        )""",
+    "log_eliminaciones_pedidos": """
+        CREATE TABLE log_eliminaciones_pedidos (
+            id INTEGER, cliente_id TEXT, producto TEXT, cantidad REAL, detalle TEXT, fecha DATETIME,
+            info TEXT, usuario TEXT, fecha_eliminacion DATETIME
+        )""",
+    "precios_producto": """
+        CREATE TABLE precios_producto (
+            nombre TEXT PRIMARY KEY, precio REAL
+        )""",
+    "pagos_cliente": """
+        CREATE TABLE pagos_cliente (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id TEXT, monto REAL, fecha_pago DATETIME, observaciones TEXT
+        )""",
+}
+
+# Nombres de columna del CSV que difieren del esquema
+RENOMBRAR = {"contraseña": "contrasena"}
+BOOLEANOS = {"VERDADERO": True, "FALSO": False, "TRUE": True, "FALSE": False}
+CODIFICACIONES_ANSI = ("cp1252", "cp850")
+LETRAS_ESPANOL = "áéíóúñüÁÉÍÓÚÑÜ¿¡"
+
+_LOCK = threading.Lock()
+
+
+def _fecha_desde_sqlite(valor):
+    texto = valor.decode()
+    try:
+        return datetime.datetime.fromisoformat(texto)
+    except ValueError:
+        pass
+    try:
+        return pd.Timestamp(texto).to_pydatetime()
+    except ValueError:
+        # Un texto que no es fecha se devuelve tal cual en vez de romper la consulta
+        return texto
+
+
+def _registrar_conversor():
+    """Las columnas declaradas DATETIME vuelven como datetime (igual que con MySQL).
+
+    El registro de conversores de sqlite3 es de todo el proceso: se hace al
+    crear el primer engine local, no al importar el módulo, y no reemplaza un
+    conversor DATETIME que la aplicación ya haya registrado. Solo lo usan las
+    conexiones abiertas con detect_types=PARSE_DECLTYPES.
+    """
+    with _LOCK:
+        if "DATETIME" not in sqlite3.converters:
+            sqlite3.register_converter("DATETIME", _fecha_desde_sqlite)
+
+
+def _decodificar(datos):
+    """UTF-8 si es válido; si no, la codificación de un byte que produce más letras en español"""
+    try:
+        return datos.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        pass
+    # Excel guarda en ANSI (cp1252) o, según la configuración regional, en OEM (cp850)
+    candidatos = [datos.decode(c, errors="replace") for c in CODIFICACIONES_ANSI]
+    return max(candidatos, key=lambda t: sum(t.count(ch) for ch in LETRAS_ESPANOL))
+
+
+def leer_csv(ruta):
+    """Lee un CSV de datos_prueba limpiando BOM, codificación y columnas/filas vacías"""
+    with open(ruta, "rb") as f:
+        df = pd.read_csv(io.StringIO(_decodificar(f.read())))
+    df.columns = [str(c).lstrip("\ufeff").strip() for c in df.columns]
+    df = df.loc[:, [c for c in df.columns if c and not c.startswith("Unnamed")]]
+    df = df.dropna(how="all").rename(columns=RENOMBRAR)
+    for col in df.columns:
+        if df[col].dtype == object:
+            valores = set(df[col].dropna().astype(str).str.upper())
+            if valores and valores <= set(BOOLEANOS):
+                df[col] = df[col].astype(str).str.upper().map(BOOLEANOS)
+    return df
+
+
+def _columnas_tabla(conn, tabla):
+    return {c['name']: str(c['type']).upper() for c in inspect(conn).get_columns(tabla)}
+
+
+def _preparar_para_tabla(df, columnas):
+    df = df[[c for c in df.columns if c in columnas]].copy()
+    for col, tipo in columnas.items():
+        if col in df.columns and tipo == "DATETIME":
+            df[col] = pd.to_datetime(df[col], errors="coerce", format="mixed", dayfirst=False)
+    return df
+
+
+def crear_esquema(engine, carpeta_csv=None):
+    """Crea las tablas que falten y siembra las nuevas con su CSV (si existe)"""
+    with engine.begin() as conn:
+        existentes = set(inspect(conn).get_table_names())
+        for tabla, ddl in ESQUEMA.items():
+            if tabla in existentes:
+                continue
+            conn.execute(text(ddl))
+            ruta = os.path.join(carpeta_csv, f"{tabla}.csv") if carpeta_csv else None
+            if ruta and os.path.exists(ruta):
+                df = _preparar_para_tabla(leer_csv(ruta), _columnas_tabla(conn, tabla))
+                insertar_por_lotes(conn, tabla, df)
+
+
+def crear_engine_sqlite(ruta, carpeta_csv=None):
+    """Engine SQLite (WAL, fechas como datetime) con el esquema y las migraciones al día"""
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    _registrar_conversor()
+    engine = create_engine(
+        f"sqlite:///{ruta}",
+        connect_args={"check_same_thread": False, "detect_types": sqlite3.PARSE_DECLTYPES},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(conexion_dbapi, _registro):
+        cursor = conexion_dbapi.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    crear_esquema(engine, carpeta_csv)
+    migrar(engine)
+    return engine
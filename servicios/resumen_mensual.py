@@ -0,0 +1,206 @@
+# ============================================================================
+# RESUMEN MENSUAL MATERIALIZADO (kg reales vs. predichos)
+# ============================================================================
+# La pestaña Comparativa/Evolución solo necesita kg por producto × año × mes.
+# En vez de leer todos los pedidos y predicciones en cada ejecución, la tabla
+# resumen_mensual_kg guarda esos totales y se actualiza en la misma transacción
+# que inserta, borra o entrega pedidos (o que elimina una predicción usada).
+# La gráfica lee como mucho 12 filas por año, sin importar el historial.
+#
+# Si la tabla no existe, preparar() la crea y la reconstruye desde
+# pedidos_cliente y predicciones_cafe_365_dias antes de la transacción que la
+# actualiza (servicios.materializadas); reconstruir() también sirve tras
+# cargas masivas externas (p. ej. cuando el modelo regenera las predicciones).
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from servicios import materializadas
+from servicios.cache_consultas import consulta_cacheada, invalidar
+
+TABLA = "resumen_mensual_kg"
+PRODUCTO_PREDICCION = "cafe"
+MESES_ORDEN = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+DDL = f"""
+CREATE TABLE IF NOT EXISTS {TABLA} (
+    producto VARCHAR(100) NOT NULL,
+    anio INT NOT NULL,
+    mes INT NOT NULL,
+    kg_real DOUBLE NOT NULL DEFAULT 0,
+    kg_predicho DOUBLE NOT NULL DEFAULT 0,
+    PRIMARY KEY (producto, anio, mes)
+)
+"""
+
+UPSERT = {
+    "mysql": (
+        f"INSERT INTO {TABLA} (producto, anio, mes, kg_real, kg_predicho) "
+        "VALUES (:producto, :anio, :mes, :kg_real, :kg_predicho) "
+        "ON DUPLICATE KEY UPDATE kg_real = kg_real + VALUES(kg_real), "
+        "kg_predicho = kg_predicho + VALUES(kg_predicho)"
+    ),
+    "sqlite": (
+        f"INSERT INTO {TABLA} (producto, anio, mes, kg_real, kg_predicho) "
+        "VALUES (:producto, :anio, :mes, :kg_real, :kg_predicho) "
+        "ON CONFLICT(producto, anio, mes) DO UPDATE SET kg_real = kg_real + excluded.kg_real, "
+        "kg_predicho = kg_predicho + excluded.kg_predicho"
+    ),
+}
+
+ANIO_MES = {
+    "mysql": ("YEAR({c})", "MONTH({c})"),
+    "sqlite": ("CAST(strftime('%Y', {c}) AS INTEGER)", "CAST(strftime('%m', {c}) AS INTEGER)"),
+}
+
+
+def preparar(engine):
+    """Crea y llena el resumen si no existe; va antes de la transacción de registrar_*"""
+    materializadas.preparar(engine, (TABLA,), DDL, reconstruir)
+
+
+def recalcular(engine):
+    """reconstruir() en su propia transacción, invalidando la caché tras el commit"""
+    preparar(engine)
+    with engine.begin() as conn:
+        reconstruir(conn)
+    invalidar(TABLA)
+
+
+def _acumular(conn, deltas):
+    filas = [
+        {"producto": p, "anio": a, "mes": m, "kg_real": r, "kg_predicho": pr}
+        for (p, a, m), (r, pr) in deltas.items() if r or pr
+    ]
+    if filas:
+        conn.execute(text(UPSERT[conn.dialect.name]), filas)
+
+
+def registrar_pedidos(conn, pedidos, signo=1):
+    """Suma (o resta con signo=-1) pedidos con producto, fecha y cantidad.
+
+    Se llama dentro de la transacción del cambio, con la tabla ya preparada;
+    quien la abre invalida TABLA después del commit.
+    """
+    deltas = defaultdict(lambda: [0.0, 0.0])
+    if isinstance(pedidos, pd.DataFrame):
+        # Cargas masivas: se agrega con groupby en vez de fila por fila
+        fechas = pd.to_datetime(pedidos['fecha'], errors='coerce')
+        validos = fechas.notna() & pedidos['cantidad'].notna()
+        totales = pd.to_numeric(pedidos.loc[validos, 'cantidad']).groupby([
+            pedidos.loc[validos, 'producto'].fillna('').astype(str),
+            fechas[validos].dt.year, fechas[validos].dt.month,
+        ]).sum()
+        for (producto, anio, mes), kg in totales.items():
+            deltas[(producto, int(anio), int(mes))][0] += signo * float(kg)
+        _acumular(conn, deltas)
+        return
+    for p in pedidos:
+        fecha = pd.Timestamp(p['fecha'])
+        if pd.isna(fecha) or p.get('cantidad') is None:
+            continue
+        clave = (str(p.get('producto') or ''), fecha.year, fecha.month)
+        deltas[clave][0] += signo * float(p['cantidad'])
+    _acumular(conn, deltas)
+
+
+def registrar_predicciones(conn, predicciones, signo=1):
+    """Suma (o resta) predicciones dadas como pares (fecha, kg); invalidación como registrar_pedidos"""
+    deltas = defaultdict(lambda: [0.0, 0.0])
+    for fecha, kg in predicciones:
+        fecha = pd.Timestamp(fecha)
+        if pd.isna(fecha) or kg is None:
+            continue
+        deltas[(PRODUCTO_PREDICCION, fecha.year, fecha.month)][1] += signo * float(kg)
+    _acumular(conn, deltas)
+
+
+def reconstruir(conn):
+    """Recalcula el resumen completo agregando en la base de datos (ver recalcular)"""
+    anio, mes = ANIO_MES[conn.dialect.name]
+    reales = conn.execute(text(
+        f"SELECT COALESCE(producto, '') AS producto, {anio.format(c='fecha')} AS anio, "
+        f"{mes.format(c='fecha')} AS mes, SUM(cantidad) AS kg "
+        "FROM pedidos_cliente WHERE fecha IS NOT NULL "
+        f"GROUP BY COALESCE(producto, ''), {anio.format(c='fecha')}, {mes.format(c='fecha')}"
+    )).all()
+    predichos = conn.execute(text(
+        f"SELECT {anio.format(c='Fecha')} AS anio, {mes.format(c='Fecha')} AS mes, SUM(Kg_Predichos) AS kg "
+        "FROM predicciones_cafe_365_dias WHERE Fecha IS NOT NULL "
+        f"GROUP BY {anio.format(c='Fecha')}, {mes.format(c='Fecha')}"
+    )).all()
+
+    deltas = defaultdict(lambda: [0.0, 0.0])
+    for producto, a, m, kg in reales:
+        deltas[(producto, int(a), int(m))][0] += float(kg or 0)
+    for a, m, kg in predichos:
+        deltas[(PRODUCTO_PREDICCION, int(a), int(m))][1] += float(kg or 0)
+
+    conn.execute(text(f"DELETE FROM {TABLA}"))
+    _acumular(conn, deltas)
+
+
+@consulta_cacheada(TABLA)
+def leer_resumen(engine, producto=None):
+    """kg reales y predichos por año y mes (todos los productos si producto=None)"""
+    preparar(engine)
+    query = f"SELECT anio, mes, SUM(kg_real) AS kg_real, SUM(kg_predicho) AS kg_predicho FROM {TABLA}"
+    params = {}
+    if producto is not None:
+        query += " WHERE producto = :producto"
+        params["producto"] = producto
+    query += " GROUP BY anio, mes ORDER BY anio, mes"
+    return pd.read_sql(text(query), engine, params=params)
+
+
+def figura_comparativa_mensual(resumen):
+    """Barras por mes: histórico (sólidas) vs. previsto (rayadas) para cada año"""
+    import matplotlib.pyplot as plt
+
+    pivot_hist = resumen.pivot_table(index='mes', columns='anio', values='kg_real', aggfunc='sum').reindex(range(1, 13)).fillna(0)
+    pivot_pred = resumen.pivot_table(index='mes', columns='anio', values='kg_predicho', aggfunc='sum').reindex(range(1, 13)).fillna(0)
+    todos_anios = sorted(set(pivot_hist.columns.tolist() + pivot_pred.columns.tolist()))
+
+    # Colores
+    color_list_hist = ['#b3c6f7', '#6699ff', '#3366cc', '#003399', '#001147']
+    color_list_pred = ['#ffcccc', '#ff6666', '#ff3300', '#cc0000', '#660000']
+    borde_rojo_list = ['#ff3333', '#cc0000', '#990000', '#660000', '#330000']
+
+    fig, ax = plt.subplots(figsize=(12, 7))
+    bar_width = 0.7 / max(len(todos_anios), 1)
+    x = np.arange(len(MESES_ORDEN))
+
+    # Barras históricas
+    for i, anio in enumerate(todos_anios):
+        vals_hist = pivot_hist[anio].values if anio in pivot_hist.columns else np.zeros(len(MESES_ORDEN))
+        if np.any(vals_hist > 0):
+            offset = (i - len(todos_anios) / 2) * bar_width
+            ax.bar(x + offset, vals_hist, width=bar_width, color=color_list_hist[i % 5], alpha=0.87, label=f"Hist {anio}")
+
+    # Barras predichas
+    for i, anio in enumerate(todos_anios):
+        vals_pred = pivot_pred[anio].values if anio in pivot_pred.columns else np.zeros(len(MESES_ORDEN))
+        if np.any(vals_pred > 0):
+            offset = (i - len(todos_anios) / 2) * bar_width
+            ax.bar(x + offset, vals_pred, width=bar_width,
+                   color=color_list_pred[i % 5],
+                   edgecolor=borde_rojo_list[i % 5],
+                   linewidth=1.8,
+                   alpha=0.70,
+                   label=f'Prev {anio}',
+                   hatch='//')
+
+    ax.set_xlabel('Mes')
+    ax.set_ylabel('Kg')
+    ax.set_xticks(x)
+    ax.set_xticklabels(MESES_ORDEN, fontsize=10)
+
+    # Ajuste ticks cada 10 kg
+    max_kgs = int((ax.get_ylim()[1] // 10 + 1) * 10)
+    ax.set_yticks(np.arange(0, max_kgs + 1, 10))
+    if todos_anios:
+        ax.legend(fontsize=10)
+    ax.grid(True, axis='y', alpha=0.18)
+    return fig
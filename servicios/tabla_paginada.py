@@ -0,0 +1,173 @@
+# ============================================================================
+# TABLA PAGINADA POR CLAVE PARA STREAMLIT
+# ============================================================================
+# El historial de inventario, la auditoría de eliminaciones, las comparaciones
+# y los pagos se pasaban completos a st.dataframe en cada ejecución: lo que se
+# leía, se convertía y se enviaba al navegador crecía con el historial.
+#
+# mostrar() dibuja una tabla que solo lee la página visible con
+# servicios.paginacion.pagina_keyset (ORDER BY fecha DESC, id DESC; las filas
+# sin fecha al final), con:
+# - tamaño de página,
+# - "Ir a fecha": la primera página empieza en ese día (WHERE fecha < día + 1),
+# - total bajo demanda: el COUNT(*) solo se hace al pulsar "Contar" y queda en
+#   la caché versionada de la tabla.
+# En st.session_state se guarda por tabla la pila de cursores de las páginas
+# ya vistas y la firma de los filtros; si cambian los filtros se vuelve a la
+# primera página, así que las vistas no necesitan callbacks propios.
+#
+# Una base MySQL sin migrar puede no tener la columna id en las tablas
+# históricas (la agrega la migración 2): en SQLite se desempata con el rowid
+# y en MySQL se ordena solo por fecha, sin las filas que no la tienen (si
+# varias filas comparten la fecha en el borde de una página, alguna puede
+# saltarse). Las columnas de cada tabla se leen una vez por proceso.
+import datetime
+import threading
+
+from sqlalchemy import inspect, text
+
+from servicios.cache_consultas import obtener_o_calcular
+from servicios.paginacion import pagina_keyset
+
+TAMANOS = (25, 50, 100, 200)
+
+_COLUMNAS = {}
+_LOCK = threading.Lock()
+
+
+def columnas_tabla(engine, tabla):
+    """Nombres (en minúsculas) de las columnas de `tabla`, leídos una vez por proceso"""
+    clave = (str(engine.url), tabla)
+    if clave not in _COLUMNAS:
+        with engine.connect() as conn:
+            columnas = {c["name"].lower() for c in inspect(conn).get_columns(tabla)}
+        with _LOCK:
+            _COLUMNAS[clave] = columnas
+    return _COLUMNAS[clave]
+
+
+def _sin_id_faltante(engine, tabla, columnas, orden, where):
+    """(columnas, orden, where) para una tabla sin columna id.
+
+    En SQLite el rowid desempata igual que el id; en MySQL se ordena solo por
+    fecha y se omiten las filas sin fecha, que no se podrían recorrer.
+    """
+    if "id" not in orden or "id" in columnas_tabla(engine, tabla):
+        return columnas, orden, where
+    columnas = ", ".join(c for c in (c.strip() for c in columnas.split(",")) if c.lower() != "id")
+    if engine.dialect.name == "sqlite":
+        return f"rowid, {columnas}", tuple("rowid" if c == "id" else c for c in orden), where
+    orden = tuple(c for c in orden if c != "id")
+    con_fecha = f"{orden[0]} IS NOT NULL"
+    return columnas, orden, f"({where}) AND {con_fecha}" if where else con_fecha
+
+
+def _filtro(orden, where=None, params=None, hasta_fecha=None, descendente=True):
+    """Agrega al WHERE el salto a fecha sobre la primera columna de orden"""
+    condiciones, params = ([f"({where})"] if where else []), dict(params or {})
+    if hasta_fecha is not None:
+        if descendente:
+            # Incluye todo el día elegido
+            condiciones.append(f"{orden[0]} < :_hasta_fecha")
+            params["_hasta_fecha"] = datetime.datetime.combine(hasta_fecha + datetime.timedelta(days=1), datetime.time.min)
+        else:
+            condiciones.append(f"{orden[0]} >= :_hasta_fecha")
+            params["_hasta_fecha"] = datetime.datetime.combine(hasta_fecha, datetime.time.min)
+    return " AND ".join(condiciones), params
+
+
+def leer_pagina(engine, tabla, columnas, orden, where=None, params=None, cursor=None, limite=50,
+                hasta_fecha=None, descendente=True):
+    """Una página de `tabla` (ver pagina_keyset), opcionalmente empezando en hasta_fecha"""
+    columnas, orden, where = _sin_id_faltante(engine, tabla, columnas, orden, where)
+    where, params = _filtro(orden, where, params, hasta_fecha, descendente)
+    return pagina_keyset(engine, tabla, columnas, where=where or None, params=params, cursor=cursor,
+                         limite=limite, orden=orden, descendente=descendente)
+
+
+def contar_filas(engine, tabla, orden, where=None, params=None, hasta_fecha=None, descendente=True):
+    """COUNT(*) con los mismos filtros que leer_pagina, cacheado hasta que cambie la tabla"""
+    _, orden, where = _sin_id_faltante(engine, tabla, "", orden, where)
+    where, params = _filtro(orden, where, params, hasta_fecha, descendente)
+    query = f"SELECT COUNT(*) FROM {tabla}" + (f" WHERE {where}" if where else "")
+
+    def calcular():
+        with engine.connect() as conn:
+            return int(conn.execute(text(query), params).scalar() or 0)
+
+    clave = ("contar_filas", str(engine.url), query, tuple(sorted((k, str(v)) for k, v in params.items())))
+    return obtener_o_calcular(clave, (tabla,), calcular)
+
+
+# ---------------------------------------------------------------------------
+# Componente
+# ---------------------------------------------------------------------------
+def _reiniciar(clave):
+    import streamlit as st
+
+    st.session_state[f"{clave}_cursores"] = [None]
+    st.session_state[f"{clave}_contar"] = False
+
+
+def _siguiente(clave, cursor):
+    import streamlit as st
+
+    st.session_state[f"{clave}_cursores"].append(cursor)
+
+
+def _anterior(clave):
+    import streamlit as st
+
+    if len(st.session_state[f"{clave}_cursores"]) > 1:
+        st.session_state[f"{clave}_cursores"].pop()
+
+
+def _contar(clave):
+    import streamlit as st
+
+    st.session_state[f"{clave}_contar"] = True
+
+
+def mostrar(clave, engine, tabla, columnas, orden, where=None, params=None, tamanos=TAMANOS, tamano=50,
+            transformar=None, visibles=None, descendente=True, texto_vacio="No hay registros."):
+    """Dibuja la página actual de `tabla` con sus controles y la devuelve (ya transformada).
+
+    `clave` distingue el estado de cada tabla en la sesión; `transformar(df)`
+    agrega columnas calculadas a la página y `visibles` elige las que se muestran.
+    """
+    import streamlit as st
+
+    col_tam, col_fecha = st.columns(2)
+    limite = col_tam.selectbox("Filas por página:", list(tamanos), index=list(tamanos).index(tamano),
+                               key=f"{clave}_tamano")
+    hasta_fecha = col_fecha.date_input("Ir a fecha:", value=None, key=f"{clave}_fecha",
+                                       help="Empieza la tabla en este día")
+
+    # Si cambian los filtros, se vuelve a la primera página
+    firma = (tabla, where, repr(sorted((params or {}).items())), limite, hasta_fecha)
+    if st.session_state.get(f"{clave}_firma") != firma or f"{clave}_cursores" not in st.session_state:
+        st.session_state[f"{clave}_firma"] = firma
+        _reiniciar(clave)
+    cursores = st.session_state[f"{clave}_cursores"]
+
+    df, siguiente = leer_pagina(engine, tabla, columnas, orden, where, params, cursor=cursores[-1],
+                                limite=limite, hasta_fecha=hasta_fecha, descendente=descendente)
+    if transformar is not None and not df.empty:
+        df = transformar(df)
+    if df.empty and len(cursores) == 1:
+        st.info(texto_vacio)
+        return df
+    st.dataframe(df[visibles] if visibles else df, hide_index=True)
+
+    col_ant, col_info, col_sig = st.columns([1, 2, 1])
+    col_ant.button("⬅️ Anterior", on_click=_anterior, args=(clave,), disabled=len(cursores) == 1,
+                   key=f"{clave}_anterior")
+    col_sig.button("Siguiente ➡️", on_click=_siguiente, args=(clave, siguiente), disabled=siguiente is None,
+                   key=f"{clave}_siguiente")
+    if st.session_state.get(f"{clave}_contar"):
+        total = contar_filas(engine, tabla, orden, where, params, hasta_fecha, descendente)
+        col_info.caption(f"Página {len(cursores)} · {total:,d} registros")
+    else:
+        col_info.caption(f"Página {len(cursores)}")
+        col_info.button("Contar registros", on_click=_contar, args=(clave,), key=f"{clave}_boton_contar")
+    return df